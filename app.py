@@ -1,34 +1,497 @@
+import codecs
+import contextvars
+import copy
+import datetime
+import hashlib
+import importlib
 import io
+import json
+import logging
+import multiprocessing
 import os
+import queue
+import random
 import shutil
+import sqlite3
+import sys
 import tempfile
 import threading
+import time
 import uuid
 import zipfile
-
-import fitz  # PyMuPDF
-import ghostscript
-import openpyxl
-from flask import Flask, jsonify, render_template_string, request, send_file
-from pdf2docx import Converter
-from pdf2docx.converter import ConversionException
-from PIL import Image
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import chain, islice
+
+from flask import Flask, Response, jsonify, render_template_string, request, send_file
 from werkzeug.utils import secure_filename
 
+
+class _LazyModule:
+    # Importa o modulo no primeiro acesso a um atributo: cada processo so
+    # carrega os motores das ferramentas que de fato executa.
+    def __init__(self, name: str):
+        self._name   = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+fitz               = _LazyModule("fitz")
+openpyxl           = _LazyModule("openpyxl")
+Image              = _LazyModule("PIL.Image")
+pdfmetrics         = _LazyModule("reportlab.pdfbase.pdfmetrics")
+canvas             = _LazyModule("reportlab.pdfgen.canvas")
+pdf2docx_converter = _LazyModule("pdf2docx.converter")
+
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024
+# Limite por arquivo no upload em partes (cada parte respeita MAX_CONTENT_LENGTH).
+app.config["MAX_UPLOAD_SIZE"]    = int(os.environ.get("MAX_UPLOAD_SIZE", 4 * 1024 * 1024 * 1024))
 app.config["UPLOAD_FOLDER"] = "uploads"
 app.config["OUTPUT_FOLDER"] = "outputs"
 
+# Pool de workers por classe de ferramenta: "heavy" para motores que saturam
+# CPU/memoria (Ghostscript, pdf2docx, renderizacao) e "light" para o resto.
+# Quando a fila de uma classe enche, /convert responde 429 com Retry-After.
+_CPUS = os.cpu_count() or 2
+app.config["SCHEDULER_POOLS"] = {
+    "heavy": {
+        "workers":     int(os.environ.get("HEAVY_WORKERS", max(1, _CPUS // 2))),
+        "queue_limit": int(os.environ.get("HEAVY_QUEUE_LIMIT", 16)),
+    },
+    "light": {
+        "workers":     int(os.environ.get("LIGHT_WORKERS", _CPUS)),
+        "queue_limit": int(os.environ.get("LIGHT_QUEUE_LIMIT", 64)),
+    },
+}
+
+# Ghostscript roda em processos separados: a libgs aceita apenas uma instancia
+# por processo e um crash dela nao pode derrubar o servidor.
+app.config["GS_WORKERS"]             = int(os.environ.get("GS_WORKERS", _CPUS))
+app.config["GS_TIMEOUT"]             = int(os.environ.get("GS_TIMEOUT", 300))
+app.config["GS_MAX_JOBS_PER_WORKER"] = int(os.environ.get("GS_MAX_JOBS_PER_WORKER", 50))
+
+# Prazo (segundos) de cada job, contado do inicio do processamento; estourado,
+# o job para no proximo ponto de cancelamento e a task fica com status
+# "timeout". JOB_DEADLINE_<FERRAMENTA> (ex.: JOB_DEADLINE_PDF_TO_WORD) muda o
+# prazo de uma ferramenta; 0 desliga.
+app.config["JOB_DEADLINES"] = {
+    tool: int(os.environ.get("JOB_DEADLINE_" + tool.upper().replace("-", "_"), default))
+    for tool, default in {
+        "pdf-to-images": 600,
+        "images-to-pdf": 300,
+        "merge-pdf":     300,
+        "split-pdf":     300,
+        "compress-pdf":  900,
+        "pdf-to-pdfa":   900,
+        "word-to-pdf":   600,
+        "excel-to-pdf":  600,
+        "txt-to-pdf":    300,
+        "pdf-to-word":   1800,
+        "pipeline":      3600,
+    }.items()
+}
+
+# Onde o estado das tasks fica guardado: "memory" (um unico processo) ou
+# "sqlite:///caminho/tasks.db" para varios workers (ex.: gunicorn -w 4).
+# Tasks expiram TASK_TTL segundos apos a ultima atualizacao, ou DOWNLOAD_TTL
+# segundos apos o download; o reaper apaga a task e o temp_dir.
+app.config["TASK_STORE"]      = os.environ.get("TASK_STORE", "memory")
+app.config["TASK_TTL"]        = int(os.environ.get("TASK_TTL", 3600))
+app.config["DOWNLOAD_TTL"]    = int(os.environ.get("DOWNLOAD_TTL", 60))
+app.config["REAPER_INTERVAL"] = int(os.environ.get("REAPER_INTERVAL", 30))
+
+# /progress/<id>/stream (Server-Sent Events): heartbeat para manter proxies
+# abertos e intervalo para reler o store quando outro processo atualiza a task.
+app.config["SSE_HEARTBEAT"]     = int(os.environ.get("SSE_HEARTBEAT", 15))
+app.config["SSE_POLL_INTERVAL"] = float(os.environ.get("SSE_POLL_INTERVAL", 1.0))
+
+# Cache de resultados enderecado por conteudo (hash da entrada + ferramenta +
+# parametros). CACHE_MAX_BYTES=0 desliga o cache.
+app.config["CACHE_FOLDER"]    = os.environ.get("CACHE_FOLDER", "cache")
+app.config["CACHE_MAX_BYTES"] = int(os.environ.get("CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Processos para trabalho paralelizavel por pagina (renderizacao, etc.).
+app.config["PROCESS_WORKERS"] = int(os.environ.get("PROCESS_WORKERS", _CPUS))
+# Fatias de paginas que um unico pdf-to-word pode ter ao mesmo tempo no pool,
+# para um documento grande nao ocupar todos os processos.
+app.config["PDF2DOCX_WORKERS"] = int(os.environ.get("PDF2DOCX_WORKERS", max(1, min(4, _CPUS // 2))))
+
+# Motores importados e aquecidos ao carregar o app (lista separada por
+# virgula ou "all"). Com gunicorn --preload isso acontece uma vez no master,
+# antes do fork, e os workers compartilham as paginas (copy-on-write). O
+# Ghostscript roda em processos proprios e sobe apos o fork.
+app.config["PRELOAD_ENGINES"] = os.environ.get("PRELOAD_ENGINES", "")
+
+# Miniaturas de paginas (/preview): PDFs enviados ficam em PREVIEW_FOLDER
+# (por hash do conteudo, apagados apos TASK_TTL sem acesso), ate
+# PREVIEW_OPEN_DOCS documentos ficam abertos em memoria e as miniaturas
+# renderizadas ocupam no maximo PREVIEW_CACHE_BYTES (LRU).
+app.config["PREVIEW_FOLDER"]      = os.environ.get("PREVIEW_FOLDER", "previews")
+app.config["PREVIEW_OPEN_DOCS"]   = int(os.environ.get("PREVIEW_OPEN_DOCS", 16))
+app.config["PREVIEW_CACHE_BYTES"] = int(os.environ.get("PREVIEW_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Maximo de arquivos (e de task_ids) por requisicao em /batch.
+app.config["BATCH_MAX_FILES"] = int(os.environ.get("BATCH_MAX_FILES", 500))
+
+# Profiler por amostragem: uma fracao PROFILE_SAMPLE_RATE (0 a 1) dos jobs
+# grava em PROFILE_FOLDER as pilhas da thread do job, amostradas a cada
+# PROFILE_INTERVAL segundos, no formato "folded" (flamegraph/speedscope).
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_INTERVAL"]    = float(os.environ.get("PROFILE_INTERVAL", 0.01))
+app.config["PROFILE_FOLDER"]      = os.environ.get("PROFILE_FOLDER", "profiles")
+
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 os.makedirs(app.config["OUTPUT_FOLDER"], exist_ok=True)
+os.makedirs(app.config["CACHE_FOLDER"], exist_ok=True)
+os.makedirs(app.config["PREVIEW_FOLDER"], exist_ok=True)
 
 ALLOWED_EXTENSIONS = {"pdf", "docx", "txt", "xlsx", "jpg", "jpeg", "png"}
+IMAGE_FORMATS      = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+SPLIT_MODES        = ("pages", "chunk", "ranges", "bookmarks")
+# Tamanhos de pagina em pontos (retrato); "original" usa o tamanho da imagem.
+PAGE_SIZES         = {"original": None, "a4": (595.28, 841.89), "letter": (612.0, 792.0)}
+LETTER             = PAGE_SIZES["letter"]
+IMAGE_FITS         = ("contain", "fill")
+TEXT_READ_BLOCK    = 1024 * 1024
+# Largura (px) das miniaturas de /preview: padrao e limites.
+PREVIEW_WIDTH      = 200
+PREVIEW_WIDTHS     = (32, 1200)
+# Layout de tabela do excel-to-pdf (pontos); as larguras das colunas saem das
+# primeiras EXCEL_SAMPLE_ROWS linhas de cada aba.
+EXCEL_SAMPLE_ROWS  = 200
+EXCEL_FONT_SIZE    = 8
+EXCEL_ROW_HEIGHT   = 14
+EXCEL_MARGIN       = 36
+EXCEL_CELL_PADDING = 3
+EXCEL_COL_WIDTHS   = (24, 220)
+# compress-pdf adaptativo: imagens com DPI efetivo acima de alvo * SLACK e
+# com pelo menos MIN_IMAGE_BYTES sao recomprimidas; abaixo de MIN_SAVINGS
+# (fracao do arquivo) de ganho estimado o PDF e devolvido intacto.
+COMPRESS_DPI_SLACK       = 1.3
+COMPRESS_MIN_IMAGE_BYTES = 32 * 1024
+COMPRESS_MIN_SAVINGS     = 0.05
+# Formatos ja comprimidos: vao para o zip sem deflate (ZIP_STORED).
+STORED_EXTENSIONS  = {"png", "jpg", "jpeg", "webp", "docx", "xlsx", "zip"}
+ZIP_CHUNK_SIZE     = 1024 * 1024
+UPLOAD_CHUNK_SIZE  = 8 * 1024 * 1024
+UPLOAD_BLOCK_SIZE  = 1024 * 1024
+# Status finais de uma task e intervalo (s) com que jobs em espera (pool de
+# processos, Ghostscript) conferem se foram cancelados ou passaram do prazo.
+TERMINAL_STATUSES    = ("done", "error", "cancelled", "timeout")
+CANCEL_POLL_INTERVAL = 0.5
+# Espera (s) inicial e maxima entre tentativas de aquecer um motor que falhou.
+WARMUP_RETRY_DELAYS  = (5, 300)
+# Limites (segundos) dos histogramas de /metrics.
+STAGE_BUCKETS      = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Extensoes aceitas e extensao gerada por ferramenta, para validar pipelines.
+TOOL_IO = {
+    "pdf-to-images": ({"pdf"}, "image"),
+    "images-to-pdf": ({"jpg", "jpeg", "png"}, "pdf"),
+    "merge-pdf":     ({"pdf"}, "pdf"),
+    "split-pdf":     ({"pdf"}, "pdf"),
+    "compress-pdf":  ({"pdf"}, "pdf"),
+    "pdf-to-pdfa":   ({"pdf"}, "pdf"),
+    "word-to-pdf":   ({"docx"}, "pdf"),
+    "excel-to-pdf":  ({"xlsx"}, "pdf"),
+    "txt-to-pdf":    ({"txt"}, "pdf"),
+    "pdf-to-word":   ({"pdf"}, "docx"),
+}
+# Ferramentas que processam um arquivo por vez: num pipeline, rodam uma vez
+# para cada arquivo vindo da etapa anterior.
+SINGLE_INPUT_TOOLS = {"pdf-to-images", "split-pdf", "compress-pdf", "excel-to-pdf", "txt-to-pdf",
+                      "pdf-to-word"}
+PIPELINE_MAX_STEPS = 10
+
+TOOL_CLASSES = {
+    "pdf-to-images": "heavy",
+    "images-to-pdf": "light",
+    "merge-pdf":     "light",
+    "split-pdf":     "light",
+    "compress-pdf":  "heavy",
+    "pdf-to-pdfa":   "heavy",
+    "word-to-pdf":   "light",
+    "excel-to-pdf":  "light",
+    "txt-to-pdf":    "light",
+    "pdf-to-word":   "heavy",
+    "pipeline":      "heavy",
+}
+
+# Modulo importado por motor (None: roda fora deste processo) e motores que
+# cada ferramenta usa. O pipeline carrega os motores de cada etapa.
+ENGINE_MODULES = {
+    "pymupdf":     "fitz",
+    "pillow":      "PIL.Image",
+    "reportlab":   "reportlab.pdfgen.canvas",
+    "openpyxl":    "openpyxl",
+    "python-docx": "docx",
+    "pdf2docx":    "pdf2docx.converter",
+    "ghostscript": None,
+}
+TOOL_ENGINES = {
+    "pdf-to-images": ("pymupdf", "pillow"),
+    "images-to-pdf": ("pillow",),
+    "merge-pdf":     ("pymupdf",),
+    "split-pdf":     ("pymupdf",),
+    "compress-pdf":  ("pymupdf", "pillow", "ghostscript"),
+    "pdf-to-pdfa":   ("ghostscript",),
+    "word-to-pdf":   ("python-docx", "reportlab", "pymupdf"),
+    "excel-to-pdf":  ("openpyxl", "reportlab", "pymupdf"),
+    "txt-to-pdf":    ("reportlab",),
+    "pdf-to-word":   ("pdf2docx", "pymupdf"),
+    "pipeline":      (),
+}
+
+class TaskStore(ABC):
+    # Interface comum dos backends. As tasks sao dicts serializaveis em JSON;
+    # "expires_at" (epoch) decide quando o reaper pode apaga-las.
+    @abstractmethod
+    def create(self, task_id: str, task: dict):
+        ...
+
+    @abstractmethod
+    def get(self, task_id: str):
+        ...
+
+    @abstractmethod
+    def update(self, task_id: str, **fields) -> bool:
+        ...
+
+    @abstractmethod
+    def advance(self, task_id: str, expires_at: float, **fields) -> bool:
+        # Como update, mas so grava se algum campo mudou e incrementa "seq"
+        # na mesma operacao atomica. False se a task nao existe ou nada mudou.
+        ...
+
+    @abstractmethod
+    def modify(self, task_id: str, fn):
+        # Read-modify-write atomico: fn altera o registro no lugar. Devolve o
+        # registro resultante, ou None se ele nao existe.
+        ...
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        ...
+
+    @abstractmethod
+    def expired(self, now: float) -> list:
+        ...
+
+    # Operacoes em lote (/batch): por padrao uma chamada por task; os backends
+    # fazem tudo sob um unico lock/transacao.
+    def create_many(self, tasks: dict):
+        for task_id, task in tasks.items():
+            self.create(task_id, task)
+
+    def get_many(self, task_ids: list) -> dict:
+        return {task_id: self.get(task_id) for task_id in task_ids}
+
+    def update_many(self, task_ids: list, **fields):
+        for task_id in task_ids:
+            self.update(task_id, **fields)
+
+
+class MemoryTaskStore(TaskStore):
+    def __init__(self):
+        self._tasks = {}
+        self._lock  = threading.Lock()
+
+    def create(self, task_id: str, task: dict):
+        with self._lock:
+            self._tasks[task_id] = dict(task)
+
+    def get(self, task_id: str):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return copy.deepcopy(task) if task else None
+
+    def update(self, task_id: str, **fields) -> bool:
+        with self._lock:
+            if task_id not in self._tasks:
+                return False
+            self._tasks[task_id].update(fields)
+            return True
+
+    def advance(self, task_id: str, expires_at: float, **fields) -> bool:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or all(task.get(k) == v for k, v in fields.items()):
+                return False
+            task.update(fields, seq=task.get("seq", 0) + 1, expires_at=expires_at)
+            return True
+
+    def modify(self, task_id: str, fn):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            fn(task)
+            return copy.deepcopy(task)
+
+    def delete(self, task_id: str):
+        with self._lock:
+            return self._tasks.pop(task_id, None)
+
+    def expired(self, now: float) -> list:
+        with self._lock:
+            return [tid for tid, t in self._tasks.items() if t.get("expires_at", now) < now]
+
+    def create_many(self, tasks: dict):
+        with self._lock:
+            for task_id, task in tasks.items():
+                self._tasks[task_id] = dict(task)
+
+    def get_many(self, task_ids: list) -> dict:
+        with self._lock:
+            return {tid: dict(self._tasks[tid]) if tid in self._tasks else None for tid in task_ids}
+
+    def update_many(self, task_ids: list, **fields):
+        with self._lock:
+            for task_id in task_ids:
+                if task_id in self._tasks:
+                    self._tasks[task_id].update(fields)
+
+
+class SQLiteTaskStore(TaskStore):
+    def __init__(self, path: str, table: str = "tasks"):
+        self.path   = path
+        self.table  = table
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires_at ON {self.table} (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, task_id: str, task: dict):
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO {self.table} (id, data, expires_at) VALUES (?, ?, ?)",
+            (task_id, json.dumps(task), task.get("expires_at", 0)),
+        )
+
+    def get(self, task_id: str):
+        row = self._conn().execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE serializa o read-modify-write entre processos.
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def update(self, task_id: str, **fields) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return False
+            task = json.loads(row[0])
+            task.update(fields)
+            conn.execute(f"UPDATE {self.table} SET data = ?, expires_at = ? WHERE id = ?",
+                         (json.dumps(task), task.get("expires_at", 0), task_id))
+            return True
+
+    def advance(self, task_id: str, expires_at: float, **fields) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return False
+            task = json.loads(row[0])
+            if all(task.get(k) == v for k, v in fields.items()):
+                return False
+            task.update(fields, seq=task.get("seq", 0) + 1, expires_at=expires_at)
+            conn.execute(f"UPDATE {self.table} SET data = ?, expires_at = ? WHERE id = ?",
+                         (json.dumps(task), expires_at, task_id))
+            return True
+
+    def modify(self, task_id: str, fn):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            task = json.loads(row[0])
+            fn(task)
+            conn.execute(f"UPDATE {self.table} SET data = ?, expires_at = ? WHERE id = ?",
+                         (json.dumps(task), task.get("expires_at", 0), task_id))
+            return task
+
+    def delete(self, task_id: str):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (task_id,))
+            return json.loads(row[0])
+
+    def expired(self, now: float) -> list:
+        rows = self._conn().execute(f"SELECT id FROM {self.table} WHERE expires_at < ?", (now,)).fetchall()
+        return [row[0] for row in rows]
+
+    def create_many(self, tasks: dict):
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (id, data, expires_at) VALUES (?, ?, ?)",
+                [(tid, json.dumps(t), t.get("expires_at", 0)) for tid, t in tasks.items()],
+            )
 
-tasks: dict = {}
-tasks_lock = threading.Lock()
+    def get_many(self, task_ids: list) -> dict:
+        found = {}
+        # Em blocos: o SQLite limita o numero de parametros por consulta.
+        for i in range(0, len(task_ids), 500):
+            chunk = task_ids[i:i + 500]
+            rows  = self._conn().execute(
+                f"SELECT id, data FROM {self.table} WHERE id IN ({','.join('?' * len(chunk))})", chunk,
+            ).fetchall()
+            found.update((tid, json.loads(data)) for tid, data in rows)
+        return {tid: found.get(tid) for tid in task_ids}
+
+    def update_many(self, task_ids: list, **fields):
+        with self._transaction() as conn:
+            for task_id in task_ids:
+                row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (task_id,)).fetchone()
+                if row is None:
+                    continue
+                task = json.loads(row[0])
+                task.update(fields)
+                conn.execute(f"UPDATE {self.table} SET data = ?, expires_at = ? WHERE id = ?",
+                             (json.dumps(task), task.get("expires_at", 0), task_id))
+
+
+def _make_task_store(url: str, table: str = "tasks") -> TaskStore:
+    if url == "memory":
+        return MemoryTaskStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteTaskStore(url[len("sqlite:///"):], table)
+    raise ValueError(f"TASK_STORE invalido: {url}")
+
+
+task_store = _make_task_store(app.config["TASK_STORE"])
+# Sessoes de upload em partes, no mesmo backend: com SQLite qualquer worker
+# recebe as partes e o finalize de uma sessao.
+upload_store = _make_task_store(app.config["TASK_STORE"], "uploads")
 
 
 def allowed_file(filename):
@@ -42,28 +505,1057 @@ class SavedFile:
 
     def save(self, dest: str):
         if os.path.abspath(dest) != os.path.abspath(self.path):
-            shutil.copy(self.path, dest)
+            # Hard link quando possivel: as ferramentas nunca alteram a entrada
+            # e resultados intermediarios de pipelines nao sao copiados.
+            try:
+                os.link(self.path, dest)
+            except OSError:
+                shutil.copy(self.path, dest)
+
+
+class ProgressBroker:
+    # Numero de versao por task dentro do processo; os streams SSE dormem ate
+    # a versao mudar em vez de consultar o store a cada instante.
+    def __init__(self):
+        self._cond     = threading.Condition()
+        self._versions = {}
+
+    def publish(self, task_id: str):
+        self.publish_many([task_id])
+
+    def publish_many(self, task_ids: list):
+        if not task_ids:
+            return
+        with self._cond:
+            for task_id in task_ids:
+                self._versions[task_id] = self._versions.get(task_id, 0) + 1
+            self._cond.notify_all()
+
+    def version(self, task_id: str) -> int:
+        with self._cond:
+            return self._versions.get(task_id, 0)
+
+    def wait(self, task_id: str, version: int, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._versions.get(task_id, 0) != version, timeout)
+
+    def forget(self, task_id: str):
+        with self._cond:
+            self._versions.pop(task_id, None)
+
+
+progress_broker = ProgressBroker()
+
+
+def _update_task(task_id: str, **fields) -> bool:
+    # Grava so quando algo visivel mudou; "seq" vira o id do evento SSE.
+    if not task_store.advance(task_id, time.time() + app.config["TASK_TTL"], **fields):
+        return False
+    progress_broker.publish(task_id)
+    return True
+
+
+# Dentro de um pipeline, cada etapa reporta 0-100 como sempre e set_progress
+# traduz para a janela (inicio, fim, prefixo) da etapa no progresso total.
+_progress_window = contextvars.ContextVar("progress_window", default=None)
 
 
 def set_progress(task_id: str, progress: int, message: str = "", status: str = "processing"):
-    with tasks_lock:
-        if task_id in tasks:
-            tasks[task_id]["progress"] = progress
-            tasks[task_id]["message"]  = message
-            tasks[task_id]["status"]   = status
+    window = _progress_window.get()
+    if window is not None:
+        lo, hi, prefix = window
+        progress = lo + int(progress * (hi - lo) / 100)
+        message  = prefix + message
+    _update_task(task_id, progress=progress, message=message, status=status)
+
+
+class TaskCancelled(Exception):
+    status = "cancelled"
+
+
+class TaskTimeout(TaskCancelled):
+    status = "timeout"
+
+
+# Cancelamentos pedidos a este processo (DELETE /task/<id>); com store SQLite
+# o pedido tambem fica na task, para o processo que executa o job.
+_cancelled_tasks = set()
+_job_control     = contextvars.ContextVar("job_control", default=None)
+
+
+class _JobControl:
+    def __init__(self, task_id: str, deadline: int):
+        self.task_id    = task_id
+        self.deadline   = deadline
+        self.expires    = time.monotonic() + deadline if deadline > 0 else None
+        self.reason     = None
+        self.message    = None
+        self._next_poll = 0.0
+
+    def check(self):
+        # Depois de cancelado, continua levantando: um except generico no
+        # meio da ferramenta nao faz o job seguir adiante.
+        if self.reason is None:
+            now = time.monotonic()
+            if self.expires is not None and now >= self.expires:
+                self.reason, self.message = "timeout", f"Tempo limite de {self.deadline}s excedido"
+            elif self.task_id in _cancelled_tasks or self._requested(now):
+                self.reason, self.message = "cancelled", "Cancelado pelo usuario"
+        if self.reason is not None:
+            raise (TaskTimeout if self.reason == "timeout" else TaskCancelled)(self.message)
+
+    def _requested(self, now: float) -> bool:
+        if isinstance(task_store, MemoryTaskStore) or now < self._next_poll:
+            return False
+        self._next_poll = now + CANCEL_POLL_INTERVAL
+        task = task_store.get(self.task_id)
+        return task is None or bool(task.get("cancel_requested"))
+
+
+def _check_cancelled():
+    # Ponto de cancelamento: as ferramentas chamam entre paginas/arquivos.
+    control = _job_control.get()
+    if control is not None:
+        control.check()
+
+
+def _as_completed(futures):
+    # as_completed que acorda a cada CANCEL_POLL_INTERVAL para conferir o
+    # cancelamento enquanto espera o pool de processos.
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        _check_cancelled()
+        yield from done
+
+
+def _cancel_task(task_id: str, temp_dir: str, status: str, message: str, tool: str):
+    # Cancelada ou fora do prazo: os arquivos saem na hora; a task fica no
+    # store ate o TTL para o cliente ver o status final.
+    if temp_dir:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    metrics.inc("localpdf_tasks_total", tool=tool, status=status)
+    fields = {"timings": _job_timings()} if _job_stages.get() is not None else {}
+    _update_task(task_id, status=status, message=message, progress=0,
+                 result_files=[], result_path=None, **fields)
+
+
+class Metrics:
+    # Registro minimo no formato texto do Prometheus, sem dependencia externa.
+    # Os valores sao por processo: com varios workers, cada um expoe os seus.
+    def __init__(self, buckets: tuple):
+        self.buckets     = tuple(buckets)
+        self._lock       = threading.Lock()
+        self._help       = {}
+        self._counters   = {}  # nome -> {labels: valor}
+        self._histograms = {}  # nome -> {labels: [contagem por bucket, soma, total]}
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series      = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            hist = self._histograms.setdefault(name, {}).setdefault(
+                key, [[0] * len(self.buckets), 0.0, 0])
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[0][idx] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    @staticmethod
+    def _labels(key, extra: str = "") -> str:
+        # Escapes do formato de texto do Prometheus para valores de label.
+        parts = [
+            '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in key
+        ] + ([extra] if extra else [])
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self, gauges: dict = None) -> str:
+        # gauges: nome -> {labels: valor}, lidos na hora da coleta.
+        lines = []
+        with self._lock:
+            for name, series in chain(self._counters.items(), (gauges or {}).items()):
+                kind, text = self._help.get(name, ("untyped", ""))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{self._labels(key)} {value}")
+            for name, series in self._histograms.items():
+                kind, text = self._help.get(name, ("histogram", ""))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} histogram"]
+                for key, (counts, total_sum, count) in sorted(series.items()):
+                    for bound, n in chain(zip(self.buckets, counts), [("+Inf", count)]):
+                        le = 'le="%s"' % bound
+                        lines.append(f"{name}_bucket{self._labels(key, le)} {n}")
+                    lines.append(f"{name}_sum{self._labels(key)} {round(total_sum, 6)}")
+                    lines.append(f"{name}_count{self._labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(STAGE_BUCKETS)
+metrics.describe("localpdf_stage_seconds", "histogram",
+                 "Duracao de cada etapa (upload, queue, cache, load, convert, analyze, ghostscript, render, store, download, zip)")
+metrics.describe("localpdf_tasks_total", "counter", "Tasks finalizadas por ferramenta e status")
+metrics.describe("localpdf_bytes_in_total", "counter", "Bytes recebidos para conversao")
+metrics.describe("localpdf_bytes_out_total", "counter", "Bytes gerados pelas conversoes")
+metrics.describe("localpdf_file_errors_total", "counter", "Arquivos que falharam dentro de um lote")
+metrics.describe("localpdf_queue_rejected_total", "counter", "Jobs recusados com 429 por fila cheia")
+metrics.describe("localpdf_queue_depth", "gauge", "Jobs aguardando na fila")
+metrics.describe("localpdf_active_workers", "gauge", "Workers processando jobs")
+metrics.describe("localpdf_ghostscript_busy", "gauge", "Processos Ghostscript ocupados")
+metrics.describe("localpdf_cache_hits_total", "counter", "Acertos do cache de resultados")
+metrics.describe("localpdf_cache_misses_total", "counter", "Falhas do cache de resultados")
+metrics.describe("localpdf_cache_bytes", "gauge", "Espaco ocupado pelo cache de resultados")
+metrics.describe("localpdf_preview_docs_open", "gauge", "PDFs abertos no cache de /preview")
+metrics.describe("localpdf_thumbnail_hits_total", "counter", "Miniaturas servidas do cache")
+metrics.describe("localpdf_thumbnail_misses_total", "counter", "Miniaturas renderizadas")
+metrics.describe("localpdf_thumbnail_bytes", "gauge", "Espaco ocupado pelo cache de miniaturas")
+
+# Etapas do job em execucao: {"tool": ..., "timings": {etapa: segundos}}.
+# ContextVar para que funcoes internas (ex.: GhostscriptPool.run) registrem a
+# propria etapa sem receber o task_id.
+_job_stages      = contextvars.ContextVar("job_stages", default=None)
+_job_stages_lock  = threading.Lock()
+
+
+def record_stage(stage: str, seconds: float, tool: str = None):
+    job = _job_stages.get()
+    if job is not None:
+        tool = tool or job["tool"]
+        with _job_stages_lock:
+            job["timings"][stage] = job["timings"].get(stage, 0.0) + seconds
+    metrics.observe("localpdf_stage_seconds", seconds, tool=tool or "unknown", stage=stage)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def _job_timings() -> dict:
+    job = _job_stages.get()
+    if job is None:
+        return {}
+    with _job_stages_lock:
+        return {stage: round(secs, 3) for stage, secs in job["timings"].items()}
+
+
+class _StackSampler:
+    # Amostra a pilha de uma thread a cada intervalo e conta as pilhas iguais.
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval  = interval
+        self.counts    = {}
+        self._stop     = threading.Event()
+        self._thread   = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in sorted(self.counts.items()):
+                fh.write(f"{stack} {count}\n")
+
+
+class TaskReaper:
+    # Uma unica thread por processo apaga tasks expiradas (e seus temp_dir)
+    # e sessoes de upload abandonadas.
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._lock    = threading.Lock()
+        self._thread  = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="task-reaper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reap()
+            except Exception as exc:
+                app.logger.warning("Falha ao limpar tasks expiradas: %s", exc)
+
+    def reap(self, now: float = None):
+        now = now or time.time()
+        for task_id in task_store.expired(now):
+            task = task_store.delete(task_id)
+            progress_broker.forget(task_id)
+            if task and task.get("temp_dir"):
+                shutil.rmtree(task["temp_dir"], ignore_errors=True)
+        for upload_id in upload_store.expired(now):
+            session = upload_store.delete(upload_id)
+            if session:
+                shutil.rmtree(session["temp_dir"], ignore_errors=True)
+        for entry in os.scandir(app.config["PREVIEW_FOLDER"]):
+            try:
+                if entry.stat().st_mtime + app.config["TASK_TTL"] < now:
+                    preview_docs.discard(entry.path)
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+reaper = TaskReaper(app.config["REAPER_INTERVAL"])
+
+
+class QueueFullError(Exception):
+    def __init__(self, tool_class: str, retry_after: int):
+        super().__init__(f"Fila de processamento cheia ({tool_class})")
+        self.tool_class  = tool_class
+        self.retry_after = retry_after
+
+
+class _WorkerPool:
+    def __init__(self, name: str, workers: int, queue_limit: int):
+        self.name        = name
+        self.workers     = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._queue      = deque()
+        self._cond       = threading.Condition()
+        self._threads    = []
+        self._active     = 0
+        self._avg_secs   = 30.0
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def retry_after(self) -> int:
+        # Estimativa grosseira: tempo medio por job * jobs na frente / workers.
+        waiting = len(self._queue) + self._active
+        return max(1, int(self._avg_secs * waiting / self.workers))
+
+    def _free(self) -> int:
+        # Vagas livres: cada job na fila ou rodando ocupa uma, desde o submit
+        # (com o lock) ate o fim do job no finally do worker.
+        return self.capacity() - len(self._queue) - self._active
+
+    def submit(self, task_id: str, fn, args: tuple):
+        with self._cond:
+            if self._free() < 1:
+                raise QueueFullError(self.name, self.retry_after())
+            self._ensure_started()
+            self._queue.append((task_id, fn, args))
+            self._cond.notify()
+
+    def capacity(self) -> int:
+        # Jobs que cabem de uma vez com a fila vazia e todos os workers livres.
+        return self.queue_limit + self.workers
+
+    def submit_many(self, jobs: list):
+        # Um lote entra inteiro ou nao entra: precisa caber nas vagas da fila
+        # mais os workers livres, como se fosse enviado job a job.
+        with self._cond:
+            if len(jobs) > self._free():
+                raise QueueFullError(self.name, self.retry_after())
+            self._ensure_started()
+            self._queue.extend(jobs)
+            self._cond.notify_all()
+
+    def position(self, task_id: str):
+        with self._cond:
+            for idx, (queued_id, _, _) in enumerate(self._queue):
+                if queued_id == task_id:
+                    return idx + 1
+        return None
+
+    def positions(self) -> dict:
+        with self._cond:
+            return {queued_id: idx + 1 for idx, (queued_id, _, _) in enumerate(self._queue)}
+
+    def remove(self, task_id: str) -> bool:
+        with self._cond:
+            for idx, job in enumerate(self._queue):
+                if job[0] == task_id:
+                    del self._queue[idx]
+                    behind = [queued[0] for queued in islice(self._queue, idx, None)]
+                    break
+            else:
+                return False
+        progress_broker.publish_many(behind)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                task_id, fn, args = self._queue.popleft()
+                self._active += 1
+                behind = [queued[0] for queued in self._queue]
+            # Quem continua na fila andou uma posicao: acorda os streams SSE.
+            progress_broker.publish_many(behind)
+            started = time.monotonic()
+            try:
+                fn(*args)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._active  -= 1
+                    self._avg_secs = 0.8 * self._avg_secs + 0.2 * elapsed
+
+
+class JobScheduler:
+    def __init__(self, pools: dict):
+        self._pools = {
+            name: _WorkerPool(name, cfg["workers"], cfg["queue_limit"])
+            for name, cfg in pools.items()
+        }
+
+    def pool_for(self, tool: str) -> _WorkerPool:
+        return self._pools[TOOL_CLASSES.get(tool, "light")]
+
+    def submit(self, task_id: str, tool: str, fn, *args):
+        self.pool_for(tool).submit(task_id, fn, args)
+
+    def submit_many(self, tool: str, jobs: list):
+        # jobs: lista de (task_id, fn, args), todos da mesma ferramenta.
+        self.pool_for(tool).submit_many(jobs)
+
+    def positions(self) -> dict:
+        found = {}
+        for pool in self._pools.values():
+            found.update(pool.positions())
+        return found
+
+    def cancel(self, task_id: str) -> bool:
+        # Tira da fila um job que ainda nao comecou (so a fila deste processo).
+        return any(pool.remove(task_id) for pool in self._pools.values())
+
+    def stats(self) -> dict:
+        return {
+            name: {"queued": len(pool._queue), "active": pool._active, "workers": pool.workers}
+            for name, pool in self._pools.items()
+        }
+
+    def position(self, task_id: str):
+        for pool in self._pools.values():
+            pos = pool.position(task_id)
+            if pos is not None:
+                return pos
+        return None
+
+
+scheduler = JobScheduler(app.config["SCHEDULER_POOLS"])
+
+
+class GhostscriptError(RuntimeError):
+    pass
+
+
+class GhostscriptTimeout(GhostscriptError):
+    pass
+
+
+def _gs_worker_main(conn):
+    import ghostscript
+
+    conn.send("ready")
+    while True:
+        try:
+            gs_args = conn.recv()
+        except EOFError:
+            break
+        if gs_args is None:
+            break
+        try:
+            instance = ghostscript.Ghostscript(*gs_args)
+            instance.exit()
+            conn.send((True, None))
+        except Exception as exc:
+            conn.send((False, str(exc)))
+
+
+class _GhostscriptWorker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_gs_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs  = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: int = 60):
+        # O tempo de subida do processo nao conta no timeout do job.
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv() == "ready"
+        if not self.ready:
+            raise EOFError
+
+    def stop(self, force: bool = False):
+        if not force:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                force = True
+        if not force:
+            self.process.join(2)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class GhostscriptPool:
+    def __init__(self, size: int, timeout: int, max_jobs_per_worker: int):
+        self.size                = max(1, size)
+        self.timeout             = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._ctx                = multiprocessing.get_context("spawn")
+        self._idle               = queue.Queue()
+        self._start_lock         = threading.Lock()
+        self._started            = False
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(_GhostscriptWorker(self._ctx))
+            self._started = True
+
+    def busy(self) -> int:
+        return self.size - self._idle.qsize() if self._started else 0
+
+    def warm_up(self):
+        # Sobe os processos e espera cada um carregar a libgs.
+        self.start()
+        workers = [self._idle.get() for _ in range(self.size)]
+        try:
+            for i, worker in enumerate(workers):
+                try:
+                    worker.wait_ready()
+                except (EOFError, OSError):
+                    worker.stop(force=True)
+                    workers[i] = _GhostscriptWorker(self._ctx)
+                    raise GhostscriptError("Processo do Ghostscript nao iniciou")
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def run(self, gs_args: list, timeout: int = None):
+        with stage_timer("ghostscript"):
+            self._run(gs_args, timeout)
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get(timeout=CANCEL_POLL_INTERVAL)
+            except queue.Empty:
+                _check_cancelled()
+
+    @staticmethod
+    def _wait(worker, timeout: int) -> bool:
+        # Espera em fatias curtas para notar cancelamento e prazo do job.
+        limit = time.monotonic() + timeout
+        while True:
+            left = limit - time.monotonic()
+            if left <= 0:
+                return False
+            if worker.conn.poll(min(left, CANCEL_POLL_INTERVAL)):
+                return True
+            _check_cancelled()
+
+    def _run(self, gs_args: list, timeout: int = None):
+        self.start()
+        timeout = timeout or self.timeout
+        worker  = self._acquire()
+        try:
+            try:
+                worker.wait_ready()
+                worker.conn.send(gs_args)
+                finished = self._wait(worker, timeout)
+                if finished:
+                    ok, error = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.stop(force=True)
+                worker = _GhostscriptWorker(self._ctx)
+                raise GhostscriptError("Processo do Ghostscript terminou inesperadamente")
+            except TaskCancelled:
+                # Job cancelado ou fora do prazo: mata o processo na hora.
+                worker.stop(force=True)
+                worker = _GhostscriptWorker(self._ctx)
+                raise
+            if not finished:
+                # Entrada patologica: mata o processo e sobe outro no lugar.
+                worker.stop(force=True)
+                worker = _GhostscriptWorker(self._ctx)
+                raise GhostscriptTimeout(f"Ghostscript excedeu o limite de {timeout}s")
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs_per_worker:
+                worker.stop()
+                worker = _GhostscriptWorker(self._ctx)
+            if not ok:
+                raise GhostscriptError(error)
+        finally:
+            self._idle.put(worker)
+
+
+_process_pool      = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max(1, app.config["PROCESS_WORKERS"]),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _parse_page_groups(spec: str, total: int) -> list:
+    # "1-3,7,10-end" -> [[0, 1, 2], [6], [9, ..., total - 1]] (indices 0-based).
+    groups = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            first = total if start.lower() == "end" else int(start)
+            last  = first if not sep else total if end.lower() in ("end", "") else int(end)
+        except ValueError:
+            raise ValueError(f"Intervalo de paginas invalido: {part}") from None
+        if first < 1 or last > total or first > last:
+            raise ValueError(f"Intervalo de paginas fora do documento (1-{total}): {part}")
+        groups.append(list(range(first - 1, last)))
+    if not groups:
+        raise ValueError("Nenhum intervalo de paginas informado")
+    return groups
+
+
+def _parse_page_ranges(spec: str, total: int) -> list:
+    # Paginas na ordem pedida e sem repeticao; vazio = documento inteiro.
+    if not spec or not spec.strip():
+        return list(range(total))
+    pages = [p for group in _parse_page_groups(spec, total) for p in group]
+    return list(dict.fromkeys(pages))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src: str, dest: str) -> str:
+    try:
+        os.link(src, dest)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dest)
+    return dest
+
+
+class ConversionCache:
+    # Versao do formato das entradas; incremente quando a saida de alguma
+    # ferramenta mudar para invalidar o que ja esta em disco.
+    VERSION = 1
+    # Pastas .tmp- sem manifesto mais velhas que isso sao sobras de um put
+    # interrompido; as mais novas podem ser de outro worker gravando agora.
+    STALE_TMP_SECS = 3600
+
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder    = folder
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._entries  = OrderedDict()  # key -> {"files": [...], "size": int}
+        self._size     = 0
+        self._lock     = threading.Lock()
+        self._loaded   = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def make_key(self, tool: str, options: dict, input_paths: list, input_hashes: list = None) -> str:
+        hashes = input_hashes or [_file_sha256(p) for p in input_paths]
+        # O nome do arquivo entra na chave porque define o nome da saida.
+        payload = json.dumps({
+            "version": self.VERSION,
+            "tool":    tool,
+            "options": options,
+            "inputs":  [[os.path.basename(p), h] for p, h in zip(input_paths, hashes)],
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if self._loaded:
+            return
+        found = []
+        for key in os.listdir(self.folder):
+            entry_dir = os.path.join(self.folder, key)
+            manifest  = os.path.join(entry_dir, "manifest.json")
+            if ".tmp-" in key:
+                # Gravacao em andamento (deste ou de outro processo) nao e entrada.
+                try:
+                    stale = time.time() - os.path.getmtime(entry_dir) > self.STALE_TMP_SECS
+                except OSError:
+                    continue
+                if stale and not os.path.isfile(manifest):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            if not os.path.isfile(manifest):
+                continue
+            with open(manifest, encoding="utf-8") as fh:
+                names = json.load(fh)
+            files = [os.path.join(entry_dir, n) for n in names]
+            size  = sum(os.path.getsize(fp) for fp in files if os.path.exists(fp))
+            found.append((os.path.getmtime(manifest), key, files, size))
+        for _, key, files, size in sorted(found):
+            self._entries[key] = {"files": files, "size": size}
+            self._size += size
+        self._loaded = True
+
+    def get(self, key: str, dest_dir: str):
+        # Num acerto os arquivos sao ligados (ou copiados) para dest_dir: a
+        # task nao pode apontar para o cache, que um put seguinte pode despejar.
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            try:
+                files = [_link_or_copy(fp, os.path.join(dest_dir, os.path.basename(fp)))
+                         for fp in entry["files"]] if entry else None
+            except FileNotFoundError:
+                files = None
+            if files is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        os.utime(os.path.join(self.folder, key, "manifest.json"))
+        return files
+
+    def put(self, key: str, files: list):
+        size = sum(os.path.getsize(fp) for fp in files)
+        if size > self.max_bytes:
+            return
+        entry_dir = os.path.join(self.folder, key)
+        tmp_dir   = f"{entry_dir}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        names = [os.path.basename(fp) for fp in files]
+        try:
+            for fp, name in zip(files, names):
+                _link_or_copy(fp, os.path.join(tmp_dir, name))
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+                json.dump(names, fh)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            self._load()
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                # Outra task gravou a mesma entrada primeiro.
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+            self._entries[key] = {"files": [os.path.join(entry_dir, n) for n in names], "size": size}
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_key, old = self._entries.popitem(last=False)
+                self._size     -= old["size"]
+                self.evictions += 1
+                shutil.rmtree(os.path.join(self.folder, old_key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "enabled":   self.enabled,
+                "entries":   len(self._entries),
+                "bytes":     self._size,
+                "max_bytes": self.max_bytes,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+            }
+
+
+conversion_cache = ConversionCache(app.config["CACHE_FOLDER"], app.config["CACHE_MAX_BYTES"])
+
+
+class _OpenDocCache:
+    # Documentos fitz abertos por caminho (LRU): paginas seguidas do mesmo PDF
+    # nao reabrem nem reanalisam o arquivo. O lock global cuida so do LRU;
+    # cada documento tem o seu, porque um fitz.Document nao pode ser usado
+    # por duas threads, mas documentos diferentes renderizam em paralelo.
+    def __init__(self, max_docs: int):
+        self.max_docs = max(1, max_docs)
+        self._docs    = OrderedDict()  # caminho -> {"doc", "lock", "users", "evicted"}
+        self._lock    = threading.Lock()
+
+    @contextmanager
+    def open(self, path: str):
+        with self._lock:
+            entry = self._docs.pop(path, None)
+            if entry is None:
+                entry = {"doc": None, "lock": threading.Lock(), "users": 0, "evicted": False}
+            entry["users"] += 1
+            self._docs[path] = entry
+            while len(self._docs) > self.max_docs:
+                self._evict(self._docs.popitem(last=False)[1])
+        try:
+            with entry["lock"]:
+                if entry["doc"] is None:
+                    entry["doc"] = fitz.open(path)
+                yield entry["doc"]
+        finally:
+            with self._lock:
+                entry["users"] -= 1
+                if entry["evicted"]:
+                    self._evict(entry)
+
+    @staticmethod
+    def _evict(entry: dict):
+        # Chamado com o lock global: quem ainda esta usando o documento fecha
+        # ao terminar.
+        entry["evicted"] = True
+        if entry["users"] == 0 and entry["doc"] is not None and not entry["doc"].is_closed:
+            entry["doc"].close()
+
+    def discard(self, path: str):
+        with self._lock:
+            entry = self._docs.pop(path, None)
+            if entry is not None:
+                self._evict(entry)
+
+    def __len__(self):
+        return len(self._docs)
+
+
+class ThumbnailCache:
+    # Miniaturas renderizadas em memoria, limitadas pelo total de bytes (LRU).
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self._entries  = OrderedDict()  # (preview_id, pagina, largura, formato) -> bytes
+        self._size     = 0
+        self._lock     = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._size -= len(self._entries.popitem(last=False)[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+preview_docs    = _OpenDocCache(app.config["PREVIEW_OPEN_DOCS"])
+thumbnail_cache = ThumbnailCache(app.config["PREVIEW_CACHE_BYTES"])
+
+gs_pool = GhostscriptPool(
+    app.config["GS_WORKERS"],
+    app.config["GS_TIMEOUT"],
+    app.config["GS_MAX_JOBS_PER_WORKER"],
+)
+
+
+def _warm_pymupdf():
+    doc = fitz.open()
+    try:
+        page = doc.new_page()
+        page.insert_text((72, 72), "localpdf")
+        page.get_pixmap(dpi=18)
+        doc.tobytes()
+    finally:
+        doc.close()
+
+
+def _warm_pillow():
+    Image.init()
+    Image.new("RGB", (8, 8)).save(io.BytesIO(), "JPEG")
+
+
+def _warm_reportlab():
+    c = canvas.Canvas(io.BytesIO())
+    c.drawString(72, 72, "localpdf")
+    c.save()
+    pdfmetrics.stringWidth("localpdf", "Helvetica", 10)
+
+
+def _warm_openpyxl():
+    openpyxl.Workbook()
+
+
+def _warm_docx():
+    from docx import Document
+
+    Document()
+
+
+def _warm_pdf2docx():
+    pdf2docx_converter.Converter
+
+
+ENGINE_WARMUPS = {
+    "pymupdf":     _warm_pymupdf,
+    "pillow":      _warm_pillow,
+    "reportlab":   _warm_reportlab,
+    "openpyxl":    _warm_openpyxl,
+    "python-docx": _warm_docx,
+    "pdf2docx":    _warm_pdf2docx,
+    "ghostscript": gs_pool.warm_up,
+}
+_engine_warm   = {}  # motor -> segundos gastos no aquecimento
+_engine_errors = {}
+_engine_lock   = threading.Lock()
+
+
+def _preload_list(value: str) -> list:
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    if names == ["all"]:
+        return list(ENGINE_MODULES)
+    unknown = [n for n in names if n not in ENGINE_MODULES]
+    if unknown:
+        raise ValueError(f"Motor desconhecido em PRELOAD_ENGINES: {', '.join(unknown)}")
+    return names
+
+
+PRELOAD_ENGINES = _preload_list(app.config["PRELOAD_ENGINES"])
+
+
+def engine_loaded(name: str) -> bool:
+    module = ENGINE_MODULES[name]
+    if module is None:
+        return gs_pool._started
+    return module in sys.modules
+
+
+def load_engines(tool: str):
+    # Importa os motores da ferramenta que ainda nao estao neste processo.
+    missing = [ENGINE_MODULES[e] for e in TOOL_ENGINES.get(tool, ())
+               if ENGINE_MODULES[e] and ENGINE_MODULES[e] not in sys.modules]
+    if missing:
+        with stage_timer("load"):
+            for module in missing:
+                importlib.import_module(module)
+
+
+def warm_engine(name: str):
+    with _engine_lock:
+        if name in _engine_warm:
+            return
+        started = time.perf_counter()
+        try:
+            ENGINE_WARMUPS[name]()
+        except Exception as exc:
+            _engine_errors[name] = str(exc)
+            app.logger.warning("Falha ao aquecer o motor %s: %s", name, exc)
+            return
+        _engine_errors.pop(name, None)
+        _engine_warm[name] = round(time.perf_counter() - started, 3)
+
+
+class EngineWarmup:
+    # Aquece, numa thread por processo, os motores que nao podem ser
+    # compartilhados pelo fork (processos do Ghostscript) e tenta de novo,
+    # com espera crescente, os que falharam (ex.: libgs indisponivel por um
+    # instante), para /ready nao ficar em 503 pelo resto do processo.
+    def __init__(self, engines: list):
+        self.engines = engines
+        self._lock   = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.engines:
+                self._thread = threading.Thread(target=self._run, name="engine-warmup", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        delay = WARMUP_RETRY_DELAYS[0]
+        while True:
+            for name in self.engines:
+                warm_engine(name)
+            if all(name in _engine_warm for name in self.engines):
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_DELAYS[1])
+
+
+engine_warmup = EngineWarmup(PRELOAD_ENGINES)
 
 HTML_TEMPLATE = (
-'\n<!DOCTYPE html>\n<html lang="pt-BR">\n<head>\n    <meta charset="UTF-8">\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n    <title>NeoConvert - Ferramentas PDF</title>\n    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap" rel="stylesheet">\n    <style>\n        * { \n            margin: 0; \n            padding: 0; \n            box-sizing: border-box; \n        }\n        \n        :root {\n            --primary: #0066CC;\n            --primary-dark: #004C99;\n            --primary-light: #3385D6;\n            --secondary: #00A896;\n            --secondary-dark: #008778;\n            --accent: #0099FF;\n            --dark: #1A1A2E;\n            --gray: #64748B;\n            --light-gray: #F1F5F9;\n            --white: #FFFFFF;\n            --success: #10B981;\n            --error: #EF4444;\n            --warning: #F59E0B;\n        }\n        \n        body { \n            font-family: \'Inter\', -apple-system, BlinkMacSystemFont, \'Segoe UI\', sans-serif; \n            background: linear-gradient(135deg, #0066CC 0%, #00A896 100%);\n            min-height: 100vh; \n            position: relative;\n            overflow-x: hidden;\n        }\n        \n        /* Animated background */\n        body::before {\n            content: \'\';\n            position: fixed;\n            top: 0;\n            left: 0;\n            width: 100%;\n            height: 100%;\n            background: \n                radial-gradient(circle at 20% 50%, rgba(0, 168, 150, 0.3) 0%, transparent 50%),\n                radial-gradient(circle at 80% 80%, rgba(0, 102, 204, 0.3) 0%, transparent 50%),\n                radial-gradient(circle at 40% 20%, rgba(0, 153, 255, 0.2) 0%, transparent 50%);\n            animation: gradientShift 15s ease infinite;\n            pointer-events: none;\n            z-index: 0;\n        }\n        \n        @keyframes gradientShift {\n            0%, 100% { opacity: 1; transform: scale(1); }\n            50% { opacity: 0.8; transform: scale(1.1); }\n        }\n        \n        .container { \n            max-width: 1400px; \n            margin: 0 auto; \n            padding: 20px; \n            position: relative;\n            z-index: 1;\n        }\n        \n        /* Header Styles */\n        .header { \n            text-align: center; \n            color: white; \n            margin-bottom: 50px; \n            padding: 60px 20px 40px;\n            animation: fadeInDown 0.8s ease;\n        }\n        \n        @keyframes fadeInDown {\n            from { opacity: 0; transform: translateY(-30px); }\n            to { opacity: 1; transform: translateY(0); }\n        }\n        \n        .header .badge {\n            display: inline-block;\n            background: rgba(255, 255, 255, 0.2);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            padding: 10px 24px;\n            border-radius: 50px;\n            margin-bottom: 24px;\n            font-size: 0.9rem;\n            font-weight: 600;\n            border: 1px solid rgba(255, 255, 255, 0.3);\n            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);\n            animation: pulse 2s ease-in-out infinite;\n        }\n        \n        @keyframes pulse {\n            0%, 100% { transform: scale(1); }\n            50% { transform: scale(1.05); }\n        }\n        \n        .header h1 { \n            font-size: 4em; \n            margin-bottom: 16px; \n            font-weight: 900;\n            letter-spacing: -2px;\n            text-shadow: 0 4px 20px rgba(0, 0, 0, 0.2);\n            background: linear-gradient(to right, #FFFFFF, #E0F2FE);\n            -webkit-background-clip: text;\n            -webkit-text-fill-color: transparent;\n            background-clip: text;\n        }\n        \n        .header p { \n            font-size: 1.3em; \n            opacity: 0.95; \n            font-weight: 400;\n            text-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);\n            max-width: 600px;\n            margin: 0 auto;\n            line-height: 1.6;\n        }\n        \n        /* Tools Grid */\n        .tools-grid { \n            display: grid; \n            grid-template-columns: repeat(auto-fit, minmax(320px, 1fr)); \n            gap: 24px; \n            margin-bottom: 50px;\n            animation: fadeInUp 0.8s ease;\n        }\n        \n        @keyframes fadeInUp {\n            from { opacity: 0; transform: translateY(30px); }\n            to { opacity: 1; transform: translateY(0); }\n        }\n        \n        /* Tool Card */\n        .tool-card { \n            background: rgba(255, 255, 255, 0.95);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            border-radius: 20px; \n            padding: 36px; \n            text-align: center; \n            box-shadow: \n                0 10px 40px rgba(0, 0, 0, 0.1),\n                0 2px 8px rgba(0, 0, 0, 0.06);\n            transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1); \n            cursor: pointer; \n            border: 1px solid rgba(255, 255, 255, 0.8);\n            position: relative;\n            overflow: hidden;\n        }\n        \n        .tool-card::before {\n            content: \'\';\n            position: absolute;\n            top: 0;\n            left: -100%;\n            width: 100%;\n            height: 100%;\n            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);\n            transition: left 0.5s;\n        }\n        \n        .tool-card:hover::before {\n            left: 100%;\n        }\n        \n        .tool-card:hover { \n            transform: translateY(-12px) scale(1.02); \n            box-shadow: \n                0 20px 60px rgba(0, 102, 204, 0.3),\n                0 8px 16px rgba(0, 0, 0, 0.1);\n            border-color: var(--primary);\n        }\n        \n        .tool-card .icon {\n            font-size: 3.5em;\n            margin-bottom: 20px;\n            display: inline-block;\n            transition: transform 0.3s ease;\n            filter: drop-shadow(0 4px 8px rgba(0, 0, 0, 0.1));\n        }\n        \n        .tool-card:hover .icon {\n            transform: scale(1.1) rotate(5deg);\n        }\n        \n        .tool-card h3 { \n            color: var(--primary); \n            margin-bottom: 16px; \n            font-size: 1.5em; \n            font-weight: 700;\n            letter-spacing: -0.5px;\n        }\n        \n        .tool-card p { \n            color: var(--gray); \n            line-height: 1.7;\n            font-size: 1.05em;\n            font-weight: 400;\n        }\n        \n        /* Upload Area */\n        .upload-area { \n            border: 3px dashed #CBD5E1; \n            border-radius: 20px; \n            padding: 60px 40px; \n            text-align: center; \n            background: linear-gradient(135deg, #F8FAFC 0%, #F1F5F9 100%);\n            margin: 30px 0; \n            transition: all 0.3s ease; \n            cursor: pointer;\n            position: relative;\n        }\n        \n        .upload-area::before {\n            content: \'📤\';\n            position: absolute;\n            top: 50%;\n            left: 50%;\n            transform: translate(-50%, -50%);\n            font-size: 8em;\n            opacity: 0.05;\n            pointer-events: none;\n        }\n        \n        .upload-area:hover { \n            border-color: var(--primary); \n            background: linear-gradient(135deg, #EFF6FF 0%, #DBEAFE 100%);\n            border-width: 3px;\n            transform: scale(1.01);\n        }\n        \n        .upload-area.dragover { \n            border-color: var(--secondary); \n            background: linear-gradient(135deg, #ECFDF5 0%, #D1FAE5 100%); \n            border-width: 4px;\n            transform: scale(1.02);\n        }\n        \n        .upload-area .upload-icon {\n            font-size: 4em;\n            margin-bottom: 20px;\n            display: block;\n            animation: bounce 2s ease-in-out infinite;\n        }\n        \n        @keyframes bounce {\n            0%, 100% { transform: translateY(0); }\n            50% { transform: translateY(-10px); }\n        }\n        \n        .upload-area p {\n            color: var(--gray);\n            font-size: 1.2em;\n            margin-bottom: 20px;\n            font-weight: 500;\n        }\n        \n        .file-input { display: none; }\n        \n        .upload-btn { \n            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);\n            color: white; \n            padding: 16px 40px; \n            border: none; \n            border-radius: 12px; \n            cursor: pointer; \n            font-size: 1.1em; \n            font-weight: 700;\n            transition: all 0.3s ease; \n            box-shadow: 0 4px 20px rgba(0, 102, 204, 0.3);\n            letter-spacing: 0.5px;\n        }\n        \n        .upload-btn:hover { \n            background: linear-gradient(135deg, var(--primary-dark) 0%, var(--primary) 100%);\n            transform: translateY(-3px);\n            box-shadow: 0 8px 30px rgba(0, 102, 204, 0.4);\n        }\n        \n        .upload-btn:active {\n            transform: translateY(-1px);\n        }\n        \n        .convert-btn { \n            background: linear-gradient(135deg, var(--secondary) 0%, var(--secondary-dark) 100%);\n            color: white; \n            padding: 18px 50px; \n            border: none; \n            border-radius: 12px; \n            cursor: pointer; \n            font-size: 1.3em; \n            font-weight: 700;\n            margin-top: 30px; \n            transition: all 0.3s ease; \n            box-shadow: 0 6px 25px rgba(0, 168, 150, 0.3);\n            letter-spacing: 0.5px;\n        }\n        \n        .convert-btn:hover { \n            background: linear-gradient(135deg, var(--secondary-dark) 0%, #006D5F 100%);\n            transform: translateY(-4px);\n            box-shadow: 0 10px 35px rgba(0, 168, 150, 0.4);\n        }\n        \n        .convert-btn:disabled { \n            background: linear-gradient(135deg, #CBD5E1 0%, #94A3B8 100%);\n            cursor: not-allowed; \n            transform: none;\n            box-shadow: none;\n        }\n        \n        /* File List */\n        .file-list { \n            margin-top: 30px; \n        }\n        \n        .file-item { \n            background: white;\n            padding: 18px 24px; \n            margin: 12px 0; \n            border-radius: 12px; \n            display: flex; \n            justify-content: space-between; \n            align-items: center; \n            border: 2px solid #E2E8F0;\n            transition: all 0.3s ease;\n            animation: slideIn 0.3s ease;\n        }\n        \n        @keyframes slideIn {\n            from { opacity: 0; transform: translateX(-20px); }\n            to { opacity: 1; transform: translateX(0); }\n        }\n        \n        .file-item:hover {\n            border-color: var(--primary);\n            box-shadow: 0 4px 15px rgba(0, 102, 204, 0.1);\n            transform: translateX(5px);\n        }\n        \n        .file-item span {\n            color: var(--dark);\n            font-weight: 600;\n            display: flex;\n            align-items: center;\n            gap: 10px;\n        }\n        \n        .file-item span::before {\n            content: \'📄\';\n            font-size: 1.5em;\n        }\n        \n        /* Progress Bar */\n        .progress { \n            width: 100%; \n            background: #E2E8F0; \n            border-radius: 50px; \n            margin: 30px 0; \n            height: 30px;\n            overflow: hidden;\n            box-shadow: inset 0 2px 8px rgba(0, 0, 0, 0.1);\n        }\n        \n        .progress-bar { \n            height: 100%; \n            background: linear-gradient(90deg, var(--primary) 0%, var(--secondary) 100%);\n            border-radius: 50px; \n            width: 0%; \n            transition: width 0.3s ease;\n            position: relative;\n            overflow: hidden;\n            animation: progressAnimation 1.5s ease infinite;\n        }\n        \n        @keyframes progressAnimation {\n            0% { background-position: 0% 50%; }\n            50% { background-position: 100% 50%; }\n            100% { background-position: 0% 50%; }\n        }\n        \n        .progress-bar::before {\n            content: \'\';\n            position: absolute;\n            top: 0;\n            left: -100%;\n            width: 100%;\n            height: 100%;\n            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);\n            animation: shimmer 2s infinite;\n        }\n        \n        @keyframes shimmer {\n            to { left: 100%; }\n        }\n        \n        /* Result Messages */\n        .result { \n            margin-top: 30px; \n            padding: 24px 28px; \n            background: linear-gradient(135deg, #D1FAE5 0%, #A7F3D0 100%);\n            border-radius: 16px; \n            color: #065F46; \n            border: 2px solid var(--success);\n            animation: slideIn 0.4s ease;\n            box-shadow: 0 4px 20px rgba(16, 185, 129, 0.2);\n        }\n        \n        .result h4 {\n            margin-bottom: 12px;\n            font-size: 1.3em;\n            font-weight: 700;\n            display: flex;\n            align-items: center;\n            gap: 10px;\n        }\n        \n        .result p {\n            font-size: 1.05em;\n            line-height: 1.6;\n        }\n        \n        .error { \n            margin-top: 30px; \n            padding: 24px 28px; \n            background: linear-gradient(135deg, #FEE2E2 0%, #FECACA 100%);\n            border-radius: 16px; \n            color: #991B1B; \n            border: 2px solid var(--error);\n            animation: shake 0.5s ease;\n            box-shadow: 0 4px 20px rgba(239, 68, 68, 0.2);\n        }\n        \n        @keyframes shake {\n            0%, 100% { transform: translateX(0); }\n            25% { transform: translateX(-10px); }\n            75% { transform: translateX(10px); }\n        }\n        \n        .error h4 {\n            margin-bottom: 12px;\n            font-size: 1.3em;\n            font-weight: 700;\n        }\n        \n        .hidden { display: none; }\n        \n        /* Back Button */\n        .back-btn { \n            background: rgba(255, 255, 255, 0.95);\n            color: var(--primary); \n            padding: 12px 28px; \n            border: 2px solid var(--primary);\n            border-radius: 12px; \n            cursor: pointer; \n            margin-bottom: 30px; \n            font-weight: 700;\n            font-size: 1.05em;\n            transition: all 0.3s ease;\n            display: inline-flex;\n            align-items: center;\n            gap: 8px;\n            box-shadow: 0 4px 15px rgba(0, 102, 204, 0.2);\n        }\n        \n        .back-btn:hover { \n            background: var(--primary);\n            color: white;\n            transform: translateX(-5px);\n            box-shadow: 0 6px 20px rgba(0, 102, 204, 0.3);\n        }\n        \n        /* Remove Button */\n        .remove-btn {\n            background: linear-gradient(135deg, var(--error) 0%, #DC2626 100%);\n            color: white;\n            border: none;\n            padding: 8px 20px;\n            border-radius: 8px;\n            cursor: pointer;\n            font-weight: 700;\n            font-size: 0.95em;\n            transition: all 0.3s ease;\n            box-shadow: 0 4px 15px rgba(239, 68, 68, 0.2);\n        }\n        \n        .remove-btn:hover {\n            background: linear-gradient(135deg, #DC2626 0%, #B91C1C 100%);\n            transform: translateY(-2px);\n            box-shadow: 0 6px 20px rgba(239, 68, 68, 0.3);\n        }\n        \n        /* Footer */\n        .footer { \n            text-align: center; \n            color: white; \n            margin-top: 80px; \n            padding: 40px 20px; \n            border-top: 1px solid rgba(255, 255, 255, 0.2);\n            background: rgba(0, 0, 0, 0.1);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            border-radius: 20px 20px 0 0;\n        }\n        \n        .footer p { \n            margin-bottom: 12px; \n            opacity: 0.95;\n            font-size: 1.05em;\n            font-weight: 500;\n        }\n        \n        .footer a { \n            color: #FFFFFF; \n            text-decoration: none; \n            font-weight: 700;\n            transition: all 0.3s;\n            padding: 4px 8px;\n            border-radius: 6px;\n        }\n        \n        .footer a:hover { \n            background: rgba(255, 255, 255, 0.2);\n            transform: translateY(-2px);\n        }\n        \n        .footer .security-note {\n            margin-top: 20px;\n            padding: 16px 24px;\n            background: rgba(255, 255, 255, 0.15);\n            backdrop-filter: blur(10px);\n            border-radius: 12px;\n            display: inline-block;\n            font-size: 0.95em;\n            border: 1px solid rgba(255, 255, 255, 0.2);\n        }\n        \n        /* Responsive */\n        @media (max-width: 768px) {\n            .header h1 { font-size: 2.5em; }\n            .tools-grid { grid-template-columns: 1fr; }\n            .tool-card { padding: 28px; }\n            .upload-area { padding: 40px 20px; }\n            .container { padding: 15px; }\n        }\n        \n        /* Loading Animation */\n        @keyframes spin {\n            to { transform: rotate(360deg); }\n        }\n        \n        .loading {\n            display: inline-block;\n            width: 20px;\n            height: 20px;\n            border: 3px solid rgba(255, 255, 255, 0.3);\n            border-radius: 50%;\n            border-top-color: white;\n            animation: spin 0.8s linear infinite;\n        }\n\n        .compress-level {\n            display: flex; flex-direction: column; align-items: center; gap: 6px;\n            padding: 18px 24px; border: 2px solid #E2E8F0; border-radius: 16px;\n            cursor: pointer; background: white; transition: all 0.25s ease;\n            min-width: 130px; box-shadow: 0 2px 8px rgba(0,0,0,0.05);\n        }\n        .compress-level strong { color: var(--dark); font-size: 1em; }\n        .compress-level small  { color: var(--gray); font-size: 0.78em; text-align:center; }\n        .compress-level:hover  { border-color: var(--primary); transform: translateY(-3px); box-shadow: 0 6px 20px rgba(0,102,204,0.15); }\n        .compress-level.active { border-color: var(--primary); background: linear-gradient(135deg,#EFF6FF,#DBEAFE); box-shadow: 0 6px 20px rgba(0,102,204,0.2); }\n        .compress-level.active strong { color: var(--primary); }\n    </style>\n</head>\n<body>\n    <div class="container">\n        <div class="header">\n            <div class="badge">🔒 100% Local & Seguro</div>\n            <h1>📄 NeoConvert</h1>\n            <p>Ferramentas PDF corporativas com total privacidade e segurança</p>\n        </div>\n\n        <div id="home-view">\n            <div class="tools-grid">\n                <div class="tool-card" onclick="showTool(\'pdf-to-images\')">\n                    <div class="icon">🖼️</div>\n                    <h3>PDF para Imagens</h3>\n                    <p>Converta páginas PDF em imagens JPG ou PNG</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'images-to-pdf\')">\n                    <div class="icon">📄</div>\n                    <h3>Imagens para PDF</h3>\n                    <p>Combine várias imagens em um único PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'merge-pdf\')">\n                    <div class="icon">🔗</div>\n                    <h3>Mesclar PDFs</h3>\n                    <p>Combine vários PDFs em um documento único</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'split-pdf\')">\n                    <div class="icon">✂️</div>\n                    <h3>Dividir PDF</h3>\n                    <p>Extraia páginas específicas do seu PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'compress-pdf\')">\n                    <div class="icon">📦</div>\n                    <h3>Comprimir PDF</h3>\n                    <p>Reduza o tamanho do seu arquivo PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'pdf-to-pdfa\')">\n                    <div class="icon">🔒</div>\n                    <h3>PDF para PDF/A</h3>\n                    <p>Padronize seu PDF para arquivamento</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'word-to-pdf\')">\n                    <div class="icon">📝</div>\n                    <h3>Word para PDF</h3>\n                    <p>Converta documentos DOCX para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'excel-to-pdf\')">\n                    <div class="icon">📊</div>\n                    <h3>Excel para PDF</h3>\n                    <p>Converta planilhas XLSX para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'txt-to-pdf\')">\n                    <div class="icon">📃</div>\n                    <h3>TXT para PDF</h3>\n                    <p>Converta arquivos de texto para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'pdf-to-word\')">\n                    <div class="icon">🔄</div>\n                    <h3>PDF para Word</h3>\n                    <p>Converta PDF para Word editável</p>\n                </div>\n            </div>\n        </div>\n\n        <!-- Tool Views -->\n        <div id="tool-views" class="hidden">\n            <button class="back-btn" onclick="showHome()">&larr; Voltar</button>\n            <div class="tool-card">\n                <h3 id="tool-title"></h3>\n                <p id="tool-description"></p>\n\n                <div class="upload-area" id="upload-area" onclick="document.getElementById(\'file-input\').click()">\n                    <input type="file" id="file-input" class="file-input" multiple accept=".pdf,.docx,.jpg,.jpeg,.png,.txt,.xlsx">\n                    <span class="upload-icon">📁</span>\n                    <p>Clique aqui ou arraste arquivos para fazer upload</p>\n                    <button class="upload-btn">Escolher Arquivos</button>\n                </div>\n\n                <div id="file-list" class="file-list"></div>\n\n                <button id="convert-btn" class="convert-btn hidden" onclick="convertFiles()">🚀 Converter Agora</button>\n\n                <div id="compress-options" class="hidden" style="margin:24px 0;">\n                    <p style="font-weight:600;color:var(--dark);margin-bottom:14px;font-size:1.05em;">Nivel de Compressao</p>\n                    <div style="display:flex;gap:12px;flex-wrap:wrap;justify-content:center;">\n                        <label class="compress-level active" data-level="screen">\n                            <input type="radio" name="compress_level" value="screen" checked style="display:none">\n                            <span style="font-size:1.8em;">&#128293;</span>\n                            <strong>Maxima</strong>\n                            <small>72 dpi &bull; menor tamanho</small>\n                        </label>\n                        <label class="compress-level" data-level="ebook">\n                            <input type="radio" name="compress_level" value="ebook" style="display:none">\n                            <span style="font-size:1.8em;">&#9878;&#65039;</span>\n                            <strong>Balanceada</strong>\n                            <small>150 dpi &bull; qualidade ok</small>\n                        </label>\n                        <label class="compress-level" data-level="printer">\n                            <input type="radio" name="compress_level" value="printer" style="display:none">\n                            <span style="font-size:1.8em;">&#128142;</span>\n                            <strong>Leve</strong>\n                            <small>300 dpi &bull; maior qualidade</small>\n                        </label>\n                    </div>\n                </div>\n\n                <div id="progress" class="progress hidden">\n                    <div id="progress-bar" class="progress-bar"></div>\n                </div>\n                <p id="progress-msg" style="text-align:center;color:var(--gray);margin:8px 0 0;font-size:0.9em;min-height:1.3em;"></p>\n\n                <div id="result" class="hidden"></div>\n            </div>\n        </div>\n\n        <div class="footer">\n            <p><strong>NeoConvert</strong> - Ferramenta Corporativa Interna</p>\n            <p>\n                <a href="mailto:ti-infra@neogenomica.com.br">✉️ ti-infra@neogenomica.com.br</a>\n            </p>\n            <div class="security-note">\n                🛡️ Processamento 100% local • Seus arquivos nunca saem da infraestrutura interna\n            </div>\n        </div>\n    </div>\n\n    <script>\n        let currentTool = \'\';\n        let uploadedFiles = [];\n\n        const tools = {\n            \'pdf-to-images\': { title: \'PDF para Imagens\',    description: \'Converta cada pagina do seu PDF em imagens separadas\', accept: \'.pdf\',              multiple: false },\n            \'images-to-pdf\': { title: \'Imagens para PDF\',    description: \'Combine multiplas imagens em um unico arquivo PDF\',    accept: \'.jpg,.jpeg,.png\',   multiple: true  },\n            \'merge-pdf\':     { title: \'Mesclar PDFs\',        description: \'Combine varios arquivos PDF em um documento unico\',    accept: \'.pdf\',              multiple: true  },\n            \'split-pdf\':     { title: \'Dividir PDF\',         description: \'Extraia paginas especificas do seu PDF\',               accept: \'.pdf\',              multiple: false },\n            \'compress-pdf\':  { title: \'Comprimir PDF\',       description: \'Reduza o tamanho do arquivo PDF mantendo a qualidade\', accept: \'.pdf\',              multiple: false },\n            \'pdf-to-pdfa\':   { title: \'PDF para PDF/A\',      description: \'Converta PDFs para o padrao de arquivamento PDF/A-1b\', accept: \'.pdf\',              multiple: true  },\n            \'word-to-pdf\':   { title: \'Word para PDF\',       description: \'Converta documentos Word (.docx) para PDF\',           accept: \'.docx\',             multiple: true  },\n            \'excel-to-pdf\':  { title: \'Excel para PDF\',      description: \'Converta planilhas Excel (.xlsx) para PDF\',           accept: \'.xlsx\',             multiple: false },\n            \'txt-to-pdf\':    { title: \'TXT para PDF\',        description: \'Converta arquivos de texto simples (.txt) para PDF\',  accept: \'.txt\',              multiple: false },\n            \'pdf-to-word\':   { title: \'PDF para Word\',       description: \'Converta seus documentos PDF para Word (.docx)\',      accept: \'.pdf\',              multiple: false }\n        };\n\n        function showTool(toolName) {\n            currentTool = toolName;\n            const tool = tools[toolName];\n            document.getElementById(\'home-view\').classList.add(\'hidden\');\n            document.getElementById(\'tool-views\').classList.remove(\'hidden\');\n            document.getElementById(\'tool-title\').innerText       = tool.title;\n            document.getElementById(\'tool-description\').innerText = tool.description;\n            document.getElementById(\'file-input\').accept   = tool.accept;\n            document.getElementById(\'file-input\').multiple = tool.multiple;\n            uploadedFiles = [];\n            updateFileList();\n            hideResult();\n            const compressOpts = document.getElementById(\'compress-options\');\n            if (compressOpts) compressOpts.classList.toggle(\'hidden\', toolName !== \'compress-pdf\');\n        }\n\n        function showHome() {\n            document.getElementById(\'home-view\').classList.remove(\'hidden\');\n            document.getElementById(\'tool-views\').classList.add(\'hidden\');\n            uploadedFiles = [];\n        }\n\n        function updateFileList() {\n            const fileList   = document.getElementById(\'file-list\');\n            const convertBtn = document.getElementById(\'convert-btn\');\n            if (uploadedFiles.length === 0) {\n                fileList.innerHTML = \'\';\n                convertBtn.classList.add(\'hidden\');\n                return;\n            }\n            fileList.innerHTML = uploadedFiles.map((file, index) => `\n                <div class="file-item">\n                    <span>${file.name} <small style="opacity:0.7">(${(file.size/1024/1024).toFixed(2)} MB)</small></span>\n                    <button onclick="removeFile(${index})" class="remove-btn">Remover</button>\n                </div>`).join(\'\');\n            convertBtn.classList.remove(\'hidden\');\n        }\n\n        function removeFile(index) { uploadedFiles.splice(index, 1); updateFileList(); }\n\n        function hideResult() {\n            document.getElementById(\'result\').classList.add(\'hidden\');\n            document.getElementById(\'progress\').classList.add(\'hidden\');\n            const msg = document.getElementById(\'progress-msg\');\n            if (msg) msg.textContent = \'\';\n        }\n\n        document.addEventListener(\'click\', function(e) {\n            const label = e.target.closest(\'.compress-level\');\n            if (!label) return;\n            document.querySelectorAll(\'.compress-level\').forEach(el => el.classList.remove(\'active\'));\n            label.classList.add(\'active\');\n            label.querySelector(\'input[type=radio]\').checked = true;\n        });\n\n        document.getElementById(\'file-input\').addEventListener(\'change\', function(e) {\n            const files = Array.from(e.target.files);\n            uploadedFiles = tools[currentTool].multiple ? uploadedFiles.concat(files) : files.slice(0,1);\n            updateFileList();\n        });\n\n        const uploadArea = document.getElementById(\'upload-area\');\n        uploadArea.addEventListener(\'dragover\',  e => { e.preventDefault(); uploadArea.classList.add(\'dragover\'); });\n        uploadArea.addEventListener(\'dragleave\', e => { e.preventDefault(); uploadArea.classList.remove(\'dragover\'); });\n        uploadArea.addEventListener(\'drop\', function(e) {\n            e.preventDefault(); uploadArea.classList.remove(\'dragover\');\n            const files = Array.from(e.dataTransfer.files);\n            uploadedFiles = tools[currentTool].multiple ? uploadedFiles.concat(files) : files.slice(0,1);\n            updateFileList();\n        });\n\n        async function convertFiles() {\n            if (uploadedFiles.length === 0) return;\n            const formData = new FormData();\n            uploadedFiles.forEach(file => formData.append(\'files\', file));\n            formData.append(\'tool\', currentTool);\n            if (currentTool === \'compress-pdf\') {\n                const sel = document.querySelector(\'input[name=compress_level]:checked\');\n                formData.append(\'compress_level\', sel ? sel.value : \'ebook\');\n            }\n\n            const progressBar = document.getElementById(\'progress-bar\');\n            const progressMsg = document.getElementById(\'progress-msg\');\n            document.getElementById(\'progress\').classList.remove(\'hidden\');\n            document.getElementById(\'convert-btn\').disabled = true;\n            hideResult();\n            progressBar.style.width = \'5%\';\n            if (progressMsg) progressMsg.textContent = \'Enviando arquivos...\';\n\n            try {\n                const response = await fetch(\'/convert\', { method: \'POST\', body: formData });\n                if (!response.ok) {\n                    const err = await response.json();\n                    throw new Error(err.error || \'Erro ao iniciar conversao\');\n                }\n                const { task_id } = await response.json();\n\n                await new Promise((resolve, reject) => {\n                    const interval = setInterval(async () => {\n                        try {\n                            const res = await fetch(`/progress/${task_id}`);\n                            if (!res.ok) { clearInterval(interval); reject(new Error(\'Erro ao verificar progresso\')); return; }\n                            const prog = await res.json();\n                            progressBar.style.width = prog.progress + \'%\';\n                            if (progressMsg) progressMsg.textContent = prog.message;\n                            if (prog.status === \'done\')  { clearInterval(interval); progressBar.style.width = \'100%\'; resolve(); }\n                            if (prog.status === \'error\') { clearInterval(interval); reject(new Error(prog.message)); }\n                        } catch(e) { clearInterval(interval); reject(e); }\n                    }, 600);\n                });\n\n                if (progressMsg) progressMsg.textContent = \'Baixando arquivo...\';\n                const a = document.createElement(\'a\');\n                a.href = `/download/${task_id}`; a.download = \'\';\n                document.body.appendChild(a); a.click(); document.body.removeChild(a);\n\n                document.getElementById(\'result\').className = \'result\';\n                document.getElementById(\'result\').innerHTML  = \'<h4>Sucesso!</h4><p>Arquivo convertido e baixado com sucesso!</p>\';\n                document.getElementById(\'result\').classList.remove(\'hidden\');\n\n            } catch (error) {\n                document.getElementById(\'result\').className = \'error\';\n                document.getElementById(\'result\').innerHTML  = `<h4>Erro!</h4><p>${error.message || \'Ocorreu um erro. Tente novamente.\'}</p>`;\n                document.getElementById(\'result\').classList.remove(\'hidden\');\n            } finally {\n                setTimeout(() => {\n                    document.getElementById(\'progress\').classList.add(\'hidden\');\n                    progressBar.style.width = \'0%\';\n                    if (progressMsg) progressMsg.textContent = \'\';\n                }, 2000);\n                document.getElementById(\'convert-btn\').disabled = false;\n            }\n        }\n    </script>\n</body>\n</html>\n'
+'\n<!DOCTYPE html>\n<html lang="pt-BR">\n<head>\n    <meta charset="UTF-8">\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n    <title>NeoConvert - Ferramentas PDF</title>\n    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap" rel="stylesheet">\n    <style>\n        * { \n            margin: 0; \n            padding: 0; \n            box-sizing: border-box; \n        }\n        \n        :root {\n            --primary: #0066CC;\n            --primary-dark: #004C99;\n            --primary-light: #3385D6;\n            --secondary: #00A896;\n            --secondary-dark: #008778;\n            --accent: #0099FF;\n            --dark: #1A1A2E;\n            --gray: #64748B;\n            --light-gray: #F1F5F9;\n            --white: #FFFFFF;\n            --success: #10B981;\n            --error: #EF4444;\n            --warning: #F59E0B;\n        }\n        \n        body { \n            font-family: \'Inter\', -apple-system, BlinkMacSystemFont, \'Segoe UI\', sans-serif; \n            background: linear-gradient(135deg, #0066CC 0%, #00A896 100%);\n            min-height: 100vh; \n            position: relative;\n            overflow-x: hidden;\n        }\n        \n        /* Animated background */\n        body::before {\n            content: \'\';\n            position: fixed;\n            top: 0;\n            left: 0;\n            width: 100%;\n            height: 100%;\n            background: \n                radial-gradient(circle at 20% 50%, rgba(0, 168, 150, 0.3) 0%, transparent 50%),\n                radial-gradient(circle at 80% 80%, rgba(0, 102, 204, 0.3) 0%, transparent 50%),\n                radial-gradient(circle at 40% 20%, rgba(0, 153, 255, 0.2) 0%, transparent 50%);\n            animation: gradientShift 15s ease infinite;\n            pointer-events: none;\n            z-index: 0;\n        }\n        \n        @keyframes gradientShift {\n            0%, 100% { opacity: 1; transform: scale(1); }\n            50% { opacity: 0.8; transform: scale(1.1); }\n        }\n        \n        .container { \n            max-width: 1400px; \n            margin: 0 auto; \n            padding: 20px; \n            position: relative;\n            z-index: 1;\n        }\n        \n        /* Header Styles */\n        .header { \n            text-align: center; \n            color: white; \n            margin-bottom: 50px; \n            padding: 60px 20px 40px;\n            animation: fadeInDown 0.8s ease;\n        }\n        \n        @keyframes fadeInDown {\n            from { opacity: 0; transform: translateY(-30px); }\n            to { opacity: 1; transform: translateY(0); }\n        }\n        \n        .header .badge {\n            display: inline-block;\n            background: rgba(255, 255, 255, 0.2);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            padding: 10px 24px;\n            border-radius: 50px;\n            margin-bottom: 24px;\n            font-size: 0.9rem;\n            font-weight: 600;\n            border: 1px solid rgba(255, 255, 255, 0.3);\n            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);\n            animation: pulse 2s ease-in-out infinite;\n        }\n        \n        @keyframes pulse {\n            0%, 100% { transform: scale(1); }\n            50% { transform: scale(1.05); }\n        }\n        \n        .header h1 { \n            font-size: 4em; \n            margin-bottom: 16px; \n            font-weight: 900;\n            letter-spacing: -2px;\n            text-shadow: 0 4px 20px rgba(0, 0, 0, 0.2);\n            background: linear-gradient(to right, #FFFFFF, #E0F2FE);\n            -webkit-background-clip: text;\n            -webkit-text-fill-color: transparent;\n            background-clip: text;\n        }\n        \n        .header p { \n            font-size: 1.3em; \n            opacity: 0.95; \n            font-weight: 400;\n            text-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);\n            max-width: 600px;\n            margin: 0 auto;\n            line-height: 1.6;\n        }\n        \n        /* Tools Grid */\n        .tools-grid { \n            display: grid; \n            grid-template-columns: repeat(auto-fit, minmax(320px, 1fr)); \n            gap: 24px; \n            margin-bottom: 50px;\n            animation: fadeInUp 0.8s ease;\n        }\n        \n        @keyframes fadeInUp {\n            from { opacity: 0; transform: translateY(30px); }\n            to { opacity: 1; transform: translateY(0); }\n        }\n        \n        /* Tool Card */\n        .tool-card { \n            background: rgba(255, 255, 255, 0.95);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            border-radius: 20px; \n            padding: 36px; \n            text-align: center; \n            box-shadow: \n                0 10px 40px rgba(0, 0, 0, 0.1),\n                0 2px 8px rgba(0, 0, 0, 0.06);\n            transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1); \n            cursor: pointer; \n            border: 1px solid rgba(255, 255, 255, 0.8);\n            position: relative;\n            overflow: hidden;\n        }\n        \n        .tool-card::before {\n            content: \'\';\n            position: absolute;\n            top: 0;\n            left: -100%;\n            width: 100%;\n            height: 100%;\n            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);\n            transition: left 0.5s;\n        }\n        \n        .tool-card:hover::before {\n            left: 100%;\n        }\n        \n        .tool-card:hover { \n            transform: translateY(-12px) scale(1.02); \n            box-shadow: \n                0 20px 60px rgba(0, 102, 204, 0.3),\n                0 8px 16px rgba(0, 0, 0, 0.1);\n            border-color: var(--primary);\n        }\n        \n        .tool-card .icon {\n            font-size: 3.5em;\n            margin-bottom: 20px;\n            display: inline-block;\n            transition: transform 0.3s ease;\n            filter: drop-shadow(0 4px 8px rgba(0, 0, 0, 0.1));\n        }\n        \n        .tool-card:hover .icon {\n            transform: scale(1.1) rotate(5deg);\n        }\n        \n        .tool-card h3 { \n            color: var(--primary); \n            margin-bottom: 16px; \n            font-size: 1.5em; \n            font-weight: 700;\n            letter-spacing: -0.5px;\n        }\n        \n        .tool-card p { \n            color: var(--gray); \n            line-height: 1.7;\n            font-size: 1.05em;\n            font-weight: 400;\n        }\n        \n        /* Upload Area */\n        .upload-area { \n            border: 3px dashed #CBD5E1; \n            border-radius: 20px; \n            padding: 60px 40px; \n            text-align: center; \n            background: linear-gradient(135deg, #F8FAFC 0%, #F1F5F9 100%);\n            margin: 30px 0; \n            transition: all 0.3s ease; \n            cursor: pointer;\n            position: relative;\n        }\n        \n        .upload-area::before {\n            content: \'📤\';\n            position: absolute;\n            top: 50%;\n            left: 50%;\n            transform: translate(-50%, -50%);\n            font-size: 8em;\n            opacity: 0.05;\n            pointer-events: none;\n        }\n        \n        .upload-area:hover { \n            border-color: var(--primary); \n            background: linear-gradient(135deg, #EFF6FF 0%, #DBEAFE 100%);\n            border-width: 3px;\n            transform: scale(1.01);\n        }\n        \n        .upload-area.dragover { \n            border-color: var(--secondary); \n            background: linear-gradient(135deg, #ECFDF5 0%, #D1FAE5 100%); \n            border-width: 4px;\n            transform: scale(1.02);\n        }\n        \n        .upload-area .upload-icon {\n            font-size: 4em;\n            margin-bottom: 20px;\n            display: block;\n            animation: bounce 2s ease-in-out infinite;\n        }\n        \n        @keyframes bounce {\n            0%, 100% { transform: translateY(0); }\n            50% { transform: translateY(-10px); }\n        }\n        \n        .upload-area p {\n            color: var(--gray);\n            font-size: 1.2em;\n            margin-bottom: 20px;\n            font-weight: 500;\n        }\n        \n        .file-input { display: none; }\n        \n        .upload-btn { \n            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);\n            color: white; \n            padding: 16px 40px; \n            border: none; \n            border-radius: 12px; \n            cursor: pointer; \n            font-size: 1.1em; \n            font-weight: 700;\n            transition: all 0.3s ease; \n            box-shadow: 0 4px 20px rgba(0, 102, 204, 0.3);\n            letter-spacing: 0.5px;\n        }\n        \n        .upload-btn:hover { \n            background: linear-gradient(135deg, var(--primary-dark) 0%, var(--primary) 100%);\n            transform: translateY(-3px);\n            box-shadow: 0 8px 30px rgba(0, 102, 204, 0.4);\n        }\n        \n        .upload-btn:active {\n            transform: translateY(-1px);\n        }\n        \n        .convert-btn { \n            background: linear-gradient(135deg, var(--secondary) 0%, var(--secondary-dark) 100%);\n            color: white; \n            padding: 18px 50px; \n            border: none; \n            border-radius: 12px; \n            cursor: pointer; \n            font-size: 1.3em; \n            font-weight: 700;\n            margin-top: 30px; \n            transition: all 0.3s ease; \n            box-shadow: 0 6px 25px rgba(0, 168, 150, 0.3);\n            letter-spacing: 0.5px;\n        }\n        \n        .convert-btn:hover { \n            background: linear-gradient(135deg, var(--secondary-dark) 0%, #006D5F 100%);\n            transform: translateY(-4px);\n            box-shadow: 0 10px 35px rgba(0, 168, 150, 0.4);\n        }\n        \n        .convert-btn:disabled { \n            background: linear-gradient(135deg, #CBD5E1 0%, #94A3B8 100%);\n            cursor: not-allowed; \n            transform: none;\n            box-shadow: none;\n        }\n        \n        /* File List */\n        .file-list { \n            margin-top: 30px; \n        }\n        \n        .file-item { \n            background: white;\n            padding: 18px 24px; \n            margin: 12px 0; \n            border-radius: 12px; \n            display: flex; \n            justify-content: space-between; \n            align-items: center; \n            border: 2px solid #E2E8F0;\n            transition: all 0.3s ease;\n            animation: slideIn 0.3s ease;\n        }\n        \n        @keyframes slideIn {\n            from { opacity: 0; transform: translateX(-20px); }\n            to { opacity: 1; transform: translateX(0); }\n        }\n        \n        .file-item:hover {\n            border-color: var(--primary);\n            box-shadow: 0 4px 15px rgba(0, 102, 204, 0.1);\n            transform: translateX(5px);\n        }\n        \n        .file-item span {\n            color: var(--dark);\n            font-weight: 600;\n            display: flex;\n            align-items: center;\n            gap: 10px;\n        }\n        \n        .file-item span::before {\n            content: \'📄\';\n            font-size: 1.5em;\n        }\n        \n        /* Progress Bar */\n        .progress { \n            width: 100%; \n            background: #E2E8F0; \n            border-radius: 50px; \n            margin: 30px 0; \n            height: 30px;\n            overflow: hidden;\n            box-shadow: inset 0 2px 8px rgba(0, 0, 0, 0.1);\n        }\n        \n        .progress-bar { \n            height: 100%; \n            background: linear-gradient(90deg, var(--primary) 0%, var(--secondary) 100%);\n            border-radius: 50px; \n            width: 0%; \n            transition: width 0.3s ease;\n            position: relative;\n            overflow: hidden;\n            animation: progressAnimation 1.5s ease infinite;\n        }\n        \n        @keyframes progressAnimation {\n            0% { background-position: 0% 50%; }\n            50% { background-position: 100% 50%; }\n            100% { background-position: 0% 50%; }\n        }\n        \n        .progress-bar::before {\n            content: \'\';\n            position: absolute;\n            top: 0;\n            left: -100%;\n            width: 100%;\n            height: 100%;\n            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);\n            animation: shimmer 2s infinite;\n        }\n        \n        @keyframes shimmer {\n            to { left: 100%; }\n        }\n        \n        /* Result Messages */\n        .result { \n            margin-top: 30px; \n            padding: 24px 28px; \n            background: linear-gradient(135deg, #D1FAE5 0%, #A7F3D0 100%);\n            border-radius: 16px; \n            color: #065F46; \n            border: 2px solid var(--success);\n            animation: slideIn 0.4s ease;\n            box-shadow: 0 4px 20px rgba(16, 185, 129, 0.2);\n        }\n        \n        .result h4 {\n            margin-bottom: 12px;\n            font-size: 1.3em;\n            font-weight: 700;\n            display: flex;\n            align-items: center;\n            gap: 10px;\n        }\n        \n        .result p {\n            font-size: 1.05em;\n            line-height: 1.6;\n        }\n        \n        .error { \n            margin-top: 30px; \n            padding: 24px 28px; \n            background: linear-gradient(135deg, #FEE2E2 0%, #FECACA 100%);\n            border-radius: 16px; \n            color: #991B1B; \n            border: 2px solid var(--error);\n            animation: shake 0.5s ease;\n            box-shadow: 0 4px 20px rgba(239, 68, 68, 0.2);\n        }\n        \n        @keyframes shake {\n            0%, 100% { transform: translateX(0); }\n            25% { transform: translateX(-10px); }\n            75% { transform: translateX(10px); }\n        }\n        \n        .error h4 {\n            margin-bottom: 12px;\n            font-size: 1.3em;\n            font-weight: 700;\n        }\n        \n        .hidden { display: none; }\n        \n        /* Back Button */\n        .back-btn { \n            background: rgba(255, 255, 255, 0.95);\n            color: var(--primary); \n            padding: 12px 28px; \n            border: 2px solid var(--primary);\n            border-radius: 12px; \n            cursor: pointer; \n            margin-bottom: 30px; \n            font-weight: 700;\n            font-size: 1.05em;\n            transition: all 0.3s ease;\n            display: inline-flex;\n            align-items: center;\n            gap: 8px;\n            box-shadow: 0 4px 15px rgba(0, 102, 204, 0.2);\n        }\n        \n        .back-btn:hover { \n            background: var(--primary);\n            color: white;\n            transform: translateX(-5px);\n            box-shadow: 0 6px 20px rgba(0, 102, 204, 0.3);\n        }\n        \n        /* Remove Button */\n        .remove-btn {\n            background: linear-gradient(135deg, var(--error) 0%, #DC2626 100%);\n            color: white;\n            border: none;\n            padding: 8px 20px;\n            border-radius: 8px;\n            cursor: pointer;\n            font-weight: 700;\n            font-size: 0.95em;\n            transition: all 0.3s ease;\n            box-shadow: 0 4px 15px rgba(239, 68, 68, 0.2);\n        }\n        \n        .remove-btn:hover {\n            background: linear-gradient(135deg, #DC2626 0%, #B91C1C 100%);\n            transform: translateY(-2px);\n            box-shadow: 0 6px 20px rgba(239, 68, 68, 0.3);\n        }\n        \n        /* Footer */\n        .footer { \n            text-align: center; \n            color: white; \n            margin-top: 80px; \n            padding: 40px 20px; \n            border-top: 1px solid rgba(255, 255, 255, 0.2);\n            background: rgba(0, 0, 0, 0.1);\n            backdrop-filter: blur(20px);\n            -webkit-backdrop-filter: blur(20px);\n            border-radius: 20px 20px 0 0;\n        }\n        \n        .footer p { \n            margin-bottom: 12px; \n            opacity: 0.95;\n            font-size: 1.05em;\n            font-weight: 500;\n        }\n        \n        .footer a { \n            color: #FFFFFF; \n            text-decoration: none; \n            font-weight: 700;\n            transition: all 0.3s;\n            padding: 4px 8px;\n            border-radius: 6px;\n        }\n        \n        .footer a:hover { \n            background: rgba(255, 255, 255, 0.2);\n            transform: translateY(-2px);\n        }\n        \n        .footer .security-note {\n            margin-top: 20px;\n            padding: 16px 24px;\n            background: rgba(255, 255, 255, 0.15);\n            backdrop-filter: blur(10px);\n            border-radius: 12px;\n            display: inline-block;\n            font-size: 0.95em;\n            border: 1px solid rgba(255, 255, 255, 0.2);\n        }\n        \n        /* Responsive */\n        @media (max-width: 768px) {\n            .header h1 { font-size: 2.5em; }\n            .tools-grid { grid-template-columns: 1fr; }\n            .tool-card { padding: 28px; }\n            .upload-area { padding: 40px 20px; }\n            .container { padding: 15px; }\n        }\n        \n        /* Loading Animation */\n        @keyframes spin {\n            to { transform: rotate(360deg); }\n        }\n        \n        .loading {\n            display: inline-block;\n            width: 20px;\n            height: 20px;\n            border: 3px solid rgba(255, 255, 255, 0.3);\n            border-radius: 50%;\n            border-top-color: white;\n            animation: spin 0.8s linear infinite;\n        }\n\n        .compress-level {\n            display: flex; flex-direction: column; align-items: center; gap: 6px;\n            padding: 18px 24px; border: 2px solid #E2E8F0; border-radius: 16px;\n            cursor: pointer; background: white; transition: all 0.25s ease;\n            min-width: 130px; box-shadow: 0 2px 8px rgba(0,0,0,0.05);\n        }\n        .compress-level strong { color: var(--dark); font-size: 1em; }\n        .compress-level small  { color: var(--gray); font-size: 0.78em; text-align:center; }\n        .compress-level:hover  { border-color: var(--primary); transform: translateY(-3px); box-shadow: 0 6px 20px rgba(0,102,204,0.15); }\n        .compress-level.active { border-color: var(--primary); background: linear-gradient(135deg,#EFF6FF,#DBEAFE); box-shadow: 0 6px 20px rgba(0,102,204,0.2); }\n        .compress-level.active strong { color: var(--primary); }\n    </style>\n</head>\n<body>\n    <div class="container">\n        <div class="header">\n            <div class="badge">🔒 100% Local & Seguro</div>\n            <h1>📄 NeoConvert</h1>\n            <p>Ferramentas PDF corporativas com total privacidade e segurança</p>\n        </div>\n\n        <div id="home-view">\n            <div class="tools-grid">\n                <div class="tool-card" onclick="showTool(\'pdf-to-images\')">\n                    <div class="icon">🖼️</div>\n                    <h3>PDF para Imagens</h3>\n                    <p>Converta páginas PDF em imagens JPG ou PNG</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'images-to-pdf\')">\n                    <div class="icon">📄</div>\n                    <h3>Imagens para PDF</h3>\n                    <p>Combine várias imagens em um único PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'merge-pdf\')">\n                    <div class="icon">🔗</div>\n                    <h3>Mesclar PDFs</h3>\n                    <p>Combine vários PDFs em um documento único</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'split-pdf\')">\n                    <div class="icon">✂️</div>\n                    <h3>Dividir PDF</h3>\n                    <p>Extraia páginas específicas do seu PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'compress-pdf\')">\n                    <div class="icon">📦</div>\n                    <h3>Comprimir PDF</h3>\n                    <p>Reduza o tamanho do seu arquivo PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'pdf-to-pdfa\')">\n                    <div class="icon">🔒</div>\n                    <h3>PDF para PDF/A</h3>\n                    <p>Padronize seu PDF para arquivamento</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'word-to-pdf\')">\n                    <div class="icon">📝</div>\n                    <h3>Word para PDF</h3>\n                    <p>Converta documentos DOCX para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'excel-to-pdf\')">\n                    <div class="icon">📊</div>\n                    <h3>Excel para PDF</h3>\n                    <p>Converta planilhas XLSX para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'txt-to-pdf\')">\n                    <div class="icon">📃</div>\n                    <h3>TXT para PDF</h3>\n                    <p>Converta arquivos de texto para PDF</p>\n                </div>\n                <div class="tool-card" onclick="showTool(\'pdf-to-word\')">\n                    <div class="icon">🔄</div>\n                    <h3>PDF para Word</h3>\n                    <p>Converta PDF para Word editável</p>\n                </div>\n            </div>\n        </div>\n\n        <!-- Tool Views -->\n        <div id="tool-views" class="hidden">\n            <button class="back-btn" onclick="showHome()">&larr; Voltar</button>\n            <div class="tool-card">\n                <h3 id="tool-title"></h3>\n                <p id="tool-description"></p>\n\n                <div class="upload-area" id="upload-area" onclick="document.getElementById(\'file-input\').click()">\n                    <input type="file" id="file-input" class="file-input" multiple accept=".pdf,.docx,.jpg,.jpeg,.png,.txt,.xlsx">\n                    <span class="upload-icon">📁</span>\n                    <p>Clique aqui ou arraste arquivos para fazer upload</p>\n                    <button class="upload-btn">Escolher Arquivos</button>\n                </div>\n\n                <div id="file-list" class="file-list"></div>\n\n                <button id="convert-btn" class="convert-btn hidden" onclick="convertFiles()">🚀 Converter Agora</button>\n\n                <div id="compress-options" class="hidden" style="margin:24px 0;">\n                    <p style="font-weight:600;color:var(--dark);margin-bottom:14px;font-size:1.05em;">Nivel de Compressao</p>\n                    <div style="display:flex;gap:12px;flex-wrap:wrap;justify-content:center;">\n                        <label class="compress-level active" data-level="screen">\n                            <input type="radio" name="compress_level" value="screen" checked style="display:none">\n                            <span style="font-size:1.8em;">&#128293;</span>\n                            <strong>Maxima</strong>\n                            <small>72 dpi &bull; menor tamanho</small>\n                        </label>\n                        <label class="compress-level" data-level="ebook">\n                            <input type="radio" name="compress_level" value="ebook" style="display:none">\n                            <span style="font-size:1.8em;">&#9878;&#65039;</span>\n                            <strong>Balanceada</strong>\n                            <small>150 dpi &bull; qualidade ok</small>\n                        </label>\n                        <label class="compress-level" data-level="printer">\n                            <input type="radio" name="compress_level" value="printer" style="display:none">\n                            <span style="font-size:1.8em;">&#128142;</span>\n                            <strong>Leve</strong>\n                            <small>300 dpi &bull; maior qualidade</small>\n                        </label>\n                    </div>\n                </div>\n\n                <div id="progress" class="progress hidden">\n                    <div id="progress-bar" class="progress-bar"></div>\n                </div>\n                <p id="progress-msg" style="text-align:center;color:var(--gray);margin:8px 0 0;font-size:0.9em;min-height:1.3em;"></p>\n\n                <div id="result" class="hidden"></div>\n            </div>\n        </div>\n\n        <div class="footer">\n            <p><strong>NeoConvert</strong> - Ferramenta Corporativa Interna</p>\n            <p>\n                <a href="mailto:ti-infra@neogenomica.com.br">✉️ ti-infra@neogenomica.com.br</a>\n            </p>\n            <div class="security-note">\n                🛡️ Processamento 100% local • Seus arquivos nunca saem da infraestrutura interna\n            </div>\n        </div>\n    </div>\n\n    <script>\n        let currentTool = \'\';\n        let uploadedFiles = [];\n\n        const tools = {\n            \'pdf-to-images\': { title: \'PDF para Imagens\',    description: \'Converta cada pagina do seu PDF em imagens separadas\', accept: \'.pdf\',              multiple: false },\n            \'images-to-pdf\': { title: \'Imagens para PDF\',    description: \'Combine multiplas imagens em um unico arquivo PDF\',    accept: \'.jpg,.jpeg,.png\',   multiple: true  },\n            \'merge-pdf\':     { title: \'Mesclar PDFs\',        description: \'Combine varios arquivos PDF em um documento unico\',    accept: \'.pdf\',              multiple: true  },\n            \'split-pdf\':     { title: \'Dividir PDF\',         description: \'Extraia paginas especificas do seu PDF\',               accept: \'.pdf\',              multiple: false },\n            \'compress-pdf\':  { title: \'Comprimir PDF\',       description: \'Reduza o tamanho do arquivo PDF mantendo a qualidade\', accept: \'.pdf\',              multiple: false },\n            \'pdf-to-pdfa\':   { title: \'PDF para PDF/A\',      description: \'Converta PDFs para o padrao de arquivamento PDF/A-1b\', accept: \'.pdf\',              multiple: true  },\n            \'word-to-pdf\':   { title: \'Word para PDF\',       description: \'Converta documentos Word (.docx) para PDF\',           accept: \'.docx\',             multiple: true  },\n            \'excel-to-pdf\':  { title: \'Excel para PDF\',      description: \'Converta planilhas Excel (.xlsx) para PDF\',           accept: \'.xlsx\',             multiple: false },\n            \'txt-to-pdf\':    { title: \'TXT para PDF\',        description: \'Converta arquivos de texto simples (.txt) para PDF\',  accept: \'.txt\',              multiple: false },\n            \'pdf-to-word\':   { title: \'PDF para Word\',       description: \'Converta seus documentos PDF para Word (.docx)\',      accept: \'.pdf\',              multiple: false }\n        };\n\n        function showTool(toolName) {\n            currentTool = toolName;\n            const tool = tools[toolName];\n            document.getElementById(\'home-view\').classList.add(\'hidden\');\n            document.getElementById(\'tool-views\').classList.remove(\'hidden\');\n            document.getElementById(\'tool-title\').innerText       = tool.title;\n            document.getElementById(\'tool-description\').innerText = tool.description;\n            document.getElementById(\'file-input\').accept   = tool.accept;\n            document.getElementById(\'file-input\').multiple = tool.multiple;\n            uploadedFiles = [];\n            updateFileList();\n            hideResult();\n            const compressOpts = document.getElementById(\'compress-options\');\n            if (compressOpts) compressOpts.classList.toggle(\'hidden\', toolName !== \'compress-pdf\');\n        }\n\n        function showHome() {\n            document.getElementById(\'home-view\').classList.remove(\'hidden\');\n            document.getElementById(\'tool-views\').classList.add(\'hidden\');\n            uploadedFiles = [];\n        }\n\n        function updateFileList() {\n            const fileList   = document.getElementById(\'file-list\');\n            const convertBtn = document.getElementById(\'convert-btn\');\n            if (uploadedFiles.length === 0) {\n                fileList.innerHTML = \'\';\n                convertBtn.classList.add(\'hidden\');\n                return;\n            }\n            fileList.innerHTML = uploadedFiles.map((file, index) => `\n                <div class="file-item">\n                    <span>${file.name} <small style="opacity:0.7">(${(file.size/1024/1024).toFixed(2)} MB)</small></span>\n                    <button onclick="removeFile(${index})" class="remove-btn">Remover</button>\n                </div>`).join(\'\');\n            convertBtn.classList.remove(\'hidden\');\n        }\n\n        function removeFile(index) { uploadedFiles.splice(index, 1); updateFileList(); }\n\n        function hideResult() {\n            document.getElementById(\'result\').classList.add(\'hidden\');\n            document.getElementById(\'progress\').classList.add(\'hidden\');\n            const msg = document.getElementById(\'progress-msg\');\n            if (msg) msg.textContent = \'\';\n        }\n\n        document.addEventListener(\'click\', function(e) {\n            const label = e.target.closest(\'.compress-level\');\n            if (!label) return;\n            document.querySelectorAll(\'.compress-level\').forEach(el => el.classList.remove(\'active\'));\n            label.classList.add(\'active\');\n            label.querySelector(\'input[type=radio]\').checked = true;\n        });\n\n        document.getElementById(\'file-input\').addEventListener(\'change\', function(e) {\n            const files = Array.from(e.target.files);\n            uploadedFiles = tools[currentTool].multiple ? uploadedFiles.concat(files) : files.slice(0,1);\n            updateFileList();\n        });\n\n        const uploadArea = document.getElementById(\'upload-area\');\n        uploadArea.addEventListener(\'dragover\',  e => { e.preventDefault(); uploadArea.classList.add(\'dragover\'); });\n        uploadArea.addEventListener(\'dragleave\', e => { e.preventDefault(); uploadArea.classList.remove(\'dragover\'); });\n        uploadArea.addEventListener(\'drop\', function(e) {\n            e.preventDefault(); uploadArea.classList.remove(\'dragover\');\n            const files = Array.from(e.dataTransfer.files);\n            uploadedFiles = tools[currentTool].multiple ? uploadedFiles.concat(files) : files.slice(0,1);\n            updateFileList();\n        });\n\n        // Status finais sem arquivo para baixar (TERMINAL_STATUSES menos "done").\n        const FAILED_STATUSES = {{ failed_statuses|tojson }};\n\n        async function convertFiles() {\n            if (uploadedFiles.length === 0) return;\n            const formData = new FormData();\n            uploadedFiles.forEach(file => formData.append(\'files\', file));\n            formData.append(\'tool\', currentTool);\n            if (currentTool === \'compress-pdf\') {\n                const sel = document.querySelector(\'input[name=compress_level]:checked\');\n                formData.append(\'compress_level\', sel ? sel.value : \'ebook\');\n            }\n\n            const progressBar = document.getElementById(\'progress-bar\');\n            const progressMsg = document.getElementById(\'progress-msg\');\n            document.getElementById(\'progress\').classList.remove(\'hidden\');\n            document.getElementById(\'convert-btn\').disabled = true;\n            hideResult();\n            progressBar.style.width = \'5%\';\n            if (progressMsg) progressMsg.textContent = \'Enviando arquivos...\';\n\n            try {\n                const response = await fetch(\'/convert\', { method: \'POST\', body: formData });\n                if (!response.ok) {\n                    const err = await response.json();\n                    throw new Error(err.error || \'Erro ao iniciar conversao\');\n                }\n                const { task_id } = await response.json();\n\n                await new Promise((resolve, reject) => {\n                    const apply = (prog) => {\n                        progressBar.style.width = prog.progress + \'%\';\n                        if (progressMsg) progressMsg.textContent = prog.message;\n                    };\n                    if (window.EventSource) {\n                        const es = new EventSource(`/progress/${task_id}/stream`);\n                        es.addEventListener(\'progress\', e => apply(JSON.parse(e.data)));\n                        es.addEventListener(\'done\', e => { es.close(); apply(JSON.parse(e.data)); progressBar.style.width = \'100%\'; resolve(); });\n                        FAILED_STATUSES.filter(s => s !== \'error\').forEach(status =>\n                            es.addEventListener(status, e => { es.close(); reject(new Error(JSON.parse(e.data).message)); }));\n                        es.addEventListener(\'error\', e => {\n                            if (e.data) { es.close(); reject(new Error(JSON.parse(e.data).message)); }\n                            else if (es.readyState === EventSource.CLOSED) reject(new Error(\'Erro ao verificar progresso\'));\n                        });\n                        return;\n                    }\n                    const interval = setInterval(async () => {\n                        try {\n                            const res = await fetch(`/progress/${task_id}`);\n                            if (!res.ok) { clearInterval(interval); reject(new Error(\'Erro ao verificar progresso\')); return; }\n                            const prog = await res.json();\n                            progressBar.style.width = prog.progress + \'%\';\n                            if (progressMsg) progressMsg.textContent = prog.message;\n                            if (prog.status === \'done\')  { clearInterval(interval); progressBar.style.width = \'100%\'; resolve(); }\n                            if (FAILED_STATUSES.includes(prog.status)) { clearInterval(interval); reject(new Error(prog.message)); }\n                        } catch(e) { clearInterval(interval); reject(e); }\n                    }, 600);\n                });\n\n                if (progressMsg) progressMsg.textContent = \'Baixando arquivo...\';\n                const a = document.createElement(\'a\');\n                a.href = `/download/${task_id}`; a.download = \'\';\n                document.body.appendChild(a); a.click(); document.body.removeChild(a);\n\n                document.getElementById(\'result\').className = \'result\';\n                document.getElementById(\'result\').innerHTML  = \'<h4>Sucesso!</h4><p>Arquivo convertido e baixado com sucesso!</p>\';\n                document.getElementById(\'result\').classList.remove(\'hidden\');\n\n            } catch (error) {\n                document.getElementById(\'result\').className = \'error\';\n                document.getElementById(\'result\').innerHTML  = `<h4>Erro!</h4><p>${error.message || \'Ocorreu um erro. Tente novamente.\'}</p>`;\n                document.getElementById(\'result\').classList.remove(\'hidden\');\n            } finally {\n                setTimeout(() => {\n                    document.getElementById(\'progress\').classList.add(\'hidden\');\n                    progressBar.style.width = \'0%\';\n                    if (progressMsg) progressMsg.textContent = \'\';\n                }, 2000);\n                document.getElementById(\'convert-btn\').disabled = false;\n            }\n        }\n    </script>\n</body>\n</html>\n'
 )
 
 
 @app.route("/")
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return render_template_string(HTML_TEMPLATE,
+                                  failed_statuses=[s for s in TERMINAL_STATUSES if s != "done"])
 
 
 @app.route("/convert", methods=["POST"])
 def convert():
+    started = time.perf_counter()
     if "files" not in request.files:
         return jsonify({"error": "Nenhum arquivo enviado"}), 400
 
@@ -86,207 +1578,1609 @@ def convert():
         f.save(path)
         saved_paths.append(path)
 
+    try:
+        extra = _tool_options(tool, request.form)
+    except ValueError as exc:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return jsonify({"error": str(exc)}), 400
+
+    try:
+        _submit_task(task_id, tool, saved_paths, temp_dir, extra,
+                     upload_secs=time.perf_counter() - started)
+    except QueueFullError as exc:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return _queue_full_response(exc)
+
+    return jsonify({"task_id": task_id})
+
+
+@app.route("/pipeline", methods=["POST"])
+def pipeline():
+    # Varias ferramentas em sequencia numa unica task. "steps" e uma lista
+    # JSON de objetos {"tool": ..., <parametros da ferramenta>}.
+    started = time.perf_counter()
+    files   = request.files.getlist("files")
+    if not files or files[0].filename == "":
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+    for f in files:
+        if not allowed_file(f.filename):
+            return jsonify({"error": f"Extensao nao permitida: {f.filename}"}), 400
+
+    try:
+        steps = _pipeline_steps(request.form.get("steps", ""),
+                                {f.filename.rsplit(".", 1)[1].lower() for f in files})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    task_id  = str(uuid.uuid4())
+    temp_dir = tempfile.mkdtemp()
+    saved_paths = []
+    for f in files:
+        path = os.path.join(temp_dir, secure_filename(f.filename))
+        f.save(path)
+        saved_paths.append(path)
+
+    extra = {"steps": steps}
+    if request.form.get("cache", "1").lower() in ("0", "false", "no", "off"):
+        extra["cache"] = False
+    try:
+        _submit_task(task_id, "pipeline", saved_paths, temp_dir, extra,
+                     upload_secs=time.perf_counter() - started)
+    except QueueFullError as exc:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return _queue_full_response(exc)
+    return jsonify({"task_id": task_id, "steps": [s["tool"] for s in steps]})
+
+
+def _pipeline_steps(raw: str, input_exts: set) -> list:
+    try:
+        specs = json.loads(raw)
+    except ValueError:
+        raise ValueError("Parametro steps deve ser uma lista JSON") from None
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("Parametro steps deve ser uma lista JSON com ao menos uma etapa")
+    if len(specs) > PIPELINE_MAX_STEPS:
+        raise ValueError(f"Pipeline com mais de {PIPELINE_MAX_STEPS} etapas")
+
+    steps, exts = [], input_exts
+    for idx, spec in enumerate(specs, start=1):
+        if not isinstance(spec, dict) or spec.get("tool") not in TOOL_IO:
+            raise ValueError(f"Etapa {idx}: ferramenta invalida: {spec}")
+        tool = spec["tool"]
+        accepted, produced = TOOL_IO[tool]
+        if not exts <= accepted:
+            raise ValueError(f"Etapa {idx} ({tool}) nao aceita arquivos {', '.join(sorted(exts - accepted))}")
+        params = {k: str(v) for k, v in spec.items() if k != "tool"}
+        options = _tool_options(tool, params)
+        options.pop("cache", None)
+        steps.append(dict(options, tool=tool))
+        if produced == "image":
+            produced = {"jpeg": "jpg"}.get(options["image_format"], options["image_format"])
+        exts = {produced}
+    return steps
+
+
+def _new_task(tool: str, temp_dir: str, upload_secs: float = 0.0, source: str = None) -> dict:
+    return {
+        "progress":     0,
+        "status":       "queued",
+        "message":      "Aguardando na fila...",
+        "result_path":  None,
+        "result_files": [],
+        "cache_hit":    False,
+        "file_errors":  [],
+        "tool":         tool,
+        "source":       source,
+        "timings":      {"upload": round(upload_secs, 3)},
+        "submitted_at": time.time(),
+        "temp_dir":     temp_dir,
+        "expires_at":   time.time() + app.config["TASK_TTL"],
+    }
+
+
+def _submit_task(task_id: str, tool: str, saved_paths: list, temp_dir: str, extra: dict,
+                 input_hashes: list = None, upload_secs: float = 0.0):
+    reaper.start()
+    engine_warmup.start()
+    task_store.create(task_id, _new_task(tool, temp_dir, upload_secs))
+    try:
+        scheduler.submit(task_id, tool, _process_in_background,
+                         task_id, tool, saved_paths, temp_dir, extra, input_hashes)
+    except QueueFullError:
+        task_store.delete(task_id)
+        raise
+    record_stage("upload", upload_secs, tool=tool)
+    metrics.inc("localpdf_bytes_in_total", sum(os.path.getsize(p) for p in saved_paths), tool=tool)
+
+
+@app.route("/batch", methods=["POST"])
+def batch_submit():
+    # Uma task por arquivo, todas com a mesma ferramenta e parametros, criadas
+    # numa unica transacao do store e enfileiradas de uma vez.
+    started = time.perf_counter()
+    files   = request.files.getlist("files")
+    tool    = request.form.get("tool")
+    if not files or files[0].filename == "":
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+    if tool not in TOOL_IO:
+        return jsonify({"error": f"Ferramenta nao suportada: {tool}"}), 400
+    limit = min(app.config["BATCH_MAX_FILES"], scheduler.pool_for(tool).capacity())
+    if len(files) > limit:
+        # Lote que nunca caberia na fila: 413 em vez de um 429 eterno.
+        return jsonify({"error": f"Maximo de {limit} arquivos por lote para {tool}"}), 413
+    for f in files:
+        if not allowed_file(f.filename):
+            return jsonify({"error": f"Extensao nao permitida: {f.filename}"}), 400
+    try:
+        extra = _tool_options(tool, request.form)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    records, jobs, listing, sizes = {}, [], [], 0
+    for f in files:
+        task_id  = str(uuid.uuid4())
+        temp_dir = tempfile.mkdtemp()
+        path     = os.path.join(temp_dir, secure_filename(f.filename))
+        f.save(path)
+        sizes += os.path.getsize(path)
+        records[task_id] = _new_task(tool, temp_dir, source=f.filename)
+        jobs.append((task_id, _process_in_background, (task_id, tool, [path], temp_dir, extra, None)))
+        listing.append({"file": f.filename, "task_id": task_id})
+
+    upload_secs = (time.perf_counter() - started) / len(files)
+    for task in records.values():
+        task["timings"]["upload"] = round(upload_secs, 3)
+    reaper.start()
+    engine_warmup.start()
+    task_store.create_many(records)
+    try:
+        scheduler.submit_many(tool, jobs)
+    except QueueFullError as exc:
+        for task_id, task in records.items():
+            task_store.delete(task_id)
+            shutil.rmtree(task["temp_dir"], ignore_errors=True)
+        return _queue_full_response(exc)
+    record_stage("upload", upload_secs * len(files), tool=tool)
+    metrics.inc("localpdf_bytes_in_total", sizes, tool=tool)
+    return jsonify({"tool": tool, "tasks": listing})
+
+
+def _batch_task_ids() -> list:
+    # task_ids em JSON ({"task_ids": [...]}), formulario ou query string
+    # separados por virgula.
+    payload = request.get_json(silent=True) or {}
+    ids     = payload.get("task_ids")
+    if ids is None:
+        ids = (request.values.get("task_ids") or "").split(",")
+    ids = [str(i).strip() for i in ids if str(i).strip()]
+    if not ids:
+        raise ValueError("Informe task_ids")
+    if len(ids) > app.config["BATCH_MAX_FILES"]:
+        raise ValueError(f"Maximo de {app.config['BATCH_MAX_FILES']} task_ids por requisicao")
+    return list(dict.fromkeys(ids))
+
+
+@app.route("/batch/status", methods=["GET", "POST"])
+def batch_status():
+    try:
+        task_ids = _batch_task_ids()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    tasks     = task_store.get_many(task_ids)
+    positions = scheduler.positions()
+    result    = {}
+    summary   = {}
+    for task_id, task in tasks.items():
+        if task is None:
+            result[task_id] = None
+            summary["not_found"] = summary.get("not_found", 0) + 1
+            continue
+        result[task_id] = _progress_payload(task_id, task, positions)
+        if task.get("source"):
+            result[task_id]["file"] = task["source"]
+        summary[task["status"]] = summary.get(task["status"], 0) + 1
+    return jsonify({"tasks": result, "summary": summary})
+
+
+@app.route("/batch/download", methods=["GET", "POST"])
+def batch_download():
+    # Zip com os resultados de todas as tasks concluidas, uma pasta por task;
+    # as que nao estao prontas vao listadas no manifesto de erros.
+    try:
+        task_ids = _batch_task_ids()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    tasks   = task_store.get_many(task_ids)
+    entries = []
+    pending = []
+    folders = set()
+    done    = []
+    for task_id, task in tasks.items():
+        if task is None or task["status"] != "done" \
+                or not all(os.path.exists(fp) for fp in task["result_files"]):
+            status = "nao encontrada" if task is None else task["status"]
+            detail = "" if task is None else f" - {task['message']}"
+            pending.append(f"{task_id}: {status}{detail}")
+            continue
+        stem   = os.path.splitext(secure_filename(task.get("source") or ""))[0] or task_id
+        folder = stem
+        n      = 1
+        while folder in folders:
+            n     += 1
+            folder = f"{stem}_{n}"
+        folders.add(folder)
+        done.append(task_id)
+        entries += [(fp, f"{folder}/{os.path.basename(fp)}") for fp in task["result_files"]]
+    if not entries:
+        return jsonify({"error": "Nenhuma task concluida", "pending": pending}), 409
+    if pending:
+        entries.append(("\n".join(pending).encode("utf-8") + b"\n", ERROR_MANIFEST))
+    # Como em /download: prazo curto so depois que o zip terminar de sair.
+    task_store.update_many(done, expires_at=time.time() + app.config["TASK_TTL"])
+    response = Response(
+        _stream_zip(entries),
+        mimetype="application/zip",
+        headers={"Content-Disposition": "attachment; filename=batch_results.zip"},
+    )
+    response.call_on_close(lambda: task_store.update_many(
+        done, expires_at=time.time() + app.config["DOWNLOAD_TTL"]))
+    return response
+
+
+def _queue_full_response(exc: QueueFullError):
+    metrics.inc("localpdf_queue_rejected_total", pool=exc.tool_class)
+    resp = jsonify({"error": f"{exc}. Tente novamente em instantes."})
+    resp.headers["Retry-After"] = str(exc.retry_after)
+    return resp, 429
+
+
+# Upload em partes: POST /upload abre a sessao, PUT /upload/<id>/<arquivo> envia
+# cada parte (Content-Range, em qualquer ordem), GET /upload/<id> mostra o que
+# ja chegou e POST /upload/<id>/finalize transforma a sessao em uma task.
+def _merge_ranges(received: list, start: int, end: int) -> list:
+    # Intervalos [inicio, fim) ja gravados, ordenados e sem sobreposicao.
+    merged = []
+    for r_start, r_end in sorted(received + [[start, end]]):
+        if merged and r_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], r_end)
+        else:
+            merged.append([r_start, r_end])
+    return merged
+
+
+def _describe_upload(entry: dict) -> dict:
+    complete = entry["size"] == 0 or entry["received"] == [[0, entry["size"]]]
+    return {"size": entry["size"], "received": entry["received"], "complete": complete}
+
+
+def _touch_upload(session: dict):
+    session["expires_at"] = time.time() + app.config["TASK_TTL"]
+
+
+@app.route("/upload", methods=["POST"])
+def upload_create():
+    reaper.start()
+    engine_warmup.start()
+    upload_id = str(uuid.uuid4())
+    upload_store.create(upload_id, {
+        "temp_dir":    tempfile.mkdtemp(),
+        "files":       {},
+        "upload_secs": 0.0,
+        "expires_at":  time.time() + app.config["TASK_TTL"],
+    })
+    return jsonify({"upload_id": upload_id, "chunk_size": UPLOAD_CHUNK_SIZE,
+                    "max_size": app.config["MAX_UPLOAD_SIZE"]})
+
+
+@app.route("/upload/<upload_id>", methods=["GET"])
+def upload_status(upload_id):
+    session = upload_store.get(upload_id)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    return jsonify({"files": {name: _describe_upload(f) for name, f in session["files"].items()}})
+
+
+@app.route("/upload/<upload_id>", methods=["DELETE"])
+def upload_abort(upload_id):
+    session = upload_store.delete(upload_id)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    shutil.rmtree(session["temp_dir"], ignore_errors=True)
+    return jsonify({"status": "aborted"})
+
+
+@app.route("/upload/<upload_id>/<filename>", methods=["PUT"])
+def upload_chunk(upload_id, filename):
+    name = secure_filename(filename)
+    if not name or not allowed_file(name):
+        return jsonify({"error": f"Extensao nao permitida: {filename}"}), 400
+
+    length = request.content_length or 0
+    content_range = request.headers.get("Content-Range")
+    if content_range:
+        try:
+            unit, _, spec = content_range.partition(" ")
+            span, _, total = spec.partition("/")
+            first, _, last = span.partition("-")
+            start, end, size = int(first), int(last) + 1, int(total)
+        except ValueError:
+            return jsonify({"error": f"Content-Range invalido: {content_range}"}), 400
+        if unit != "bytes" or not 0 <= start < end <= size or end - start != length:
+            return jsonify({"error": f"Content-Range invalido: {content_range}"}), 400
+    else:
+        start, end, size = 0, length, length
+    if size > app.config["MAX_UPLOAD_SIZE"]:
+        return jsonify({"error": "Arquivo excede o tamanho maximo permitido"}), 413
+
+    def register(session):
+        session["files"].setdefault(name, {"size": size, "received": []})
+        _touch_upload(session)
+
+    session = upload_store.modify(upload_id, register)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    expected = session["files"][name]["size"]
+    if expected != size:
+        return jsonify({"error": f"Tamanho divergente para {name}: {size} != {expected}"}), 409
+
+    path = os.path.join(session["temp_dir"], name)
+    # "ab" cria sem apagar: a primeira parte pode chegar por outro worker.
+    with open(path, "ab") as fh:
+        fh.truncate(size)
+    started = time.perf_counter()
+    written = 0
+    with open(path, "r+b") as fh:
+        fh.seek(start)
+        while written < end - start:
+            block = request.stream.read(min(UPLOAD_BLOCK_SIZE, end - start - written))
+            if not block:
+                break
+            fh.write(block)
+            written += len(block)
+    elapsed = time.perf_counter() - started
+
+    def record(session):
+        entry = session["files"][name]
+        if written:
+            entry["received"] = _merge_ranges(entry["received"], start, start + written)
+        session["upload_secs"] += elapsed
+        _touch_upload(session)
+
+    session = upload_store.modify(upload_id, record)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    described = _describe_upload(session["files"][name])
+    if written != end - start:
+        return jsonify({"error": "Parte incompleta, reenvie o restante", **described}), 400
+    return jsonify(described)
+
+
+@app.route("/upload/<upload_id>/finalize", methods=["POST"])
+def upload_finalize(upload_id):
+    session = upload_store.get(upload_id)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    tool  = request.form.get("tool")
+    names = [secure_filename(n) for n in request.form.get("files", "").split(",") if n.strip()]
+    names = names or list(session["files"])
+    if not names:
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+
+    saved_paths = []
+    for name in names:
+        entry = session["files"].get(name)
+        if entry is None:
+            return jsonify({"error": f"Arquivo nao enviado: {name}"}), 400
+        described = _describe_upload(entry)
+        if not described["complete"]:
+            return jsonify({"error": f"Upload incompleto: {name}", **described}), 409
+        saved_paths.append(os.path.join(session["temp_dir"], name))
+
+    try:
+        extra = _tool_options(tool, request.form)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Tira a sessao do store antes de criar a task: dois finalize simultaneos
+    # (em workers diferentes) nao podem gerar duas tasks na mesma pasta.
+    session = upload_store.delete(upload_id)
+    if not session:
+        return jsonify({"error": "Upload nao encontrado"}), 404
+    # As partes podem ter sido gravadas por varios workers: o hash e
+    # calculado aqui, sobre o arquivo completo.
+    input_hashes = [_file_sha256(p) for p in saved_paths]
+    task_id = str(uuid.uuid4())
+    try:
+        _submit_task(task_id, tool, saved_paths, session["temp_dir"], extra, input_hashes,
+                     upload_secs=session["upload_secs"])
+    except QueueFullError as exc:
+        # A sessao continua valida: o cliente pode tentar finalizar de novo.
+        upload_store.create(upload_id, session)
+        return _queue_full_response(exc)
+    return jsonify({"task_id": task_id, "hashes": dict(zip(names, input_hashes))})
+
+
+def _int_option(form, name: str, default: int, lo: int, hi: int) -> int:
+    raw = form.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"Parametro invalido: {name}={raw}") from None
+    return min(max(value, lo), hi)
+
+
+def _tool_options(tool: str, form) -> dict:
+    if tool == "pipeline":
+        # Sem "steps" o pipeline devolveria as entradas como resultado.
+        raise ValueError("Use /pipeline, com steps, para encadear ferramentas")
+    if tool not in TOOL_IO:
+        raise ValueError(f"Ferramenta nao suportada: {tool}")
     extra = {}
+    if form.get("cache", "1").lower() in ("0", "false", "no", "off"):
+        extra["cache"] = False
     if tool == "compress-pdf":
-        level = request.form.get("compress_level", "ebook")
+        level = form.get("compress_level", "ebook")
         if level not in ("screen", "ebook", "printer"):
             level = "ebook"
         extra["compress_level"] = level
-
-    with tasks_lock:
-        tasks[task_id] = {
-            "progress":    0,
-            "status":      "processing",
-            "message":     "Aguardando inicio...",
-            "result_path": None,
-            "temp_dir":    temp_dir,
+    elif tool == "pdf-to-images":
+        image_format = form.get("image_format", "png").lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Formato de imagem nao suportado: {image_format}")
+        extra["pages"]        = form.get("pages", "")
+        extra["dpi"]          = _int_option(form, "dpi", 144, 36, 600)
+        extra["image_format"] = image_format
+        extra["quality"]      = _int_option(form, "quality", 85, 1, 100)
+    elif tool == "images-to-pdf":
+        page_size = form.get("page_size", "original").lower()
+        fit       = form.get("fit", "contain").lower()
+        if page_size not in PAGE_SIZES:
+            raise ValueError(f"Tamanho de pagina nao suportado: {page_size}")
+        if fit not in IMAGE_FITS:
+            raise ValueError(f"Modo de ajuste nao suportado: {fit}")
+        extra["page_size"] = page_size
+        extra["fit"]       = fit
+        extra["margin"]    = _int_option(form, "margin", 0, 0, 144)
+    elif tool == "txt-to-pdf":
+        encoding = form.get("encoding", "auto").strip().lower() or "auto"
+        if encoding != "auto":
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                raise ValueError(f"Codificacao desconhecida: {encoding}") from None
+        extra["encoding"] = encoding
+    elif tool == "pdf-to-word":
+        pages = form.get("pages", "").strip()
+        if not pages and (form.get("start") or form.get("end")):
+            pages = f"{form.get('start') or 1}-{form.get('end') or 'end'}"
+        parallel = form.get("parallel", "auto").lower()
+        if parallel not in ("auto", "0", "1"):
+            raise ValueError(f"Parametro invalido: parallel={parallel}")
+        extra["pages"]    = pages
+        extra["parallel"] = parallel
+    elif tool == "split-pdf":
+        mode = form.get("split_mode", "pages")
+        if mode not in SPLIT_MODES:
+            raise ValueError(f"Modo de divisao nao suportado: {mode}")
+        if mode == "ranges" and not form.get("ranges", "").strip():
+            raise ValueError("Informe os intervalos (ex.: 1-3,7,10-end)")
+        extra["split_mode"] = mode
+        extra["chunk_size"] = _int_option(form, "chunk_size", 1, 1, 100000)
+        extra["ranges"]     = form.get("ranges", "")
+    return extra
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(conversion_cache.stats())
+
+
+def _preview_path(preview_id: str):
+    # preview_id e o sha256 do PDF; qualquer outra coisa nao tem arquivo.
+    if len(preview_id) != 64 or preview_id.strip("0123456789abcdef"):
+        return None
+    path = os.path.join(app.config["PREVIEW_FOLDER"], preview_id + ".pdf")
+    return path if os.path.exists(path) else None
+
+
+def _render_thumbnail(page, width: int, image_format: str, quality: int = 80) -> bytes:
+    zoom = width / page.rect.width
+    pix  = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if image_format == "png":
+        return pix.tobytes("png")
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(
+        buf, IMAGE_FORMATS[image_format], quality=quality)
+    return buf.getvalue()
+
+
+@app.route("/preview", methods=["POST"])
+def preview_upload():
+    # Guarda o PDF para miniaturas sob demanda, sem criar task. PDFs iguais
+    # caem no mesmo preview_id.
+    file = request.files.get("file")
+    if file is None or file.filename == "":
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+    if not file.filename.lower().endswith(".pdf"):
+        return jsonify({"error": f"Pre-visualizacao disponivel apenas para PDF: {file.filename}"}), 400
+    reaper.start()
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=app.config["PREVIEW_FOLDER"])
+    os.close(fd)
+    file.save(tmp_path)
+    preview_id = _file_sha256(tmp_path)
+    path       = os.path.join(app.config["PREVIEW_FOLDER"], preview_id + ".pdf")
+    os.replace(tmp_path, path)
+    error = None
+    try:
+        with preview_docs.open(path) as doc:
+            pages = doc.page_count
+            if doc.needs_pass:
+                error = "PDF protegido por senha"
+    except Exception:
+        error = "PDF invalido"
+    if error:
+        preview_docs.discard(path)
+        os.remove(path)
+        return jsonify({"error": error}), 400
+    return jsonify({"preview_id": preview_id, "pages": pages})
+
+
+@app.route("/preview/<preview_id>/<int:page>")
+def preview_page(preview_id, page):
+    path = _preview_path(preview_id)
+    if path is None:
+        return jsonify({"error": "Pre-visualizacao nao encontrada"}), 404
+    try:
+        width = _int_option(request.args, "width", PREVIEW_WIDTH, *PREVIEW_WIDTHS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    image_format = request.args.get("format", "png")
+    if image_format not in IMAGE_FORMATS:
+        return jsonify({"error": f"Formato de imagem nao suportado: {image_format}"}), 400
+    os.utime(path)
+    # Antes da ETag: uma ETag antiga nao pode dar 304 para pagina inexistente.
+    with preview_docs.open(path) as doc:
+        page_count = doc.page_count
+    if not 1 <= page <= page_count:
+        return jsonify({"error": f"Pagina fora do intervalo (1-{page_count})"}), 404
+
+    # O preview_id ja identifica o conteudo: a ETag sai da chave, sem
+    # renderizar, e um If-None-Match igual responde 304 direto.
+    key  = (preview_id, page, width, image_format)
+    etag = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        data = thumbnail_cache.get(key)
+        if data is None:
+            started = time.perf_counter()
+            with preview_docs.open(path) as doc:
+                data = _render_thumbnail(doc[page - 1], width, image_format)
+            thumbnail_cache.put(key, data)
+            record_stage("render", time.perf_counter() - started, tool="preview")
+        response = Response(data, mimetype=f"image/{image_format}")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+@app.route("/ready")
+def ready():
+    # Pronto quando todos os motores de PRELOAD_ENGINES estao aquecidos.
+    # "failed" lista os que falharam e estao sendo tentados de novo.
+    engine_warmup.start()
+    engines = {
+        name: {
+            "loaded":  engine_loaded(name),
+            "warm":    name in _engine_warm,
+            "seconds": _engine_warm.get(name),
+            "error":   _engine_errors.get(name),
         }
+        for name in ENGINE_MODULES
+    }
+    waiting = [n for n in PRELOAD_ENGINES if n not in _engine_warm]
+    failed  = [n for n in waiting if n in _engine_errors]
+    pending = [n for n in waiting if n not in _engine_errors]
+    status  = 503 if waiting else 200
+    return jsonify({"ready": not waiting, "preload": PRELOAD_ENGINES, "pending": pending,
+                    "failed": failed, "engines": engines}), status
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    pools  = scheduler.stats()
+    cache  = conversion_cache.stats()
+    thumbs = thumbnail_cache.stats()
+    gauges = {
+        "localpdf_queue_depth":            {(("pool", n),): p["queued"] for n, p in pools.items()},
+        "localpdf_active_workers":         {(("pool", n),): p["active"] for n, p in pools.items()},
+        "localpdf_ghostscript_busy":       {(): gs_pool.busy()},
+        "localpdf_cache_hits_total":       {(): cache["hits"]},
+        "localpdf_cache_misses_total":     {(): cache["misses"]},
+        "localpdf_cache_bytes":            {(): cache["bytes"]},
+        "localpdf_preview_docs_open":      {(): len(preview_docs)},
+        "localpdf_thumbnail_hits_total":   {(): thumbs["hits"]},
+        "localpdf_thumbnail_misses_total": {(): thumbs["misses"]},
+        "localpdf_thumbnail_bytes":        {(): thumbs["bytes"]},
+    }
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
 
-    threading.Thread(
-        target=_process_in_background,
-        args=(task_id, tool, saved_paths, temp_dir, extra),
-        daemon=True,
-    ).start()
 
-    return jsonify({"task_id": task_id})
+def _progress_payload(task_id: str, task: dict, positions: dict = None) -> dict:
+    payload = {
+        "progress": task["progress"],
+        "status":   task["status"],
+        "message":  task["message"],
+    }
+    if task["status"] == "queued":
+        payload["queue_position"] = (positions.get(task_id) if positions is not None
+                                     else scheduler.position(task_id))
+    if task.get("details"):
+        payload["details"] = task["details"]
+    if task.get("file_errors"):
+        payload["file_errors"] = task["file_errors"]
+    if task.get("timings"):
+        payload["timings"] = task["timings"]
+    return payload
 
 
 @app.route("/progress/<task_id>")
 def get_progress(task_id):
-    with tasks_lock:
-        task = tasks.get(task_id)
+    task = task_store.get(task_id)
     if not task:
         return jsonify({"error": "Task nao encontrada"}), 404
-    return jsonify({
-        "progress": task["progress"],
-        "status":   task["status"],
-        "message":  task["message"],
-    })
+    return jsonify(_progress_payload(task_id, task))
+
+
+@app.route("/progress/<task_id>/stream")
+def stream_progress(task_id):
+    if task_store.get(task_id) is None:
+        return jsonify({"error": "Task nao encontrada"}), 404
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID", -1))
+    except ValueError:
+        last_seq = -1
+
+    # Com store em memoria so este processo altera a task; com SQLite outro
+    # worker pode estar processando, entao o store e relido periodicamente.
+    local   = isinstance(task_store, MemoryTaskStore)
+    timeout = app.config["SSE_HEARTBEAT"] if local else app.config["SSE_POLL_INTERVAL"]
+
+    def events():
+        nonlocal last_seq
+        yield "retry: 2000\n\n"
+        last_beat     = time.monotonic()
+        last_position = None
+        while True:
+            version = progress_broker.version(task_id)
+            task    = task_store.get(task_id)
+            if task is None:
+                yield 'event: error\ndata: {"message": "Task nao encontrada"}\n\n'
+                return
+            seq      = task.get("seq", 0)
+            terminal = task["status"] in TERMINAL_STATUSES
+            payload  = _progress_payload(task_id, task)
+            # A posicao na fila muda sem alterar a task (jobs a frente saem).
+            position = payload.get("queue_position")
+            if seq != last_seq or position != last_position or terminal:
+                last_seq, last_position = seq, position
+                event    = task["status"] if terminal else "progress"
+                data     = json.dumps(payload)
+                yield f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+                last_beat = time.monotonic()
+                if terminal:
+                    return
+            if not progress_broker.wait(task_id, version, timeout):
+                if time.monotonic() - last_beat >= app.config["SSE_HEARTBEAT"]:
+                    yield ": ping\n\n"
+                    last_beat = time.monotonic()
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/task/<task_id>", methods=["DELETE"])
+def cancel_task(task_id):
+    task = task_store.get(task_id)
+    if not task:
+        return jsonify({"error": "Task nao encontrada"}), 404
+    if task["status"] in TERMINAL_STATUSES:
+        # Ja terminou: apaga a task e libera os arquivos sem esperar o reaper.
+        task_store.delete(task_id)
+        progress_broker.forget(task_id)
+        if task.get("temp_dir"):
+            shutil.rmtree(task["temp_dir"], ignore_errors=True)
+        return jsonify({"task_id": task_id, "status": "deleted"})
+    if scheduler.cancel(task_id):
+        _cancel_task(task_id, task.get("temp_dir"), "cancelled", "Cancelado pelo usuario",
+                     task.get("tool", "unknown"))
+        return jsonify({"task_id": task_id, "status": "cancelled"})
+    # Em execucao (aqui ou em outro processo): o job para no proximo ponto de
+    # cancelamento e a task termina como "cancelled".
+    _cancelled_tasks.add(task_id)
+    _update_task(task_id, cancel_requested=True, message="Cancelando...")
+    return jsonify({"task_id": task_id, "status": "cancelling"}), 202
 
 
 @app.route("/download/<task_id>")
 def download_file(task_id):
-    with tasks_lock:
-        task = tasks.get(task_id)
+    task = task_store.get(task_id)
     if not task:
         return jsonify({"error": "Task nao encontrada"}), 404
+    if task["status"] in ("cancelled", "timeout"):
+        return jsonify({"error": task["message"]}), 410
     if task["status"] != "done":
         return jsonify({"error": "Arquivo ainda nao esta pronto"}), 202
-    if not task["result_path"] or not os.path.exists(task["result_path"]):
+    result_files = task["result_files"]
+    if not result_files or not all(os.path.exists(fp) for fp in result_files):
         return jsonify({"error": "Arquivo de resultado nao encontrado"}), 500
 
-    result_path = task["result_path"]
-    temp_dir    = task["temp_dir"]
-    filename    = os.path.basename(result_path)
-
-    with open(result_path, "rb") as fh:
-        data = fh.read()
-
-    def _cleanup():
-        import time; time.sleep(10)
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        with tasks_lock:
-            tasks.pop(task_id, None)
-
-    threading.Thread(target=_cleanup, daemon=True).start()
-    return send_file(io.BytesIO(data), as_attachment=True, download_name=filename)
-
-
-def _process_in_background(task_id: str, tool: str, saved_paths: list, temp_dir: str, extra: dict = None):
+    # A limpeza fica com o reaper. Enquanto o corpo e enviado a task vale
+    # TASK_TTL; o prazo curto (DOWNLOAD_TTL) so comeca quando o envio termina
+    # ou a conexao cai, e cada retomada via Range renova de novo.
+    started = time.perf_counter()
+    task_store.update(task_id, expires_at=time.time() + app.config["TASK_TTL"])
+
+    if len(result_files) == 1:
+        # Envio direto do disco: usa sendfile quando o servidor suporta e
+        # responde a requisicoes Range (downloads retomaveis).
+        response = send_file(result_files[0], as_attachment=True,
+                             download_name=os.path.basename(result_files[0]), conditional=True)
+    else:
+        response = Response(
+            _stream_zip([(fp, os.path.basename(fp)) for fp in result_files]),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=converted_files.zip"},
+        )
+    stage = "download" if len(result_files) == 1 else "zip"
+    tool  = task.get("tool", "unknown")
+
+    def _record_download():
+        # Chamado quando o corpo termina de ser enviado (ou a conexao cai).
+        elapsed = time.perf_counter() - started
+        record_stage(stage, elapsed, tool=tool)
+        timings = dict(task.get("timings") or {}, **{stage: round(elapsed, 3)})
+        task_store.update(task_id, timings=timings,
+                          expires_at=time.time() + app.config["DOWNLOAD_TTL"])
+
+    response.call_on_close(_record_download)
+    return response
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    # Destino nao-seekable para o ZipFile: acumula o que foi escrito ate o
+    # gerador repassar ao cliente.
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_zip(entries):
+    buf = _ZipStreamBuffer()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path, arcname in entries:
+            if isinstance(path, bytes):
+                # Conteudo gerado na hora (ex.: manifesto de erros do lote).
+                zipf.writestr(arcname, path)
+                continue
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            ext  = os.path.splitext(path)[1].lstrip(".").lower()
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, zipf.open(info, "w") as dest:
+                for block in iter(lambda: src.read(ZIP_CHUNK_SIZE), b""):
+                    dest.write(block)
+                    data = buf.drain()
+                    if data:
+                        yield data
+            yield buf.drain()
+    yield buf.drain()
+
+
+def _process_in_background(task_id: str, tool: str, saved_paths: list, temp_dir: str, extra: dict = None,
+                           input_hashes: list = None):
     if extra is None:
         extra = {}
+    task    = task_store.get(task_id) or {}
+    token   = _job_stages.set({"tool": tool, "timings": dict(task.get("timings") or {})})
+    control = _JobControl(task_id, app.config["JOB_DEADLINES"].get(tool, 0))
+    ctl_tok = _job_control.set(control)
     try:
+        record_stage("queue", max(0.0, time.time() - task.get("submitted_at", time.time())))
+        # Pode ter sido cancelada enquanto esperava na fila de outro processo.
+        _check_cancelled()
         files = [SavedFile(p) for p in saved_paths]
-        set_progress(task_id, 8, "Iniciando processamento...")
 
-        compress_level = extra.get("compress_level", "ebook")
-
-        dispatch = {
-            "pdf-to-images": lambda: pdf_to_images(files[0], temp_dir, task_id),
-            "images-to-pdf": lambda: images_to_pdf(files, temp_dir, task_id),
-            "merge-pdf":     lambda: merge_pdfs(files, temp_dir, task_id),
-            "split-pdf":     lambda: split_pdf(files[0], temp_dir, task_id),
-            "compress-pdf":  lambda: compress_pdf(files[0], temp_dir, task_id, level=compress_level),
-            "pdf-to-pdfa":   lambda: pdf_to_pdfa(files, temp_dir, task_id),
-            "word-to-pdf":   lambda: word_to_pdf(files, temp_dir, task_id),
-            "excel-to-pdf":  lambda: excel_to_pdf(files[0], temp_dir, task_id),
-            "txt-to-pdf":    lambda: txt_to_pdf(files[0], temp_dir, task_id),
-            "pdf-to-word":   lambda: pdf_to_word(files[0], temp_dir, task_id),
-        }
+        cache_key = None
+        if extra.get("cache", True) and conversion_cache.enabled:
+            set_progress(task_id, 5, "Verificando cache...")
+            with stage_timer("cache"):
+                options   = {k: v for k, v in extra.items() if k != "cache"}
+                cache_key = conversion_cache.make_key(tool, options, saved_paths, input_hashes)
+                cache_dir = os.path.join(temp_dir, "cache")
+                os.makedirs(cache_dir, exist_ok=True)
+                cached    = conversion_cache.get(cache_key, cache_dir)
+            if cached:
+                _finish_task(task_id, cached, cache_hit=True)
+                return
 
-        if tool not in dispatch:
-            raise ValueError(f"Ferramenta nao suportada: {tool}")
+        set_progress(task_id, 8, "Iniciando processamento...")
 
-        output_files = dispatch[tool]()
+        with stage_timer("convert"):
+            output_files = _run_tool_sampled(task_id, tool, files, temp_dir, extra)
+        _check_cancelled()
         set_progress(task_id, 95, "Preparando arquivo para download...")
-        result_path = _build_result(output_files, temp_dir)
-
-        with tasks_lock:
-            tasks[task_id]["progress"]    = 100
-            tasks[task_id]["status"]      = "done"
-            tasks[task_id]["message"]     = "Concluido com sucesso!"
-            tasks[task_id]["result_path"] = result_path
+        with stage_timer("store"):
+            result_files = _build_result(output_files)
+            # Resultado parcial (algum arquivo falhou) nao vai para o cache: a
+            # falha pode ser transitoria, como um timeout do Ghostscript.
+            if cache_key and not (task_store.get(task_id) or {}).get("file_errors"):
+                try:
+                    conversion_cache.put(cache_key, result_files)
+                except OSError as exc:
+                    # O cache e so otimizacao: a conversao ja deu certo.
+                    app.logger.warning("Falha ao gravar no cache (%s): %s", tool, exc)
+        _finish_task(task_id, result_files)
 
     except Exception as exc:
-        with tasks_lock:
-            if task_id in tasks:
-                tasks[task_id]["status"]   = "error"
-                tasks[task_id]["message"]  = str(exc)
-                tasks[task_id]["progress"] = 0
+        # As ferramentas embrulham excecoes em RuntimeError; o motivo real do
+        # cancelamento fica no controle do job.
+        if control.reason is not None:
+            _cancel_task(task_id, temp_dir, control.reason, control.message, tool)
+        else:
+            metrics.inc("localpdf_tasks_total", tool=tool, status="error")
+            _update_task(task_id, status="error", message=str(exc), progress=0, timings=_job_timings())
+    finally:
+        _cancelled_tasks.discard(task_id)
+        _job_control.reset(ctl_tok)
+        _job_stages.reset(token)
+
+
+def _run_tool_sampled(task_id: str, tool: str, files: list, temp_dir: str, extra: dict) -> list:
+    # Com PROFILE_SAMPLE_RATE > 0, parte dos jobs roda sob o amostrador de
+    # pilhas; o arquivo .folded fica em PROFILE_FOLDER e o nome vai na task.
+    rate = app.config["PROFILE_SAMPLE_RATE"]
+    if rate <= 0 or random.random() >= rate:
+        return run_tool(tool, files, temp_dir, task_id, extra)
+    sampler = _StackSampler(threading.get_ident(), app.config["PROFILE_INTERVAL"])
+    try:
+        with sampler:
+            return run_tool(tool, files, temp_dir, task_id, extra)
+    finally:
+        os.makedirs(app.config["PROFILE_FOLDER"], exist_ok=True)
+        profile_path = os.path.join(app.config["PROFILE_FOLDER"], f"{tool}_{task_id}.folded")
+        sampler.save(profile_path)
+        task_store.update(task_id, profile=profile_path)
 
 
-def _build_result(output_files, temp_dir):
+def run_tool(tool: str, files: list, temp_dir: str, task_id: str = None, extra: dict = None) -> list:
+    # Executa uma ferramenta sem passar pela fila nem pelo cache (usado pelo
+    # processamento em background e pelo benchmark.py).
+    if extra is None:
+        extra = {}
+    compress_level = extra.get("compress_level", "ebook")
+
+    dispatch = {
+        "pdf-to-images": lambda: pdf_to_images(
+            files[0], temp_dir, task_id,
+            pages=extra.get("pages"), dpi=extra.get("dpi", 144),
+            image_format=extra.get("image_format", "png"), quality=extra.get("quality", 85),
+        ),
+        "images-to-pdf": lambda: images_to_pdf(
+            files, temp_dir, task_id,
+            page_size=extra.get("page_size", "original"), fit=extra.get("fit", "contain"),
+            margin=extra.get("margin", 0),
+        ),
+        "merge-pdf":     lambda: merge_pdfs(files, temp_dir, task_id),
+        "split-pdf":     lambda: split_pdf(
+            files[0], temp_dir, task_id,
+            mode=extra.get("split_mode", "pages"), chunk_size=extra.get("chunk_size", 1),
+            ranges=extra.get("ranges", ""),
+        ),
+        "compress-pdf":  lambda: compress_pdf(files[0], temp_dir, task_id, level=compress_level),
+        "pdf-to-pdfa":   lambda: pdf_to_pdfa(files, temp_dir, task_id),
+        "word-to-pdf":   lambda: word_to_pdf(files, temp_dir, task_id),
+        "excel-to-pdf":  lambda: excel_to_pdf(files[0], temp_dir, task_id),
+        "txt-to-pdf":    lambda: txt_to_pdf(files[0], temp_dir, task_id,
+                                        encoding=extra.get("encoding", "auto")),
+        "pdf-to-word":   lambda: pdf_to_word(files[0], temp_dir, task_id,
+                                         pages=extra.get("pages"), parallel=extra.get("parallel", "auto")),
+        "pipeline":      lambda: run_pipeline(files, temp_dir, task_id, extra.get("steps", [])),
+    }
+
+    if tool not in dispatch:
+        raise ValueError(f"Ferramenta nao suportada: {tool}")
+
+    load_engines(tool)
+    return dispatch[tool]()
+
+
+def _finish_task(task_id: str, result_files: list, cache_hit: bool = False):
+    task    = task_store.get(task_id) or {}
+    failed  = len(task.get("file_errors") or [])
+    message = "Concluido com sucesso!" + (" (cache)" if cache_hit else "")
+    if failed:
+        message = f"Concluido com {failed} arquivo(s) com erro (veja {ERROR_MANIFEST})"
+    tool = (_job_stages.get() or {}).get("tool", "unknown")
+    metrics.inc("localpdf_tasks_total", tool=tool, status="done")
+    metrics.inc("localpdf_bytes_out_total", sum(os.path.getsize(p) for p in result_files), tool=tool)
+    if failed:
+        metrics.inc("localpdf_file_errors_total", failed, tool=tool)
+    _update_task(
+        task_id,
+        progress=100,
+        status="done",
+        message=message,
+        result_files=result_files,
+        result_path=result_files[0] if len(result_files) == 1 else None,
+        cache_hit=cache_hit,
+        timings=_job_timings(),
+    )
+
+
+def _build_result(output_files):
+    # Resultados com varios arquivos nao sao mais zipados em disco: o zip e
+    # gerado sob demanda por _stream_zip no download.
     if not isinstance(output_files, list):
         output_files = [output_files]
-    if len(output_files) == 1:
-        return output_files[0]
-    zip_path = os.path.join(temp_dir, "converted_files.zip")
-    with zipfile.ZipFile(zip_path, "w") as zipf:
-        for fp in output_files:
-            zipf.write(fp, os.path.basename(fp))
-    return zip_path
+    return list(output_files)
+
+
+# Documentos PyMuPDF compartilhados entre as etapas de um pipeline, pela
+# identidade do arquivo (dispositivo, inode): a entrada de uma etapa e um hard
+# link da saida da anterior. Fora de pipelines cada ferramenta abre e fecha.
+_shared_docs = contextvars.ContextVar("shared_docs", default=None)
+
+
+def _file_key(path: str):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+@contextmanager
+def _open_pdf(path: str):
+    # Para leitura: dentro de um pipeline o documento fica aberto para as
+    # etapas seguintes em vez de ser fechado e reaberto.
+    docs = _shared_docs.get()
+    if docs is None:
+        with fitz.open(path) as doc:
+            yield doc
+        return
+    key = _file_key(path)
+    doc = docs.get(key)
+    if doc is None or doc.is_closed:
+        doc = docs[key] = fitz.open(path)
+    yield doc
+
+
+def _share_pdf(path: str, doc) -> bool:
+    # Entrega um documento recem-salvo (sem garbage, numeracao igual a do
+    # arquivo) para as proximas etapas. Devolve False fora de pipelines.
+    docs = _shared_docs.get()
+    if docs is None:
+        return False
+    docs[_file_key(path)] = doc
+    return True
+
+
+def run_pipeline(files: list, temp_dir: str, task_id: str = None, steps: list = ()) -> list:
+    docs      = {}
+    docs_tok  = _shared_docs.set(docs)
+    manifests = []
+    try:
+        current = list(files)
+        total   = len(steps)
+        for idx, step in enumerate(steps):
+            tool     = step["tool"]
+            options  = {k: v for k, v in step.items() if k != "tool"}
+            # Pasta por etapa: saidas com nomes fixos (ex.: compressed.pdf)
+            # nao colidem com as entradas nem com etapas anteriores.
+            step_dir = os.path.join(temp_dir, f"step_{idx + 1}")
+            os.makedirs(step_dir)
+            lo, hi   = 8 + idx * 87 // total, 8 + (idx + 1) * 87 // total
+            prefix   = f"Etapa {idx + 1}/{total} ({tool}): "
+            started  = time.perf_counter()
+
+            batches = [[f] for f in current] if tool in SINGLE_INPUT_TOOLS else [current]
+            outputs = []
+            for b_idx, batch in enumerate(batches):
+                b_lo = lo + b_idx * (hi - lo) // len(batches)
+                b_hi = lo + (b_idx + 1) * (hi - lo) // len(batches)
+                out_dir = step_dir if len(batches) == 1 else os.path.join(step_dir, str(b_idx + 1))
+                os.makedirs(out_dir, exist_ok=True)
+                _check_cancelled()
+                token = _progress_window.set((b_lo, b_hi, prefix))
+                try:
+                    outputs += run_tool(tool, batch, out_dir, task_id, options)
+                finally:
+                    _progress_window.reset(token)
+            record_stage(f"pipeline:{tool}", time.perf_counter() - started)
+
+            manifests += [p for p in outputs if os.path.basename(p) == ERROR_MANIFEST]
+            current = [SavedFile(p) for p in _unique_names(outputs) if os.path.basename(p) != ERROR_MANIFEST]
+            if not current:
+                raise RuntimeError(f"{prefix}nenhum arquivo gerado")
+        return [f.path for f in current] + manifests
+    finally:
+        _shared_docs.reset(docs_tok)
+        for doc in docs.values():
+            if not doc.is_closed:
+                doc.close()
+
+
+def _unique_names(paths: list) -> list:
+    # Etapas por arquivo geram nomes iguais (ex.: varios compressed.pdf):
+    # renomeia as repeticoes para o zip final nao ter entradas duplicadas.
+    seen, unique = set(), []
+    for path in paths:
+        base, ext = os.path.splitext(os.path.basename(path))
+        name, n   = base + ext, 1
+        while name in seen:
+            n   += 1
+            name = f"{base}_{n}{ext}"
+        if name != os.path.basename(path):
+            new_path = os.path.join(os.path.dirname(path), name)
+            os.rename(path, new_path)
+            path = new_path
+        seen.add(name)
+        unique.append(path)
+    return unique
+
+
+def _render_pages(pdf_path: str, jobs: list) -> int:
+    # Roda no pool: abre o PDF uma vez por fatia de paginas e fecha ao fim,
+    # para nenhum processo segurar o arquivo depois que a task termina.
+    with fitz.open(pdf_path) as doc:
+        for job in jobs:
+            _render_doc_page(doc, *job)
+    return len(jobs)
+
+
+def _render_doc_page(doc, page_num: int, dpi: int, image_format: str, quality: int, img_path: str) -> str:
+    pix = doc.load_page(page_num).get_pixmap(dpi=dpi, alpha=False)
+    if image_format == "png":
+        pix.save(img_path)
+    else:
+        mode = "L" if pix.n == 1 else "RGB"
+        img  = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+        img.save(img_path, IMAGE_FORMATS[image_format], quality=quality)
+    return img_path
 
 
-def pdf_to_images(file, temp_dir, task_id=None):
+def pdf_to_images(file, temp_dir, task_id=None, pages=None, dpi=144, image_format="png", quality=85):
     pdf_path = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(pdf_path)
-    doc = fitz.open(pdf_path)
-    total = len(doc)
-    output_files = []
-    for page_num in range(total):
-        if task_id:
-            set_progress(task_id, 10 + int(page_num / total * 80),
-                         f"Convertendo pagina {page_num + 1} de {total}...")
-        page = doc.load_page(page_num)
-        pix  = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        img_path = os.path.join(temp_dir, f"page_{page_num + 1}.png")
-        pix.save(img_path)
-        output_files.append(img_path)
-    doc.close()
-    return output_files
-
+    with _open_pdf(pdf_path) as doc:
+        page_nums = _parse_page_ranges(pages, len(doc))
+    total = len(page_nums)
+    ext   = "jpg" if image_format == "jpeg" else image_format
+    jobs  = [
+        (page_num, dpi, image_format, quality, os.path.join(temp_dir, f"page_{page_num + 1}.{ext}"))
+        for page_num in page_nums
+    ]
 
-def images_to_pdf(files, temp_dir, task_id=None):
-    total  = len(files)
-    images = []
-    for i, file in enumerate(files):
-        if task_id:
-            set_progress(task_id, 10 + int(i / total * 70),
-                         f"Processando imagem {i + 1} de {total}...")
-        img_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(img_path)
-        img = Image.open(img_path)
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        images.append(img)
     if task_id:
-        set_progress(task_id, 85, "Gerando PDF...")
+        set_progress(task_id, 10, f"Convertendo {total} pagina(s) a {dpi} dpi...")
+
+    with stage_timer("render"):
+        if total <= 2 or app.config["PROCESS_WORKERS"] <= 1:
+            with _open_pdf(pdf_path) as doc:
+                for done, job in enumerate(jobs, start=1):
+                    _check_cancelled()
+                    _render_doc_page(doc, *job)
+                    if task_id:
+                        set_progress(task_id, 10 + int(done / total * 80),
+                                     f"Pagina {done} de {total} convertida...")
+        else:
+            # Fatias pequenas o bastante para equilibrar os processos e para o
+            # cancelamento nao esperar muito.
+            size    = max(1, -(-total // (app.config["PROCESS_WORKERS"] * 4)))
+            futures = [_get_process_pool().submit(_render_pages, pdf_path, jobs[i:i + size])
+                       for i in range(0, total, size)]
+            done    = 0
+            try:
+                for future in _as_completed(futures):
+                    done += future.result()
+                    if task_id:
+                        set_progress(task_id, 10 + int(done / total * 80),
+                                     f"Pagina {done} de {total} convertida...")
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    return [job[-1] for job in jobs]
+
+
+class _StreamingPdfWriter:
+    # Escreve o PDF direto no arquivo: cada objeto vai para o disco assim que
+    # fica pronto e so os offsets da xref (e as referencias das paginas) ficam
+    # em memoria. Usado pelos conversores que precisam de memoria constante.
+    def __init__(self, path: str):
+        self._fh      = open(path, "wb")
+        self._offsets = [None]
+        self._pages   = []
+        self._fonts   = {}
+        self._fh.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._pages_ref = self._reserve()
+
+    def _reserve(self) -> int:
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def _write(self, num: int, body: str, stream: bytes = None, stream_path: str = None):
+        self._offsets[num] = self._fh.tell()
+        self._fh.write(f"{num} 0 obj\n{body}\n".encode("latin-1"))
+        if stream is not None or stream_path:
+            self._fh.write(b"stream\n")
+            if stream_path:
+                with open(stream_path, "rb") as src:
+                    shutil.copyfileobj(src, self._fh, 1024 * 1024)
+            else:
+                self._fh.write(stream)
+            self._fh.write(b"\nendstream\n")
+        self._fh.write(b"endobj\n")
+
+    def add_object(self, body: str) -> int:
+        num = self._reserve()
+        self._write(num, body)
+        return num
+
+    def add_image(self, width: int, height: int, colorspace: str, bits: int = 8,
+                  data: bytes = None, path: str = None, filter_: str = "/FlateDecode",
+                  extra: str = "") -> int:
+        # data ja codificada pelo filtro; com path, o arquivo e copiado como esta
+        # (ex.: JPEG embutido sem recodificar via /DCTDecode).
+        length = os.path.getsize(path) if path else len(data)
+        num    = self._reserve()
+        self._write(
+            num,
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {colorspace} /BitsPerComponent {bits} /Filter {filter_} "
+            f"/Length {length} {extra}>>",
+            stream=data, stream_path=path,
+        )
+        return num
+
+    def font(self, base_font: str) -> str:
+        # Fontes padrao (Type1 base 14) com WinAnsiEncoding; devolve o nome do recurso.
+        if base_font not in self._fonts:
+            num = self.add_object(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} "
+                                  f"/Encoding /WinAnsiEncoding >>")
+            self._fonts[base_font] = (f"F{len(self._fonts) + 1}", num)
+        return self._fonts[base_font][0]
+
+    def add_page(self, width: float, height: float, content: bytes, images: dict = None):
+        data        = zlib.compress(content)
+        content_ref = self._reserve()
+        self._write(content_ref, f"<< /Length {len(data)} /Filter /FlateDecode >>", stream=data)
+        fonts = " ".join(f"/{name} {num} 0 R" for name, num in self._fonts.values())
+        xobjs = " ".join(f"/{name} {num} 0 R" for name, num in (images or {}).items())
+        resources = f"<< /Font << {fonts} >> /XObject << {xobjs} >> >>"
+        self._pages.append(self.add_object(
+            f"<< /Type /Page /Parent {self._pages_ref} 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+            f"/Resources {resources} /Contents {content_ref} 0 R >>"
+        ))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # Com erro (ou cancelamento) o arquivo parcial e descartado em vez de
+        # ganhar xref e trailer e parecer um PDF valido.
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self):
+        self._fh.close()
+        os.remove(self._fh.name)
+
+    def close(self):
+        kids = " ".join(f"{num} 0 R" for num in self._pages)
+        self._write(self._pages_ref, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>")
+        catalog = self.add_object(f"<< /Type /Catalog /Pages {self._pages_ref} 0 R >>")
+        xref_at = self._fh.tell()
+        lines   = [f"xref\n0 {len(self._offsets)}\n", "0000000000 65535 f \n"]
+        lines  += [f"{off:010d} 00000 n \n" for off in self._offsets[1:]]
+        self._fh.write("".join(lines).encode("ascii"))
+        self._fh.write(f"trailer\n<< /Size {len(self._offsets)} /Root {catalog} 0 R >>\n"
+                       f"startxref\n{xref_at}\n%%EOF\n".encode("ascii"))
+        self._fh.close()
+
+
+def _embed_image(writer: _StreamingPdfWriter, img_path: str):
+    # JPEG em RGB/cinza/CMYK vai para o PDF como esta; so decodifica o que o
+    # PDF nao aceita direto (transparencia, paleta, 16 bits, etc.).
+    with Image.open(img_path) as img:
+        width, height = img.size
+        if img.format == "JPEG" and img.mode in ("RGB", "L", "CMYK"):
+            colorspace = {"RGB": "/DeviceRGB", "L": "/DeviceGray", "CMYK": "/DeviceCMYK"}[img.mode]
+            # JPEGs CMYK gravados pelo Photoshop (marcador Adobe) vem invertidos.
+            decode = "/Decode [1 0 1 0 1 0 1 0] " if img.mode == "CMYK" and "adobe" in img.info else ""
+            return writer.add_image(width, height, colorspace, path=img_path,
+                                    filter_="/DCTDecode", extra=decode), width, height
+        if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = img.convert("RGBA")
+            flat = Image.new("RGB", img.size, (255, 255, 255))
+            flat.paste(rgba, mask=rgba.getchannel("A"))
+            rgba.close()
+        elif img.mode in ("RGB", "L"):
+            img.load()
+            flat = img
+        else:
+            flat = img.convert("RGB")
+        colorspace = "/DeviceGray" if flat.mode == "L" else "/DeviceRGB"
+        data = zlib.compress(flat.tobytes(), 6)
+        if flat is not img:
+            flat.close()
+    return writer.add_image(width, height, colorspace, data=data), width, height
+
+
+def _image_placement(img_w: int, img_h: int, page_size: str, fit: str, margin: int):
+    size = PAGE_SIZES.get(page_size)
+    if size is None:
+        return img_w + 2 * margin, img_h + 2 * margin, margin, margin, img_w, img_h
+    page_w, page_h = size if img_h >= img_w else (size[1], size[0])
+    box_w, box_h   = page_w - 2 * margin, page_h - 2 * margin
+    if fit == "fill":
+        return page_w, page_h, margin, margin, box_w, box_h
+    scale = min(box_w / img_w, box_h / img_h)
+    draw_w, draw_h = img_w * scale, img_h * scale
+    return page_w, page_h, (page_w - draw_w) / 2, (page_h - draw_h) / 2, draw_w, draw_h
+
+
+def images_to_pdf(files, temp_dir, task_id=None, page_size="original", fit="contain", margin=0):
+    total    = len(files)
     pdf_path = os.path.join(temp_dir, "images_to_pdf.pdf")
-    images[0].save(pdf_path, save_all=True, append_images=images[1:])
+    with _StreamingPdfWriter(pdf_path) as writer:
+        for i, file in enumerate(files):
+            _check_cancelled()
+            if task_id:
+                set_progress(task_id, 10 + int(i / total * 80),
+                             f"Processando imagem {i + 1} de {total}...")
+            img_path = os.path.join(temp_dir, secure_filename(file.filename))
+            file.save(img_path)
+            xobj, img_w, img_h = _embed_image(writer, img_path)
+            page_w, page_h, x, y, draw_w, draw_h = _image_placement(img_w, img_h, page_size, fit, margin)
+            content = f"q {draw_w:.2f} 0 0 {draw_h:.2f} {x:.2f} {y:.2f} cm /Im0 Do Q".encode("ascii")
+            writer.add_page(page_w, page_h, content, images={"Im0": xobj})
     return [pdf_path]
 
 
+ERROR_MANIFEST = "erros.txt"
+
+
+def _run_per_file(executor, fn, jobs: list, names: list, task_id=None, label="Processando",
+                  lo: int = 10, hi: int = 80):
+    # Executa fn(*args) de cada job no executor e devolve os resultados na
+    # ordem original (None onde falhou) e a lista de erros por arquivo.
+    results, errors, total = [None] * len(jobs), {}, len(jobs)
+    futures = {executor.submit(fn, *args): idx for idx, args in enumerate(jobs)}
+    try:
+        for done, future in enumerate(_as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                errors[idx] = str(e) or e.__class__.__name__
+            if task_id:
+                set_progress(task_id, lo + int(done / total * (hi - lo)),
+                             f"{label}: {done} de {total} arquivos...")
+    finally:
+        for future in futures:
+            future.cancel()
+    return results, [{"file": names[idx], "error": errors[idx]} for idx in sorted(errors)]
+
+
+def _report_file_errors(task_id, temp_dir: str, errors: list, total: int) -> list:
+    # Um arquivo ruim nao derruba o lote: grava o manifesto de erros, que vai
+    # junto do resultado parcial. So falha a task se nada foi processado.
+    if not errors:
+        return []
+    if len(errors) == total:
+        first = errors[0]
+        raise RuntimeError(f"Nenhum arquivo foi processado. {first['file']}: {first['error']}")
+    if task_id:
+        _update_task(task_id, file_errors=errors)
+    manifest_path = os.path.join(temp_dir, ERROR_MANIFEST)
+    with open(manifest_path, "w", encoding="utf-8") as fh:
+        fh.write(f"{len(errors)} de {total} arquivo(s) nao puderam ser processados:\n\n")
+        for err in errors:
+            fh.write(f"{err['file']}: {err['error']}\n")
+    return [manifest_path]
+
+
 def merge_pdfs(files, temp_dir, task_id=None):
-    total      = len(files)
+    total     = len(files)
+    pdf_paths = []
+    for file in files:
+        pdf_path = os.path.join(temp_dir, secure_filename(file.filename))
+        file.save(pdf_path)
+        pdf_paths.append(pdf_path)
+
+    # Serial, na ordem original: cada PDF e aberto uma unica vez, validado e
+    # copiado; os que falham vao para o relatorio de erros.
+    errors     = []
     merged_doc = fitz.open()
-    for i, file in enumerate(files):
+    for i, (pdf_path, file) in enumerate(zip(pdf_paths, files)):
+        _check_cancelled()
         if task_id:
             set_progress(task_id, 10 + int(i / total * 80),
                          f"Mesclando arquivo {i + 1} de {total}...")
-        pdf_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(pdf_path)
-        doc = fitz.open(pdf_path)
-        merged_doc.insert_pdf(doc)
-        doc.close()
+        try:
+            with _open_pdf(pdf_path) as doc:
+                if doc.needs_pass:
+                    raise ValueError("PDF protegido por senha")
+                if doc.page_count == 0:
+                    raise ValueError("PDF sem paginas")
+                merged_doc.insert_pdf(doc)
+        except ValueError as e:
+            errors.append({"file": file.filename, "error": str(e)})
+        except Exception as e:
+            errors.append({"file": file.filename, "error": f"PDF invalido: {e}"})
+    extra_files = _report_file_errors(task_id, temp_dir, errors, total)
     if task_id:
         set_progress(task_id, 90, "Salvando PDF final...")
     output_path = os.path.join(temp_dir, "merged.pdf")
     merged_doc.save(output_path)
-    merged_doc.close()
-    return [output_path]
+    if not _share_pdf(output_path, merged_doc):
+        merged_doc.close()
+    return [output_path] + extra_files
+
+
+def _split_groups(doc, mode: str, chunk_size: int, ranges: str) -> list:
+    # Lista de (nome do arquivo, primeira pagina, ultima pagina), 0-based.
+    total = len(doc)
+    if mode == "chunk":
+        bounds = [(s, min(s + chunk_size, total) - 1) for s in range(0, total, chunk_size)]
+    elif mode == "ranges":
+        bounds = [(g[0], g[-1]) for g in _parse_page_groups(ranges, total)]
+        # Intervalos iguais gerariam o mesmo nome e o arquivo seria
+        # sobrescrito (e listado duas vezes no zip).
+        repeated = [f"{a + 1}" if a == b else f"{a + 1}-{b + 1}"
+                    for a, b in dict.fromkeys(bounds) if bounds.count((a, b)) > 1]
+        if repeated:
+            raise ValueError(f"Intervalo de paginas repetido: {', '.join(repeated)}")
+    elif mode == "bookmarks":
+        starts = [(title, page - 1) for level, title, page, *_ in doc.get_toc(simple=True)
+                  if level == 1 and 1 <= page <= total]
+        if not starts:
+            raise ValueError("O PDF nao possui marcadores para dividir")
+        if starts[0][1] > 0:
+            starts.insert(0, ("inicio", 0))
+        groups = []
+        for idx, (title, first) in enumerate(starts):
+            last = starts[idx + 1][1] - 1 if idx + 1 < len(starts) else total - 1
+            if last >= first:
+                name = secure_filename(title)[:60] or "secao"
+                groups.append((f"{len(groups) + 1:02d}_{name}.pdf", first, last))
+        return groups
+    else:
+        bounds = [(p, p) for p in range(total)]
+    return [
+        (f"page_{a + 1}.pdf" if a == b else f"pages_{a + 1}-{b + 1}.pdf", a, b)
+        for a, b in bounds
+    ]
 
 
-def split_pdf(file, temp_dir, task_id=None):
+def split_pdf(file, temp_dir, task_id=None, mode="pages", chunk_size=1, ranges=""):
     pdf_path = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(pdf_path)
-    doc   = fitz.open(pdf_path)
-    total = len(doc)
+    # Subpasta propria: evita sobrescrever a entrada (ex.: "page_1.pdf").
+    out_dir = os.path.join(temp_dir, "split")
+    os.makedirs(out_dir, exist_ok=True)
     output_files = []
-    for page_num in range(total):
-        if task_id:
-            set_progress(task_id, 10 + int(page_num / total * 80),
-                         f"Extraindo pagina {page_num + 1} de {total}...")
-        new_doc = fitz.open()
-        new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-        output_path = os.path.join(temp_dir, f"page_{page_num + 1}.pdf")
-        new_doc.save(output_path)
-        new_doc.close()
-        output_files.append(output_path)
-    doc.close()
+    with _open_pdf(pdf_path) as doc:
+        groups = _split_groups(doc, mode, chunk_size, ranges)
+        total  = len(groups)
+        for idx, (name, first, last) in enumerate(groups):
+            _check_cancelled()
+            if task_id:
+                set_progress(task_id, 10 + int(idx / total * 80),
+                             f"Gerando arquivo {idx + 1} de {total} (paginas {first + 1}-{last + 1})...")
+            # insert_pdf copia apenas os objetos alcancaveis pelas paginas do
+            # intervalo; garbage/deflate removem sobras e comprimem os streams.
+            new_doc = fitz.open()
+            new_doc.insert_pdf(doc, from_page=first, to_page=last)
+            output_path = os.path.join(out_dir, name)
+            new_doc.save(output_path, garbage=3, deflate=True)
+            new_doc.close()
+            output_files.append(output_path)
     return output_files
 
 
+def _xref_length(doc, xref: int) -> int:
+    kind, value = doc.xref_get_key(xref, "Length")
+    if kind == "xref":
+        # /Length indireto ("12 0 R"), comum em PDFs do TeX e do Office.
+        kind, value = "int", doc.xref_object(int(value.split()[0]), compressed=True).strip()
+    try:
+        return int(value) if kind == "int" else len(doc.xref_stream_raw(xref) or b"")
+    except ValueError:
+        return len(doc.xref_stream_raw(xref) or b"")
+
+
+def _analyze_pdf(doc) -> dict:
+    # Levantamento barato (so dicionarios, sem decodificar streams) das
+    # imagens, fontes e streams sem compressao do documento.
+    images = {}
+    fonts  = {}
+    for page in doc:
+        meta = {img[0]: img for img in page.get_images(full=True)}
+        for info in page.get_image_info(xrefs=True):
+            xref = info["xref"]
+            if not xref or xref not in meta:
+                continue
+            _, smask, width, height, bpc, colorspace, _, _, codec, _ = meta[xref]
+            shown_w = max(abs(info["bbox"][2] - info["bbox"][0]), 1e-3) / 72
+            shown_h = max(abs(info["bbox"][3] - info["bbox"][1]), 1e-3) / 72
+            dpi     = max(width / shown_w, height / shown_h)
+            entry   = images.setdefault(xref, {
+                "xref": xref, "width": width, "height": height, "bpc": bpc,
+                "colorspace": colorspace, "codec": codec or "raw", "dpi": 0,
+                "bytes": _xref_length(doc, xref),
+                "masked": doc.xref_get_key(xref, "ImageMask")[1] == "true"
+                          or doc.xref_get_key(xref, "Decode")[0] != "null",
+            })
+            # Vale o maior tamanho exibido (menor DPI) entre as ocorrencias.
+            entry["dpi"] = dpi if not entry["dpi"] else min(entry["dpi"], dpi)
+        for xref, ext, font_type, basefont, *_ in page.get_fonts(full=True):
+            fonts.setdefault(xref, {
+                "name":     basefont,
+                "type":     font_type,
+                "embedded": ext != "n/a",
+                "subset":   "+" in basefont,
+            })
+
+    image_xrefs = set(images)
+    unfiltered  = 0
+    for xref in range(1, doc.xref_length()):
+        if xref not in image_xrefs and doc.xref_is_stream(xref) \
+                and doc.xref_get_key(xref, "Filter")[0] == "null":
+            unfiltered += _xref_length(doc, xref)
+    return {"images": list(images.values()), "fonts": list(fonts.values()),
+            "unfiltered_bytes": unfiltered}
+
+
+def _compress_plan(analysis: dict, file_size: int, dpi: int, level: str) -> dict:
+    quality   = {"screen": 30, "ebook": 50, "printer": 75}.get(level, 50)
+    oversized = [
+        img for img in analysis["images"]
+        if img["dpi"] > dpi * COMPRESS_DPI_SLACK and img["bytes"] >= COMPRESS_MIN_IMAGE_BYTES
+    ]
+    # Estimativa: a imagem cai com o quadrado da escala; se ja nao era JPEG,
+    # vira JPEG (~0.15 byte por pixel e canal).
+    image_savings = 0
+    for img in oversized:
+        scale     = dpi / img["dpi"]
+        channels  = 1 if img["colorspace"] in ("DeviceGray", "CalGray") else 3
+        new_bytes = img["width"] * img["height"] * scale * scale * channels * 0.15
+        if img["codec"] == "DCTDecode":
+            new_bytes = min(new_bytes, img["bytes"] * scale * scale)
+        image_savings += max(0, img["bytes"] - int(new_bytes))
+    lossless_savings = int(analysis["unfiltered_bytes"] * 0.6)
+    # Fontes embutidas inteiras: so o Ghostscript gera subconjuntos.
+    full_fonts = [f for f in analysis["fonts"] if f["embedded"] and not f["subset"]]
+    unsupported = [img for img in oversized if img["masked"] or img["bpc"] < 8
+                   or img["codec"] in ("JBIG2Decode", "CCITTFaxDecode")]
+
+    if unsupported or (full_fonts and not oversized):
+        plan, reason = "ghostscript", (
+            f"{len(unsupported)} imagem(ns) grandes em formato nao suportado" if unsupported
+            else f"{len(full_fonts)} fonte(s) embutidas sem subconjunto")
+        estimate = image_savings + lossless_savings
+    elif oversized:
+        plan, reason = "images", f"{len(oversized)} imagem(ns) acima de {dpi} dpi"
+        estimate = image_savings + lossless_savings
+    elif lossless_savings >= file_size * COMPRESS_MIN_SAVINGS:
+        plan, reason = "lossless", "streams sem compressao"
+        estimate = lossless_savings
+    else:
+        plan, reason = "skip", "nada relevante a reduzir"
+        estimate = 0
+
+    estimate = min(estimate, file_size)
+    return {
+        "plan":              plan,
+        "reason":            reason,
+        "target_dpi":        dpi,
+        "jpeg_quality":      quality,
+        "images":            len(analysis["images"]),
+        "oversized_images":  len(oversized),
+        "fonts":             len(analysis["fonts"]),
+        "full_fonts":        len(full_fonts),
+        "input_bytes":       file_size,
+        "estimated_savings": estimate,
+        "estimated_ratio":   round(estimate / file_size, 3) if file_size else 0,
+        "_oversized":        oversized,
+    }
+
+
+def _recompress_images(pdf_path: str, jobs: list) -> list:
+    # Roda no pool de processos: abre o PDF uma vez por fatia de imagens e
+    # fecha ao fim, sem deixar o arquivo aberto no processo.
+    with fitz.open(pdf_path) as doc:
+        return [_recompress_image(doc, *job) for job in jobs]
+
+
+def _recompress_image(doc, xref: int, scale: float, quality: int, out_path: str):
+    # Decodifica a imagem, reduz e grava em JPEG.
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    mode = "L" if pix.n == 1 else "RGB"
+    img  = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    size = (max(1, round(pix.width * scale)), max(1, round(pix.height * scale)))
+    img.resize(size, Image.LANCZOS).save(out_path, "JPEG", quality=quality, optimize=True)
+    return xref, size[0], size[1], mode
+
+
+def _compress_images(pdf_path: str, output_path: str, plan: dict, task_id=None) -> int:
+    # Recomprime so as imagens grandes, em paralelo, e grava sem perdas o
+    # restante. Devolve quantas imagens foram de fato trocadas.
+    img_dir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+    images  = plan["_oversized"]
+    jobs    = [
+        (img["xref"], plan["target_dpi"] / img["dpi"], plan["jpeg_quality"],
+         os.path.join(img_dir, f"{img['xref']}.jpg"))
+        for img in images
+    ]
+    size    = max(1, -(-len(jobs) // (app.config["PROCESS_WORKERS"] * 2)))
+    pool    = _get_process_pool()
+    futures = [pool.submit(_recompress_images, pdf_path, jobs[i:i + size])
+               for i in range(0, len(jobs), size)]
+    results  = (result for future in _as_completed(futures) for result in future.result())
+    replaced = 0
+    try:
+        with fitz.open(pdf_path) as doc:
+            old_sizes = {img["xref"]: img["bytes"] for img in images}
+            for done, (xref, width, height, mode) in enumerate(results, start=1):
+                jpg_path = os.path.join(img_dir, f"{xref}.jpg")
+                if os.path.getsize(jpg_path) < old_sizes[xref]:
+                    with open(jpg_path, "rb") as fh:
+                        doc.update_stream(xref, fh.read(), compress=0)
+                    doc.xref_set_key(xref, "Filter", "/DCTDecode")
+                    doc.xref_set_key(xref, "DecodeParms", "null")
+                    doc.xref_set_key(xref, "Width", str(width))
+                    doc.xref_set_key(xref, "Height", str(height))
+                    doc.xref_set_key(xref, "BitsPerComponent", "8")
+                    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if mode == "L" else "/DeviceRGB")
+                    replaced += 1
+                if task_id:
+                    set_progress(task_id, 30 + int(done / len(jobs) * 50),
+                                 f"Recomprimindo imagens: {done} de {len(jobs)}...")
+            doc.save(output_path, garbage=4, deflate=True)
+    finally:
+        for future in futures:
+            future.cancel()
+        shutil.rmtree(img_dir, ignore_errors=True)
+    return replaced
+
+
 def compress_pdf(file, temp_dir, task_id=None, level="ebook"):
     # Configuracoes por nivel:
     #   screen  = 72 dpi  - compressao maxima
@@ -304,10 +3198,58 @@ def compress_pdf(file, temp_dir, task_id=None, level="ebook"):
     pdf_path    = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(pdf_path)
     output_path = os.path.join(temp_dir, "compressed.pdf")
+    orig_size   = os.path.getsize(pdf_path)
+
+    if task_id:
+        set_progress(task_id, 10, f"Compressao {name} - analisando documento...")
+
+    # Analise antes de comprimir: evita a passada completa do Ghostscript
+    # quando ela nao ganharia nada (ex.: PDF so de texto) e escolhe o plano.
+    try:
+        with stage_timer("analyze"), _open_pdf(pdf_path) as doc:
+            plan = _compress_plan(_analyze_pdf(doc), orig_size, dpi, level)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao analisar PDF: {e}") from e
+    details = {k: v for k, v in plan.items() if not k.startswith("_")}
+    if task_id:
+        _update_task(task_id, details=details)
+
+    if plan["plan"] == "skip":
+        if task_id:
+            set_progress(task_id, 85, "PDF ja esta otimizado, mantendo o original...")
+        return [pdf_path]
+
+    if plan["plan"] == "lossless":
+        if task_id:
+            set_progress(task_id, 40, "Recomprimindo streams sem perdas...")
+        with fitz.open(pdf_path) as doc:
+            doc.save(output_path, garbage=4, deflate=True)
+    elif plan["plan"] == "images":
+        if task_id:
+            set_progress(task_id, 30, f"Recomprimindo {details['oversized_images']} imagem(ns) ({name})...")
+        try:
+            details["replaced_images"] = _compress_images(pdf_path, output_path, plan, task_id)
+        except Exception as e:
+            raise RuntimeError(f"Erro ao comprimir PDF: {e}") from e
+    else:
+        if task_id:
+            set_progress(task_id, 20, f"Compressao {name} - preparando...")
+        _compress_with_ghostscript(pdf_path, output_path, level, dpi, name, task_id)
+
+    if task_id:
+        set_progress(task_id, 85, "Verificando resultado...")
 
+    comp_size = os.path.getsize(output_path)
+    details["output_bytes"] = min(comp_size, orig_size)
     if task_id:
-        set_progress(task_id, 20, f"Compressao {name} - preparando...")
+        _update_task(task_id, details=details)
+    if comp_size >= orig_size:
+        return [pdf_path]
+    return [output_path]
+
 
+def _compress_with_ghostscript(pdf_path: str, output_path: str, level: str, dpi: int, name: str,
+                               task_id=None):
     gs_args = [
         "gs",
         "-dBATCH",
@@ -345,206 +3287,571 @@ def compress_pdf(file, temp_dir, task_id=None, level="ebook"):
         set_progress(task_id, 40, f"Comprimindo com Ghostscript ({name})...")
 
     try:
-        ghostscript.Ghostscript(*gs_bytes)
+        gs_pool.run(gs_bytes)
     except Exception as e:
         raise RuntimeError(f"Erro ao comprimir PDF: {e}") from e
 
-    if task_id:
-        set_progress(task_id, 85, "Verificando resultado...")
 
-    orig_size = os.path.getsize(pdf_path)
-    comp_size = os.path.getsize(output_path)
-    if comp_size >= orig_size:
-        return [pdf_path]
-    return [output_path]
+def _pdfa_one(input_path: str, output_path: str):
+    gs_args = [
+        "gs", "-dPDFA=1", "-dBATCH", "-dNOPAUSE", "-dNOOUTERSAVE",
+        "-dUseCIEColor", "-sProcessColorModel=DeviceRGB", "-sDEVICE=pdfwrite",
+        "-sColorConversionStrategy=UseDeviceIndependentColor",
+        "-dPDFACompatibilityPolicy=1",
+        f"-sOutputFile={output_path}", input_path,
+    ]
+    gs_pool.run([a.encode("utf-8") if isinstance(a, str) else a for a in gs_args])
+    return output_path
 
 
 def pdf_to_pdfa(files, temp_dir, task_id=None):
     if not isinstance(files, list):
         files = [files]
-    total        = len(files)
-    output_files = []
-    for i, file in enumerate(files):
-        if task_id:
-            set_progress(task_id, 10 + int(i / total * 80),
-                         f"Convertendo {file.filename} para PDF/A ({i + 1}/{total})...")
+    total = len(files)
+    jobs  = []
+    for file in files:
         input_path = os.path.join(temp_dir, secure_filename(file.filename))
         file.save(input_path)
         base_name, _ = os.path.splitext(os.path.basename(input_path))
-        output_path  = os.path.join(temp_dir, f"{base_name}_pdfa.pdf")
-        gs_args = [
-            "gs", "-dPDFA=1", "-dBATCH", "-dNOPAUSE", "-dNOOUTERSAVE",
-            "-dUseCIEColor", "-sProcessColorModel=DeviceRGB", "-sDEVICE=pdfwrite",
-            "-sColorConversionStrategy=UseDeviceIndependentColor",
-            "-dPDFACompatibilityPolicy=1",
-            f"-sOutputFile={output_path}", input_path,
-        ]
-        gs_args = [a.encode("utf-8") if isinstance(a, str) else a for a in gs_args]
-        try:
-            ghostscript.Ghostscript(*gs_args)
-        except Exception as e:
-            raise RuntimeError(f"Erro ao converter {file.filename} para PDF/A: {e}") from e
-        output_files.append(output_path)
-    return output_files
-
+        jobs.append((input_path, os.path.join(temp_dir, f"{base_name}_pdfa.pdf")))
 
-def word_to_pdf(files, temp_dir, task_id=None):
+    if task_id:
+        set_progress(task_id, 10, f"Convertendo {total} arquivo(s) para PDF/A...")
+    # Cada arquivo ocupa um processo do GhostscriptPool; as threads so esperam
+    # e herdam o contexto do job para o tempo do Ghostscript entrar na task.
+    ctx = contextvars.copy_context()
+    run = lambda *args: ctx.copy().run(_pdfa_one, *args)
+    with ThreadPoolExecutor(max_workers=min(total, gs_pool.size)) as executor:
+        results, errors = _run_per_file(executor, run, jobs, [f.filename for f in files],
+                                        task_id, "Convertendo para PDF/A", hi=90)
+    if total == 1 and errors:
+        raise RuntimeError(f"Erro ao converter {files[0].filename} para PDF/A: {errors[0]['error']}")
+    extra_files = _report_file_errors(task_id, temp_dir, errors, total)
+    return [path for path in results if path] + extra_files
+
+
+def _docx_to_pdf(docx_path: str, pdf_path: str, title: str = None) -> str:
+    # Roda no pool de processos: cada .docx vira um PDF proprio, que
+    # word_to_pdf concatena depois na ordem original.
     from docx import Document
 
-    if not isinstance(files, list):
-        files = [files]
+    try:
+        doc = Document(docx_path)
+    except Exception as e:
+        raise ValueError(f"Documento Word invalido: {e}") from None
 
-    pdf_path      = os.path.join(temp_dir, "word_to_pdf.pdf")
-    c             = canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
+    c             = canvas.Canvas(pdf_path, pagesize=LETTER)
+    width, height = LETTER
     y_position    = height - 50
-    total         = len(files)
 
+    if title:
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(50, y_position, "=" * 60); y_position -= 20
+        c.drawString(50, y_position, f"Documento: {title}"); y_position -= 20
+        c.drawString(50, y_position, "=" * 60); y_position -= 30
+        c.setFont("Helvetica", 11)
+
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            chars_per_line = int((width - 100) / 6)
+            words, lines, current_line = paragraph.text.split(), [], []
+            for word in words:
+                if len(" ".join(current_line + [word])) <= chars_per_line:
+                    current_line.append(word)
+                else:
+                    if current_line: lines.append(" ".join(current_line))
+                    current_line = [word]
+            if current_line: lines.append(" ".join(current_line))
+            for line in lines:
+                if y_position < 50: c.showPage(); y_position = height - 50
+                c.drawString(50, y_position, line); y_position -= 20
+
+    for table in doc.tables:
+        y_position -= 10
+        if y_position < 100: c.showPage(); y_position = height - 50
+        c.setFont("Helvetica", 9)
+        for row in table.rows:
+            row_text = " | ".join(cell.text for cell in row.cells)
+            if len(row_text) > 100: row_text = row_text[:97] + "..."
+            if y_position < 50: c.showPage(); y_position = height - 50
+            c.drawString(50, y_position, row_text); y_position -= 15
+        y_position -= 10; c.setFont("Helvetica", 11)
+
+    c.save()
+    return pdf_path
+
+
+def word_to_pdf(files, temp_dir, task_id=None):
+    if not isinstance(files, list):
+        files = [files]
+
+    total    = len(files)
+    part_dir = tempfile.mkdtemp(dir=temp_dir)
+    jobs     = []
     for file_idx, file in enumerate(files):
-        if task_id:
-            set_progress(task_id, 10 + int(file_idx / total * 80),
-                         f"Convertendo {file.filename} ({file_idx + 1}/{total})...")
         docx_path = os.path.join(temp_dir, secure_filename(file.filename))
         file.save(docx_path)
-        doc = Document(docx_path)
+        part_path = os.path.join(part_dir, f"{file_idx:04d}.pdf")
+        # A partir do segundo documento, cada um abre com um cabecalho.
+        jobs.append((docx_path, part_path, file.filename if file_idx > 0 else None))
 
-        if file_idx > 0:
-            c.showPage(); y_position = height - 50
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y_position, "=" * 60); y_position -= 20
-            c.drawString(50, y_position, f"Documento: {file.filename}"); y_position -= 20
-            c.drawString(50, y_position, "=" * 60); y_position -= 30
-            c.setFont("Helvetica", 11)
-
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                chars_per_line = int((width - 100) / 6)
-                words, lines, current_line = paragraph.text.split(), [], []
-                for word in words:
-                    if len(" ".join(current_line + [word])) <= chars_per_line:
-                        current_line.append(word)
-                    else:
-                        if current_line: lines.append(" ".join(current_line))
-                        current_line = [word]
-                if current_line: lines.append(" ".join(current_line))
-                for line in lines:
-                    if y_position < 50: c.showPage(); y_position = height - 50
-                    c.drawString(50, y_position, line); y_position -= 20
-
-        for table in doc.tables:
-            y_position -= 10
-            if y_position < 100: c.showPage(); y_position = height - 50
-            c.setFont("Helvetica", 9)
-            for row in table.rows:
-                row_text = " | ".join(cell.text for cell in row.cells)
-                if len(row_text) > 100: row_text = row_text[:97] + "..."
-                if y_position < 50: c.showPage(); y_position = height - 50
-                c.drawString(50, y_position, row_text); y_position -= 15
-            y_position -= 10; c.setFont("Helvetica", 11)
+    try:
+        results, errors = _run_per_file(_get_process_pool(), _docx_to_pdf, jobs,
+                                        [f.filename for f in files], task_id, "Convertendo documentos")
+        extra_files = _report_file_errors(task_id, temp_dir, errors, total)
 
-    c.save()
-    return [pdf_path]
+        if task_id:
+            set_progress(task_id, 85, "Juntando documentos...")
+        pdf_path = os.path.join(temp_dir, "word_to_pdf.pdf")
+        merged   = fitz.open()
+        for part_path in results:
+            if part_path:
+                _check_cancelled()
+                with fitz.open(part_path) as part:
+                    merged.insert_pdf(part)
+        merged.save(pdf_path, garbage=3, deflate=True)
+        merged.close()
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    return [pdf_path] + extra_files
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.replace("\n", " ").replace("\r", " ")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%d/%m/%Y %H:%M" if value.time() != datetime.time() else "%d/%m/%Y")
+    if isinstance(value, datetime.date):
+        return value.strftime("%d/%m/%Y")
+    return str(value).replace("\n", " ").replace("\r", " ")
+
+
+def _fit_text(text: str, widths, max_width: float) -> str:
+    if sum(map(widths.__getitem__, text)) <= max_width + 0.01:
+        return text
+    budget = max_width - widths["."] * 3
+    used   = 0.0
+    for idx, char in enumerate(text):
+        used += widths[char]
+        if used > budget:
+            return text[:idx] + "..."
+    return text
+
+
+class _SheetLayout:
+    # Desenha uma aba como tabela: cabecalho repetido em cada pagina e colunas
+    # que nao cabem na largura divididas em faixas (uma pagina por faixa).
+    def __init__(self, writer, sheet_name: str, sample: list, widths, bold_widths):
+        self.writer      = writer
+        self.sheet_name  = sheet_name
+        self.widths      = widths
+        self.bold_widths = bold_widths
+        self.regular     = writer.font("Helvetica")
+        self.bold        = writer.font("Helvetica-Bold")
+        self.ncols       = max(len(row) for row in sample)
+        self.header      = self.cells(sample[0])
+
+        min_w, max_w = EXCEL_COL_WIDTHS
+        col_widths = [sum(map(bold_widths.__getitem__, text)) for text, _ in self.header]
+        for row in sample[1:]:
+            for idx, (text, _) in enumerate(self.cells(row)):
+                col_widths[idx] = max(col_widths[idx], sum(map(widths.__getitem__, text)))
+        self.col_widths = [min(max(w + 2 * EXCEL_CELL_PADDING, min_w), max_w) for w in col_widths]
+
+        portrait_w = LETTER[0] - 2 * EXCEL_MARGIN
+        self.page_w, self.page_h = LETTER if sum(self.col_widths) <= portrait_w else LETTER[::-1]
+        self._build_bands()
+        usable_h = self.page_h - 2 * EXCEL_MARGIN - 20
+        self.rows_per_page = max(1, int(usable_h / EXCEL_ROW_HEIGHT) - 1)
+        self.page_no = 0
+
+    def _build_bands(self):
+        usable_w   = self.page_w - 2 * EXCEL_MARGIN
+        self.bands = [[]]
+        band_width = 0.0
+        for idx, w in enumerate(self.col_widths):
+            if self.bands[-1] and band_width + w > usable_w:
+                self.bands.append([])
+                band_width = 0.0
+            self.bands[-1].append(idx)
+            band_width += w
+        letter = openpyxl.utils.get_column_letter
+        self.band_labels = [f"{letter(band[0] + 1)}-{letter(band[-1] + 1)}" for band in self.bands]
+
+    def _widen(self, row):
+        # Linha alem da amostra com mais colunas (ex.: planilha sem a
+        # dimensao gravada): acrescenta as colunas em vez de corta-las.
+        min_w, max_w = EXCEL_COL_WIDTHS
+        extra        = len(row) - self.ncols
+        self.ncols   = len(row)
+        self.header += [("", False)] * extra
+        for value in row[-extra:]:
+            w = sum(map(self.widths.__getitem__, _cell_text(value)))
+            self.col_widths.append(min(max(w + 2 * EXCEL_CELL_PADDING, min_w), max_w))
+        self._build_bands()
+
+    def cells(self, row) -> list:
+        if len(row) > self.ncols and any(v is not None for v in row[self.ncols:]):
+            self._widen(row)
+        row = tuple(row[:self.ncols]) + (None,) * (self.ncols - len(row))
+        return [(_cell_text(v), isinstance(v, (int, float)) and not isinstance(v, bool)) for v in row]
+
+    def render(self, rows: list):
+        self.page_no += 1
+        # Linhas lidas antes de _widen ficaram com menos celulas.
+        rows = [row + [("", False)] * (self.ncols - len(row)) for row in rows]
+        for band_idx, band in enumerate(self.bands):
+            self._render_band(rows, band, band_idx)
+
+    def _render_band(self, rows: list, band: list, band_idx: int):
+        left  = EXCEL_MARGIN
+        top   = self.page_h - EXCEL_MARGIN - 20
+        width = sum(self.col_widths[i] for i in band)
+        lines = len(rows) + 1
+        ops   = []
+
+        title = f"Planilha: {self.sheet_name} | Pagina {self.page_no}"
+        if len(self.bands) > 1:
+            title += f" | Colunas {self.band_labels[band_idx]} ({band_idx + 1}/{len(self.bands)})"
+        ops.append(f"BT /{self.bold} 10 Tf {left} {self.page_h - EXCEL_MARGIN - 10:.2f} Td ".encode("ascii")
+                   + _pdf_text(title) + b" Tj ET")
+
+        # Fundo do cabecalho e grade.
+        ops.append(f"0.88 g {left} {top - EXCEL_ROW_HEIGHT:.2f} {width:.2f} {EXCEL_ROW_HEIGHT} re f 0 g"
+                   .encode("ascii"))
+        grid = ["0.6 G 0.4 w"]
+        for i in range(lines + 1):
+            y = top - i * EXCEL_ROW_HEIGHT
+            grid.append(f"{left} {y:.2f} m {left + width:.2f} {y:.2f} l")
+        x = left
+        bottom = top - lines * EXCEL_ROW_HEIGHT
+        for i in band + [None]:
+            grid.append(f"{x:.2f} {top:.2f} m {x:.2f} {bottom:.2f} l")
+            if i is not None:
+                x += self.col_widths[i]
+        grid.append("S 0 G")
+        ops.append("\n".join(grid).encode("ascii"))
+
+        text_ops = [b"BT"]
+        for line_idx, row in enumerate([self.header] + rows):
+            font, widths = (self.bold, self.bold_widths) if line_idx == 0 else (self.regular, self.widths)
+            text_ops.append(f"/{font} {EXCEL_FONT_SIZE} Tf".encode("ascii"))
+            y = top - (line_idx + 1) * EXCEL_ROW_HEIGHT + 4
+            x = left
+            for i in band:
+                text, numeric = row[i]
+                col_w = self.col_widths[i]
+                if text:
+                    text = _fit_text(text, widths, col_w - 2 * EXCEL_CELL_PADDING)
+                    tx   = x + EXCEL_CELL_PADDING
+                    if numeric:
+                        tx = x + col_w - EXCEL_CELL_PADDING - sum(map(widths.__getitem__, text))
+                    text_ops.append(f"1 0 0 1 {tx:.2f} {y:.2f} Tm ".encode("ascii") + _pdf_text(text) + b" Tj")
+                x += col_w
+        text_ops.append(b"ET")
+        ops.append(b"\n".join(text_ops))
+        self.writer.add_page(self.page_w, self.page_h, b"\n".join(ops))
+
+
+def _message_page(writer, text: str):
+    font = writer.font("Helvetica")
+    writer.add_page(LETTER[0], LETTER[1],
+                    f"BT /{font} 10 Tf 50 {LETTER[1] - 50:.0f} Td ".encode("ascii") + _pdf_text(text) + b" Tj ET")
 
 
 def excel_to_pdf(file, temp_dir, task_id=None):
-    xlsx_path     = os.path.join(temp_dir, secure_filename(file.filename))
+    xlsx_path   = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(xlsx_path)
-    pdf_path      = os.path.join(temp_dir, "excel_to_pdf.pdf")
-    c             = canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
-    y_position    = height - 50
+    pdf_path    = os.path.join(temp_dir, "excel_to_pdf.pdf")
+    widths      = _GlyphWidths("Helvetica", EXCEL_FONT_SIZE)
+    bold_widths = _GlyphWidths("Helvetica-Bold", EXCEL_FONT_SIZE)
+    workbook    = None
 
     if task_id: set_progress(task_id, 20, "Lendo planilha...")
 
-    try:
-        workbook     = openpyxl.load_workbook(xlsx_path)
-        total_sheets = len(workbook.sheetnames)
-        for sheet_idx, sheet_name in enumerate(workbook.sheetnames):
-            if task_id:
-                set_progress(task_id, 20 + int(sheet_idx / total_sheets * 65),
-                             "Processando aba " + sheet_name + "...")
-            sheet = workbook[sheet_name]
-            c.setFont("Helvetica", 10)
-            c.drawString(50, y_position, f"--- Planilha: {sheet_name} ---"); y_position -= 20
-            for row in sheet.iter_rows():
-                row_data  = [str(cell.value) if cell.value is not None else "" for cell in row]
-                line_text = " | ".join(row_data)
-                max_chars = int((width - 100) / 6)
-                if len(line_text) > max_chars: line_text = line_text[:max_chars] + "..."
-                if y_position < 50:
-                    c.showPage(); y_position = height - 50; c.setFont("Helvetica", 10)
-                c.drawString(50, y_position, line_text); y_position -= 15
-            y_position -= 30
-            if y_position < 50 and sheet_name != workbook.sheetnames[-1]:
-                c.showPage(); y_position = height - 50
-    except Exception as e:
-        c.drawString(50, y_position - 20, f"Erro ao ler planilha: {e}")
-
-    c.save()
+    with _StreamingPdfWriter(pdf_path) as writer:
+        try:
+            # read_only + values_only: linhas lidas sob demanda, sem estilos em memoria.
+            workbook     = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+            total_sheets = len(workbook.sheetnames)
+            for sheet_idx, sheet_name in enumerate(workbook.sheetnames):
+                if task_id:
+                    set_progress(task_id, 20 + int(sheet_idx / total_sheets * 65),
+                                 "Processando aba " + sheet_name + "...")
+                rows   = workbook[sheet_name].iter_rows(values_only=True)
+                sample = [row for row in islice(rows, EXCEL_SAMPLE_ROWS) if row]
+                if not sample:
+                    _message_page(writer, f"Planilha: {sheet_name} (vazia)")
+                    continue
+                layout    = _SheetLayout(writer, sheet_name, sample, widths, bold_widths)
+                page_rows = []
+                for count, row in enumerate(chain(sample[1:], rows), start=1):
+                    page_rows.append(layout.cells(row or ()))
+                    if len(page_rows) == layout.rows_per_page:
+                        _check_cancelled()
+                        layout.render(page_rows)
+                        page_rows = []
+                        if task_id and count % (layout.rows_per_page * 20) == 0:
+                            set_progress(task_id, 20 + int(sheet_idx / total_sheets * 65),
+                                         f"Processando aba {sheet_name} ({count} linhas)...")
+                if page_rows or layout.page_no == 0:
+                    layout.render(page_rows)
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            _message_page(writer, f"Erro ao ler planilha: {e}")
+        finally:
+            if workbook is not None:
+                workbook.close()
     return [pdf_path]
 
 
-def txt_to_pdf(file, temp_dir, task_id=None):
+class _GlyphWidths(dict):
+    # Largura de cada caractere (em pontos) medida uma unica vez pela metrica
+    # da fonte; os seguintes saem do dict.
+    def __init__(self, font: str, size: float):
+        super().__init__()
+        self.font = font
+        self.size = size
+
+    def __missing__(self, char):
+        width = pdfmetrics.stringWidth(char, self.font, self.size)
+        self[char] = width
+        return width
+
+
+def _wrap_line(line: str, widths: _GlyphWidths, max_width: float) -> list:
+    if sum(map(widths.__getitem__, line)) <= max_width:
+        return [line]
+    lines, start, used, last_space = [], 0, 0.0, -1
+    for idx, char in enumerate(line):
+        used += widths[char]
+        if char == " ":
+            last_space = idx
+        if used > max_width and idx > start:
+            # Quebra no ultimo espaco da linha; palavra maior que a linha e cortada.
+            cut = last_space + 1 if last_space > start else idx
+            lines.append(line[start:cut].rstrip())
+            start, last_space = cut, -1
+            used = sum(map(widths.__getitem__, line[start:idx + 1]))
+    lines.append(line[start:])
+    return lines
+
+
+def _pdf_text(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _detect_text_encoding(path: str) -> str:
+    with open(path, "rb") as fh:
+        head = fh.read(64 * 1024)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def txt_to_pdf(file, temp_dir, task_id=None, encoding="auto"):
     txt_path      = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(txt_path)
     pdf_path      = os.path.join(temp_dir, "text_to_pdf.pdf")
-    c             = canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
-    y_position    = height - 50
-    c.setFont("Helvetica", 12)
-
-    if task_id: set_progress(task_id, 20, "Lendo arquivo de texto...")
-
-    try:
-        with open(txt_path, "r", encoding="utf-8") as fh:
-            lines = fh.readlines()
-        total = len(lines)
-        for i, line in enumerate(lines):
-            if task_id and i % 50 == 0:
-                set_progress(task_id, 20 + int(i / max(total, 1) * 70),
-                             f"Processando linha {i + 1} de {total}...")
-            text_line      = line.strip()
-            chars_per_line = int((width - 100) / 7)
-            chunks = (
-                [text_line[j:j + chars_per_line] for j in range(0, len(text_line), chars_per_line)]
-                if text_line else [""]
-            )
-            for chunk in chunks:
-                if y_position < 50:
-                    c.showPage(); y_position = height - 50; c.setFont("Helvetica", 12)
-                c.drawString(50, y_position, chunk); y_position -= 15
-    except Exception as e:
-        c.drawString(50, y_position - 20, f"Erro ao ler arquivo: {e}")
+    width, height = LETTER
+    font_size     = 12
+    leading       = 15
+    max_width     = width - 100
+    per_page      = int((height - 100) / leading) + 1
+    total_bytes   = max(os.path.getsize(txt_path), 1)
+    widths        = _GlyphWidths("Helvetica", font_size)
+    page_lines    = []
+
+    if encoding == "auto":
+        encoding = _detect_text_encoding(txt_path)
+    if task_id: set_progress(task_id, 20, f"Lendo arquivo de texto ({encoding})...")
+
+    with _StreamingPdfWriter(pdf_path) as writer:
+        font = writer.font("Helvetica")
+
+        def flush_page():
+            # Uma pagina pronta vira um unico objeto de texto e vai para o disco.
+            header  = f"BT /{font} {font_size} Tf {leading} TL 50 {height - 50:.0f} Td\n".encode("ascii")
+            content = header + b" Tj T*\n".join(page_lines) + (b" Tj\n" if page_lines else b"") + b"ET"
+            writer.add_page(width, height, content)
+            page_lines.clear()
+
+        def emit(text: str):
+            for wrapped in _wrap_line(text, widths, max_width):
+                page_lines.append(_pdf_text(wrapped))
+                if len(page_lines) == per_page:
+                    flush_page()
+
+        def emit_line(line: str):
+            # Form feed (\f) no texto inicia uma nova pagina.
+            if "\f" in line:
+                for idx, part in enumerate(line.split("\f")):
+                    if idx and page_lines:
+                        flush_page()
+                    emit_line(part)
+                return
+            emit(line.rstrip().expandtabs(4))
 
-    c.save()
+        try:
+            with open(txt_path, "rb") as raw, \
+                    io.TextIOWrapper(raw, encoding=encoding, errors="replace") as fh:
+                pending = ""
+                while True:
+                    _check_cancelled()
+                    block = fh.read(TEXT_READ_BLOCK)
+                    if not block:
+                        break
+                    # So o que a fonte padrao consegue desenhar (WinAnsi) e medido.
+                    block   = block.encode("cp1252", errors="replace").decode("cp1252")
+                    parts   = (pending + block).split("\n")
+                    pending = parts.pop()
+                    for line in parts:
+                        emit_line(line)
+                    if len(pending) > TEXT_READ_BLOCK and "\f" not in pending:
+                        # Linha gigante sem quebra: desenha o que ja cabe e guarda o resto.
+                        wrapped = _wrap_line(pending.expandtabs(4), widths, max_width)
+                        pending = wrapped.pop()
+                        for text in wrapped:
+                            emit(text)
+                    if task_id:
+                        set_progress(task_id, 20 + int(raw.tell() / total_bytes * 70),
+                                     f"Processando texto ({writer.page_count} paginas)...")
+                if pending:
+                    emit_line(pending)
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            page_lines.append(_pdf_text(f"Erro ao ler arquivo: {e}"))
+
+        if page_lines or writer.page_count == 0:
+            flush_page()
     return [pdf_path]
 
 
-def pdf_to_word(file, temp_dir, task_id=None):
+def _pdf2docx_shard(pdf_path: str, page_indexes: list, json_path: str) -> int:
+    # Roda em um processo do pool: analisa so as paginas da fatia e grava o
+    # resultado em JSON para o processo principal montar o .docx.
+    cv = pdf2docx_converter.Converter(pdf_path)
+    try:
+        settings = cv.default_settings
+        cv.load_pages(pages=page_indexes)
+        cv.parse_document(**settings).parse_pages(**settings).serialize(json_path)
+    finally:
+        cv.close()
+    return len(page_indexes)
+
+
+def _pdf_to_word_parallel(pdf_path, docx_path, page_nums, task_id=None):
+    # Uma fatia contigua por worker: a deteccao de cabecalho/rodape do
+    # pdf2docx compara as paginas de cada fatia, e fatias pequenas a enfraquecem.
+    workers    = max(1, min(app.config["PDF2DOCX_WORKERS"], len(page_nums)))
+    bounds     = [len(page_nums) * k // workers for k in range(workers + 1)]
+    shard_dir  = tempfile.mkdtemp(dir=os.path.dirname(docx_path))
+    shards     = [
+        (page_nums[a:b], os.path.join(shard_dir, f"shard_{a}.json"))
+        for a, b in zip(bounds, bounds[1:])
+    ]
+    total, done = len(page_nums), 0
+    pool, pending, queued = _get_process_pool(), set(), list(shards)
+    try:
+        # Janela deslizante: no maximo PDF2DOCX_WORKERS fatias no pool por job.
+        while queued or pending:
+            while queued and len(pending) < workers:
+                indexes, json_path = queued.pop(0)
+                pending.add(pool.submit(_pdf2docx_shard, pdf_path, indexes, json_path))
+            finished = next(_as_completed(pending))
+            pending.discard(finished)
+            done += finished.result()
+            if task_id:
+                set_progress(task_id, 20 + int(done / total * 65),
+                             f"Convertendo para Word: {done} de {total} paginas...")
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if task_id: set_progress(task_id, 88, "Montando documento Word...")
+    cv = pdf2docx_converter.Converter(pdf_path)
+    try:
+        for _, json_path in shards:
+            cv.deserialize(json_path)
+        cv.make_docx(docx_path, **cv.default_settings)
+    finally:
+        cv.close()
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+
+def _pdf_to_word_serial(pdf_path, docx_path, page_nums, task_id=None):
+    cv = pdf2docx_converter.Converter(pdf_path)
+    try:
+        settings = cv.default_settings
+        if task_id: set_progress(task_id, 20, "Analisando documento...")
+        cv.load_pages(pages=page_nums).parse_document(**settings)
+        pages = [page for page in cv.pages if not page.skip_parsing]
+        for done, page in enumerate(pages, start=1):
+            _check_cancelled()
+            try:
+                page.parse(**settings)
+            except Exception as e:
+                if not settings["ignore_page_error"]:
+                    raise pdf2docx_converter.ConversionException(f"Error when parsing page {page.id + 1}: {e}") from e
+                logging.error("Ignore page %d due to parsing page error: %s", page.id + 1, e)
+            if task_id:
+                set_progress(task_id, 40 + int(done / len(pages) * 45),
+                             f"Convertendo para Word: {done} de {len(pages)} paginas...")
+        if task_id: set_progress(task_id, 88, "Montando documento Word...")
+        cv.make_docx(docx_path, **settings)
+    finally:
+        cv.close()
+
+
+def pdf_to_word(file, temp_dir, task_id=None, pages=None, parallel="auto"):
     pdf_path      = os.path.join(temp_dir, secure_filename(file.filename))
     file.save(pdf_path)
     docx_filename = os.path.splitext(secure_filename(file.filename))[0] + ".docx"
     docx_path     = os.path.join(temp_dir, docx_filename)
 
-    if task_id: set_progress(task_id, 20, "Analisando PDF...")
+    if task_id: set_progress(task_id, 15, "Analisando PDF...")
 
-    cv = None
     try:
-        cv = Converter(pdf_path)
-        if task_id: set_progress(task_id, 40, "Convertendo para Word (pode demorar)...")
-        cv.convert(docx_path)
-        if task_id: set_progress(task_id, 85, "Finalizando...")
+        with _open_pdf(pdf_path) as doc:
+            page_nums = _parse_page_ranges(pages, len(doc))
+        use_pool = parallel == "1" or (
+            parallel == "auto" and len(page_nums) >= 8
+            and app.config["PDF2DOCX_WORKERS"] > 1 and app.config["PROCESS_WORKERS"] > 1
+        )
+        if use_pool:
+            _pdf_to_word_parallel(pdf_path, docx_path, page_nums, task_id)
+        else:
+            _pdf_to_word_serial(pdf_path, docx_path, page_nums, task_id)
     except ValueError as e:
         raise RuntimeError(f"Erro no arquivo PDF: {e}") from e
-    except ConversionException as e:
+    except pdf2docx_converter.ConversionException as e:
         raise RuntimeError(f"Erro interno na conversao: {e}") from e
     except Exception as e:
         raise RuntimeError(f"Erro ao converter {file.filename} para Word: {e}") from e
-    finally:
-        if cv: cv.close()
 
     return [docx_path]
 
 
+# Aquece os motores de PRELOAD_ENGINES antes do fork. Os processos filhos
+# (spawn) reimportam este modulo e carregam so o que usarem.
+if multiprocessing.parent_process() is None:
+    for _name in PRELOAD_ENGINES:
+        if ENGINE_MODULES[_name] is not None:
+            warm_engine(_name)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
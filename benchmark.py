@@ -0,0 +1,495 @@
+"""Benchmark das ferramentas do LocalPDF.io.
+
+Gera um corpus sintetico deterministico (PDFs de texto, de imagens e com
+muitas paginas, XLSX/DOCX/TXT grandes e conjuntos de fotos) e executa cada
+ferramenta da tabela de despacho em varios tamanhos, chamando run_tool()
+direto ("inproc") e ponta a ponta por HTTP (/convert -> /download).
+
+Cada caso roda em um processo novo, para que o pico de memoria (RSS) seja
+so daquele caso. Os resultados vao para um JSON que pode ser comparado com
+uma execucao anterior:
+
+    python benchmark.py --sizes small,medium --output base.json
+    python benchmark.py --sizes small,medium --baseline base.json
+"""
+import argparse
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+# O cache devolveria o resultado da rodada anterior; o benchmark mede sempre
+# o processamento real. Vale para os processos filhos (spawn herda o ambiente).
+os.environ["CACHE_MAX_BYTES"] = "0"
+
+SIZES = {
+    "small":  {"pages": 5,   "images": 3,  "rows": 1000,   "paragraphs": 50,   "text_kb": 100},
+    "medium": {"pages": 40,  "images": 10, "rows": 20000,  "paragraphs": 1000, "text_kb": 2000},
+    "large":  {"pages": 200, "images": 30, "rows": 100000, "paragraphs": 5000, "text_kb": 20000},
+}
+
+# Entradas de cada ferramenta (nomes do corpus). Toda ferramenta de
+# app.TOOL_IO precisa aparecer aqui (o pipeline so encadeia as demais).
+TOOL_INPUTS = {
+    "pdf-to-images": [["image-pdf"], ["text-pdf"]],
+    "images-to-pdf": [["photos"]],
+    "merge-pdf":     [["text-pdf", "image-pdf", "many-pages-pdf"]],
+    "split-pdf":     [["many-pages-pdf"]],
+    "compress-pdf":  [["image-pdf"], ["text-pdf"]],
+    "pdf-to-pdfa":   [["text-pdf", "image-pdf"]],
+    "word-to-pdf":   [["docx", "docx-tables"]],
+    "excel-to-pdf":  [["xlsx"]],
+    "txt-to-pdf":    [["txt"]],
+    "pdf-to-word":   [["text-pdf"]],
+}
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua relatorio contrato pagina tabela "
+    "valor total cliente servico entrega prazo acao resumo conclusao anexo"
+).split()
+
+
+# ---------------------------------------------------------------------------
+# Corpus sintetico
+# ---------------------------------------------------------------------------
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _photo(rng: random.Random, width: int, height: int):
+    # Gradiente com ruido: comprime como uma foto, nao como um bloco liso.
+    from PIL import Image
+
+    base  = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), rng.randint(20, 60))
+    return Image.merge("RGB", (
+        base,
+        noise,
+        Image.blend(base, noise, rng.random()),
+    ))
+
+
+def _make_text_pdf(path: str, spec: dict, rng: random.Random, pages: int = None):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages or spec["pages"]):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Secao {i + 1}", fontsize=16)
+        text = "\n\n".join(_sentence(rng, 40) for _ in range(6))
+        page.insert_textbox(fitz.Rect(72, 80, 540, 760), text, fontsize=10)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def _make_image_pdf(path: str, spec: dict, rng: random.Random):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(max(1, spec["pages"] // 2)):
+        page = doc.new_page()
+        buf  = io.BytesIO()
+        _photo(rng, 1200, 900).save(buf, "JPEG", quality=92)
+        page.insert_image(fitz.Rect(36, 36, 576, 441), stream=buf.getvalue())
+        page.insert_text((36, 470), _sentence(rng, 12), fontsize=10)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def _make_photos(folder: str, spec: dict, rng: random.Random) -> list:
+    paths = []
+    for i in range(spec["images"]):
+        ext  = "png" if i % 3 == 2 else "jpg"
+        path = os.path.join(folder, f"foto_{i + 1:03d}.{ext}")
+        img  = _photo(rng, 1600, 1200)
+        if ext == "png":
+            img.save(path, "PNG")
+        else:
+            img.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def _make_docx(path: str, spec: dict, rng: random.Random, tables: bool = False):
+    from docx import Document
+
+    doc = Document()
+    for i in range(spec["paragraphs"]):
+        doc.add_paragraph(_sentence(rng, rng.randint(8, 80)))
+        if tables and i % 50 == 49:
+            table = doc.add_table(rows=10, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = str(rng.randint(0, 99999))
+    doc.save(path)
+
+
+def _make_xlsx(path: str, spec: dict, rng: random.Random):
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Dados")
+    ws.append(["id", "cliente", "descricao", "quantidade", "valor", "data"])
+    for i in range(spec["rows"]):
+        ws.append([
+            i + 1, f"Cliente {rng.randint(1, 500)}", _sentence(rng, rng.randint(2, 10)),
+            rng.randint(1, 100), round(rng.uniform(1, 10000), 2),
+            datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365),
+        ])
+    wb.save(path)
+
+
+def _make_txt(path: str, spec: dict, rng: random.Random):
+    target = spec["text_kb"] * 1024
+    with open(path, "w", encoding="utf-8") as fh:
+        written = 0
+        while written < target:
+            line = _sentence(rng, rng.randint(4, 30)) + ("\n\n" if rng.random() < 0.1 else "\n")
+            fh.write(line)
+            written += len(line)
+
+
+def build_corpus(root: str, size: str) -> dict:
+    """Gera (ou reaproveita) o corpus de um tamanho e devolve nome -> arquivos."""
+    spec   = SIZES[size]
+    folder = os.path.join(root, size)
+    done   = os.path.join(folder, ".complete")
+    names  = {
+        "text-pdf":       ["texto.pdf"],
+        "image-pdf":      ["imagens.pdf"],
+        "many-pages-pdf": ["muitas_paginas.pdf"],
+        "docx":           ["documento.docx"],
+        "docx-tables":    ["documento_tabelas.docx"],
+        "xlsx":           ["planilha.xlsx"],
+        "txt":            ["texto.txt"],
+    }
+    if not os.path.exists(done):
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(os.path.join(folder, "fotos"))
+        # Semente fixa por tamanho: o mesmo corpus em qualquer maquina.
+        rng  = random.Random(f"localpdf-{size}")
+        path = lambda name: os.path.join(folder, names[name][0])
+        _make_text_pdf(path("text-pdf"), spec, rng)
+        _make_image_pdf(path("image-pdf"), spec, rng)
+        _make_text_pdf(path("many-pages-pdf"), spec, rng, pages=spec["pages"] * 5)
+        _make_docx(path("docx"), spec, rng)
+        _make_docx(path("docx-tables"), spec, rng, tables=True)
+        _make_xlsx(path("xlsx"), spec, rng)
+        _make_txt(path("txt"), spec, rng)
+        _make_photos(os.path.join(folder, "fotos"), spec, rng)
+        open(done, "w").close()
+
+    corpus = {name: [os.path.join(folder, f) for f in files] for name, files in names.items()}
+    corpus["photos"] = sorted(
+        os.path.join(folder, "fotos", f) for f in os.listdir(os.path.join(folder, "fotos"))
+    )
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# Medicao
+# ---------------------------------------------------------------------------
+
+def _pdf_pages(paths: list, check_ext: bool = True) -> int:
+    import fitz
+
+    total = 0
+    for path in paths:
+        if not check_ext or path.lower().endswith(".pdf"):
+            with fitz.open(path) as doc:
+                total += doc.page_count
+    return total
+
+
+def _peak_rss_mb(pid="self") -> float:
+    # VmHWM zera no exec; ru_maxrss nao (o filho herdaria o pico do pai).
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid != "self":
+        return 0.0
+    # Sem /proc (macOS): ru_maxrss, em bytes.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024), 1)
+
+
+def _app_peak_rss(app_module) -> dict:
+    # Pico do processo do app e soma dos picos dos processos auxiliares
+    # (pool de paginas e Ghostscript), que sao encerrados em seguida.
+    pids = []
+    if app_module._process_pool is not None:
+        pids += list(app_module._process_pool._processes or {})
+    pool    = app_module.gs_pool
+    workers = []
+    while not pool._idle.empty():
+        workers.append(pool._idle.get_nowait())
+    pids += [w.process.pid for w in workers]
+    peaks = {
+        "peak_rss_mb":       _peak_rss_mb(),
+        "peak_child_rss_mb": round(sum(_peak_rss_mb(pid) for pid in pids), 1),
+    }
+    if app_module._process_pool is not None:
+        app_module._process_pool.shutdown(wait=True)
+    for worker in workers:
+        worker.stop()
+    return peaks
+
+
+def _inproc_case(conn, tool: str, inputs: list, extra: dict):
+    # Processo filho: importa o app do zero e roda a ferramenta uma vez.
+    import app as app_module
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for src in inputs:
+            dest = os.path.join(temp_dir, os.path.basename(src))
+            shutil.copy(src, dest)
+            paths.append(dest)
+        files  = [app_module.SavedFile(p) for p in paths]
+        start  = time.perf_counter()
+        error  = None
+        output = []
+        try:
+            output = app_module.run_tool(tool, files, temp_dir, None, extra)
+        except Exception as exc:
+            error = str(exc)
+        wall = time.perf_counter() - start
+        result = {
+            "wall_s":       wall,
+            "error":        error,
+            "output_bytes": sum(os.path.getsize(p) for p in output),
+            "output_pages": _pdf_pages(output),
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    result.update(_app_peak_rss(app_module))
+    conn.send(result)
+
+
+def _server_main(conn, port: int):
+    # Processo filho: serve o app ate o pai pedir para parar.
+    import threading
+
+    from werkzeug.serving import make_server
+
+    import app as app_module
+
+    server = make_server("127.0.0.1", port, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn.send("ready")
+    conn.recv()
+    server.shutdown()
+    conn.send(_app_peak_rss(app_module))
+
+
+def _multipart(fields: dict, paths: list):
+    boundary = uuid.uuid4().hex
+    body     = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                   f"{value}\r\n".encode())
+    for path in paths:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="files"; '
+                   f'filename="{os.path.basename(path)}"\r\n'
+                   f"Content-Type: application/octet-stream\r\n\r\n".encode())
+        with open(path, "rb") as fh:
+            shutil.copyfileobj(fh, body)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def _http_json(url: str, data: bytes = None, content_type: str = None) -> dict:
+    req = urllib.request.Request(url, data=data)
+    if content_type:
+        req.add_header("Content-Type", content_type)
+    with urllib.request.urlopen(req) as resp:
+        return json.load(resp)
+
+
+def _http_convert(base_url: str, tool: str, inputs: list, extra: dict) -> dict:
+    from app import TERMINAL_STATUSES
+
+    fields = dict(extra, tool=tool, cache="0")
+    body, content_type = _multipart(fields, inputs)
+    start   = time.perf_counter()
+    task_id = _http_json(f"{base_url}/convert", body, content_type)["task_id"]
+    while True:
+        status = _http_json(f"{base_url}/progress/{task_id}")
+        if status["status"] in TERMINAL_STATUSES:
+            break
+        time.sleep(0.05)
+    result = {"error": status["message"] if status["status"] != "done" else None,
+              "output_bytes": 0, "output_pages": 0}
+    if not result["error"]:
+        with tempfile.NamedTemporaryFile(suffix=".download") as out:
+            with urllib.request.urlopen(f"{base_url}/download/{task_id}") as resp:
+                is_pdf = resp.headers.get_content_type() == "application/pdf"
+                shutil.copyfileobj(resp, out, 1024 * 1024)
+            result["wall_s"]       = time.perf_counter() - start
+            result["output_bytes"] = out.tell()
+            if is_pdf:
+                out.flush()
+                result["output_pages"] = _pdf_pages([out.name], check_ext=False)
+    result.setdefault("wall_s", time.perf_counter() - start)
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_case(mode: str, tool: str, size: str, inputs: list, extra: dict, url: str = None) -> dict:
+    ctx    = multiprocessing.get_context("spawn")
+    record = {
+        "tool":        tool,
+        "size":        size,
+        "mode":        mode,
+        "inputs":      [os.path.basename(p) for p in inputs],
+        "input_bytes": sum(os.path.getsize(p) for p in inputs),
+        "input_pages": _pdf_pages(inputs),
+    }
+    parent, child = ctx.Pipe()
+    if mode == "inproc":
+        proc = ctx.Process(target=_inproc_case, args=(child, tool, inputs, extra))
+        proc.start()
+        record.update(parent.recv())
+        proc.join()
+    elif url:
+        # Servidor externo: sem acesso ao RSS nem as paginas da saida.
+        record.update(_http_convert(url.rstrip("/"), tool, inputs, extra))
+    else:
+        port = _free_port()
+        proc = ctx.Process(target=_server_main, args=(child, port))
+        proc.start()
+        parent.recv()
+        try:
+            record.update(_http_convert(f"http://127.0.0.1:{port}", tool, inputs, extra))
+        finally:
+            parent.send("stop")
+            record.update(parent.recv())
+            proc.join()
+
+    # Paginas por segundo: paginas de PDF do lado da entrada ou, para as
+    # ferramentas que geram PDF, do lado da saida.
+    pages = record["input_pages"] or record.get("output_pages") or 0
+    record["pages"]       = pages
+    record["pages_per_s"] = round(pages / record["wall_s"], 2) if pages and record["wall_s"] else None
+    record["size_ratio"]  = round(record["output_bytes"] / record["input_bytes"], 4) if record["input_bytes"] else None
+    record["wall_s"]      = round(record["wall_s"], 4)
+    record["status"]      = "error" if record["error"] else "ok"
+    return record
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Compara wall time com o baseline; devolve os casos que pioraram."""
+    key         = lambda r: (r["tool"], r["size"], r["mode"], tuple(r["inputs"]))
+    previous    = {key(r): r for r in baseline if r["status"] == "ok"}
+    regressions = []
+    print(f"\n{'ferramenta':<15} {'tamanho':<7} {'modo':<7} {'antes':>9} {'agora':>9} {'delta':>8}")
+    for r in results:
+        old = previous.get(key(r))
+        if not old or r["status"] != "ok":
+            continue
+        delta = (r["wall_s"] - old["wall_s"]) / old["wall_s"] if old["wall_s"] else 0.0
+        flag  = ""
+        if delta > threshold:
+            flag = "  <- mais lento"
+            regressions.append(r)
+        print(f"{r['tool']:<15} {r['size']:<7} {r['mode']:<7} {old['wall_s']:>8.2f}s "
+              f"{r['wall_s']:>8.2f}s {delta:>+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das ferramentas do LocalPDF.io")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"tamanhos separados por virgula ({', '.join(SIZES)})")
+    parser.add_argument("--tools", default="", help="ferramentas separadas por virgula (padrao: todas)")
+    parser.add_argument("--modes", default="inproc,http", help="inproc, http ou ambos")
+    parser.add_argument("--url", default="", help="servidor ja em execucao para o modo http")
+    parser.add_argument("--repeat", type=int, default=1, help="execucoes por caso")
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "localpdf-bench-corpus"),
+                        help="pasta do corpus sintetico (reaproveitado entre execucoes)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default="", help="JSON de uma execucao anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="piora relativa de wall time considerada regressao (padrao 0.10)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import TOOL_IO
+
+    missing = set(TOOL_IO) - set(TOOL_INPUTS)
+    if missing:
+        parser.error(f"ferramentas sem corpus no benchmark: {', '.join(sorted(missing))}")
+    sizes = [s for s in args.sizes.split(",") if s]
+    tools = [t for t in args.tools.split(",") if t] or list(TOOL_INPUTS)
+    modes = [m for m in args.modes.split(",") if m]
+    for label, chosen, valid in (("tamanho", sizes, SIZES), ("ferramenta", tools, TOOL_INPUTS),
+                                 ("modo", modes, ("inproc", "http"))):
+        unknown = [c for c in chosen if c not in valid]
+        if unknown:
+            parser.error(f"{label} invalido: {', '.join(unknown)}")
+
+    results = []
+    for size in sizes:
+        print(f"Gerando corpus '{size}' em {args.corpus}...", flush=True)
+        corpus = build_corpus(args.corpus, size)
+        for tool in tools:
+            for names in TOOL_INPUTS[tool]:
+                inputs = [p for name in names for p in corpus[name]]
+                for mode in modes:
+                    for _ in range(args.repeat):
+                        r = run_case(mode, tool, size, inputs, {}, url=args.url or None)
+                        results.append(r)
+                        pps = f"{r['pages_per_s']:>8.1f} pag/s" if r["pages_per_s"] else " " * 14
+                        rss = f"{r['peak_rss_mb']:>7.1f} MB" if r.get("peak_rss_mb") else " " * 10
+                        print(f"{tool:<15} {size:<7} {mode:<7} {r['wall_s']:>8.2f}s {pps} {rss} "
+                              f"x{r['size_ratio'] or 0:<7.3f} {r['error'] or ''}", flush=True)
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "python":   platform.python_version(),
+            "platform": platform.platform(),
+            "cpus":     os.cpu_count(),
+        },
+        "sizes":   {s: SIZES[s] for s in sizes},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResultados salvos em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh)["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} caso(s) mais lentos que o baseline (> {args.threshold:.0%})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
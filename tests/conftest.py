@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Pastas de cache e previews isoladas; precisa vir antes do import do app.
+_TMP = tempfile.mkdtemp(prefix="localpdf-tests-")
+os.environ.setdefault("CACHE_FOLDER", os.path.join(_TMP, "cache"))
+os.environ.setdefault("PREVIEW_FOLDER", os.path.join(_TMP, "previews"))
+os.environ.setdefault("CACHE_MAX_BYTES", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as localpdf  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    localpdf.app.config["TESTING"] = True
+    with localpdf.app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def pdf_doc():
+    doc = localpdf.fitz.open()
+    for i in range(5):
+        doc.new_page().insert_text((72, 72), f"Pagina {i + 1}")
+    yield doc
+    doc.close()
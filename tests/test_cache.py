@@ -0,0 +1,115 @@
+import os
+import time
+
+import app as localpdf
+from app import ConversionCache, task_store
+
+
+def _entry(tmp_path, name, size=100):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return [str(path)]
+
+
+def _get(cache, tmp_path, key):
+    dest = tmp_path / f"task-{key}-{time.monotonic_ns()}"
+    dest.mkdir()
+    return cache.get(key, str(dest))
+
+
+def _cache(tmp_path, max_bytes):
+    folder = tmp_path / "cache"
+    folder.mkdir(exist_ok=True)
+    return ConversionCache(str(folder), max_bytes)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, 250)
+    cache.put("a", _entry(tmp_path, "a.pdf"))
+    cache.put("b", _entry(tmp_path, "b.pdf"))
+    assert _get(cache, tmp_path, "a") is not None  # "a" passa a ser o mais recente
+    cache.put("c", _entry(tmp_path, "c.pdf"))
+
+    assert _get(cache, tmp_path, "b") is None
+    assert _get(cache, tmp_path, "a") is not None
+    assert _get(cache, tmp_path, "c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 200
+    assert not (tmp_path / "cache" / "b").exists()
+
+
+def test_skips_entry_larger_than_cache(tmp_path):
+    cache = _cache(tmp_path, 50)
+    cache.put("big", _entry(tmp_path, "big.pdf"))
+    assert _get(cache, tmp_path, "big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_reloads_entries_from_disk(tmp_path):
+    cache = _cache(tmp_path, 1000)
+    cache.put("a", _entry(tmp_path, "a.pdf"))
+
+    reopened = _cache(tmp_path, 1000)
+    files = _get(reopened, tmp_path, "a")
+    assert files is not None
+    assert open(files[0], "rb").read() == b"x" * 100
+    assert reopened.stats()["bytes"] == 100
+
+
+def test_hit_survives_eviction(tmp_path):
+    cache = _cache(tmp_path, 150)
+    cache.put("a", _entry(tmp_path, "a.pdf"))
+    files = _get(cache, tmp_path, "a")
+    assert not files[0].startswith(str(tmp_path / "cache"))
+
+    cache.put("b", _entry(tmp_path, "b.pdf"))  # despeja "a"
+    assert _get(cache, tmp_path, "a") is None
+    assert open(files[0], "rb").read() == b"x" * 100
+
+
+def test_load_keeps_recent_tmp_dirs(tmp_path):
+    folder = tmp_path / "cache"
+    fresh  = folder / "k1.tmp-fresh"
+    stale  = folder / "k2.tmp-stale"
+    fresh.mkdir(parents=True)
+    stale.mkdir()
+    old = time.time() - ConversionCache.STALE_TMP_SECS - 60
+    os.utime(stale, (old, old))
+
+    cache = _cache(tmp_path, 1000)
+    assert cache.stats()["entries"] == 0
+    assert fresh.exists()
+    assert not stale.exists()
+
+
+def _convert_txt(tmp_path, task_id):
+    src = tmp_path / "a.txt"
+    src.write_text("ola")
+    task_store.create(task_id, localpdf._new_task("txt-to-pdf", str(tmp_path)))
+    localpdf._process_in_background(task_id, "txt-to-pdf", [str(src)], str(tmp_path), {})
+    return task_store.get(task_id)
+
+
+def test_put_error_does_not_fail_task(tmp_path, monkeypatch):
+    def full_disk(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(localpdf.conversion_cache, "max_bytes", 10 * 1024 * 1024)
+    monkeypatch.setattr(localpdf.conversion_cache, "put", full_disk)
+    task = _convert_txt(tmp_path, "cache-put-error")
+    assert task["status"] == "done"
+    assert os.path.exists(task["result_path"])
+
+
+def test_hit_is_served_from_task_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(localpdf.conversion_cache, "max_bytes", 10 * 1024 * 1024)
+    first = tmp_path / "first"
+    again = tmp_path / "again"
+    first.mkdir()
+    again.mkdir()
+    assert not _convert_txt(first, "cache-miss")["cache_hit"]
+    task = _convert_txt(again, "cache-hit")
+    assert task["cache_hit"]
+    assert task["result_path"].startswith(str(again))
@@ -0,0 +1,103 @@
+import io
+import threading
+import time
+
+import pytest
+
+import app as localpdf
+from app import TERMINAL_STATUSES, JobScheduler, TaskTimeout, _JobControl, task_store
+
+
+def _convert(client):
+    resp = client.post("/convert", data={
+        "tool":  "txt-to-pdf",
+        "cache": "0",
+        "files": (io.BytesIO(b"ola"), "a.txt"),
+    })
+    assert resp.status_code == 200
+    return resp.get_json()["task_id"]
+
+
+def _wait(task_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        task = task_store.get(task_id)
+        if task["status"] in TERMINAL_STATUSES:
+            return task
+        time.sleep(0.05)
+    raise AssertionError(f"task {task_id} nao terminou")
+
+
+@pytest.fixture
+def slow_tool(monkeypatch):
+    # Ferramenta que so para num ponto de cancelamento, como as reais entre
+    # paginas; o RuntimeError imita o embrulho que as ferramentas fazem.
+    started = threading.Event()
+
+    def run_tool(*args):
+        started.set()
+        try:
+            while True:
+                localpdf._check_cancelled()
+                time.sleep(0.01)
+        except localpdf.TaskCancelled as exc:
+            raise RuntimeError(f"Erro ao converter: {exc}") from exc
+
+    monkeypatch.setattr(localpdf, "run_tool", run_tool)
+    return started
+
+
+def test_cancel_queued_task(client, monkeypatch):
+    scheduler = JobScheduler({
+        "heavy": {"workers": 1, "queue_limit": 1},
+        "light": {"workers": 1, "queue_limit": 1},
+    })
+    monkeypatch.setattr(localpdf, "scheduler", scheduler)
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit("running", "txt-to-pdf", lambda: (started.set(), release.wait(10)))
+    try:
+        assert started.wait(5)
+        task_id = _convert(client)
+        assert client.get(f"/progress/{task_id}").get_json()["queue_position"] == 1
+
+        resp = client.delete(f"/task/{task_id}")
+        assert resp.get_json() == {"task_id": task_id, "status": "cancelled"}
+        assert task_store.get(task_id)["status"] == "cancelled"
+        assert scheduler.position(task_id) is None
+        assert client.get(f"/download/{task_id}").status_code == 410
+    finally:
+        release.set()
+
+
+def test_cancel_running_task(client, slow_tool):
+    task_id = _convert(client)
+    assert slow_tool.wait(5)
+    resp = client.delete(f"/task/{task_id}")
+    assert resp.status_code == 202
+    assert resp.get_json()["status"] == "cancelling"
+
+    task = _wait(task_id)
+    assert task["status"] == "cancelled"
+    assert task["message"] == "Cancelado pelo usuario"
+
+
+def test_deadline_ends_task_with_timeout(client, slow_tool, monkeypatch):
+    monkeypatch.setitem(localpdf.app.config, "JOB_DEADLINES",
+                        dict(localpdf.app.config["JOB_DEADLINES"], **{"txt-to-pdf": 1}))
+    task = _wait(_convert(client))
+    assert task["status"] == "timeout"
+    assert task["message"] == "Tempo limite de 1s excedido"
+
+
+def test_job_control_without_deadline_never_expires():
+    control = _JobControl("sem-prazo", 0)
+    assert control.expires is None
+    control.check()
+
+
+def test_job_control_keeps_raising_after_expiring():
+    control = _JobControl("com-prazo", 1)
+    control.expires = time.monotonic() - 1
+    for _ in range(2):
+        with pytest.raises(TaskTimeout):
+            control.check()
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import app as localpdf
+from app import SavedFile, _analyze_pdf, _compress_plan, compress_pdf
+
+
+def _image_pdf(path, box=72):
+    # Ruido 600x600 exibido em 1 polegada: ~600 dpi, grande demais para ebook.
+    img = localpdf.Image.frombytes("RGB", (600, 600), os.urandom(600 * 600 * 3))
+    png = path.with_suffix(".png")
+    img.save(png)
+    doc = localpdf.fitz.open()
+    doc.new_page().insert_image(localpdf.fitz.Rect(72, 72, 72 + box, 72 + box), filename=str(png))
+    doc.save(str(path), deflate=True)
+    doc.close()
+    return path
+
+
+def _text_pdf(path, deflate):
+    doc = localpdf.fitz.open()
+    for i in range(5):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((72, 72 + line * 15), f"Pagina {i + 1} linha {line}")
+    doc.save(str(path), deflate=deflate)
+    doc.close()
+    return path
+
+
+def _plan(path, dpi=150):
+    with localpdf.fitz.open(str(path)) as doc:
+        return _compress_plan(_analyze_pdf(doc), os.path.getsize(path), dpi, "ebook")
+
+
+def test_plan_skips_compressed_text(tmp_path):
+    plan = _plan(_text_pdf(tmp_path / "a.pdf", deflate=True))
+    assert plan["plan"] == "skip"
+    assert plan["estimated_savings"] == 0
+
+
+def test_plan_lossless_for_unfiltered_streams(tmp_path):
+    plan = _plan(_text_pdf(tmp_path / "a.pdf", deflate=False))
+    assert plan["plan"] == "lossless"
+    assert 0 < plan["estimated_savings"] <= plan["input_bytes"]
+
+
+def test_plan_images_above_target_dpi(tmp_path):
+    path = _image_pdf(tmp_path / "a.pdf")
+    plan = _plan(path)
+    assert plan["plan"] == "images"
+    assert plan["oversized_images"] == 1
+    assert plan["_oversized"][0]["dpi"] == pytest.approx(600, rel=0.01)
+    # A 600 dpi a imagem ja esta dentro do alvo de printer com folga.
+    assert _plan(path, dpi=600)["plan"] != "images"
+
+
+def test_plan_ghostscript_for_unsupported_images():
+    image = {"xref": 5, "width": 2000, "height": 2000, "bpc": 1, "colorspace": "DeviceGray",
+             "codec": "CCITTFaxDecode", "dpi": 600, "bytes": 200 * 1024, "masked": False}
+    plan  = _compress_plan({"images": [image], "fonts": [], "unfiltered_bytes": 0}, 300 * 1024, 150, "ebook")
+    assert plan["plan"] == "ghostscript"
+    assert "nao suportado" in plan["reason"]
+
+
+def test_plan_ghostscript_for_full_fonts():
+    font = {"name": "Arial", "type": "TrueType", "embedded": True, "subset": False}
+    plan = _compress_plan({"images": [], "fonts": [font], "unfiltered_bytes": 0}, 100 * 1024, 150, "ebook")
+    assert plan["plan"] == "ghostscript"
+    assert plan["full_fonts"] == 1
+
+
+def test_compress_images_without_ghostscript(tmp_path, monkeypatch):
+    monkeypatch.setitem(localpdf.app.config, "PROCESS_WORKERS", 2)
+    src = _image_pdf(tmp_path / "a.pdf")
+    out = tmp_path / "out"
+    out.mkdir()
+    result, = compress_pdf(SavedFile(str(src)), str(out), level="ebook")
+    assert result.endswith("compressed.pdf")
+    assert os.path.getsize(result) < os.path.getsize(src)
+    with localpdf.fitz.open(result) as doc:
+        (xref, *_, codec, _), = doc[0].get_images(full=True)
+        assert codec == "DCTDecode"
+        assert doc.xref_get_key(xref, "Width") == ("int", "150")
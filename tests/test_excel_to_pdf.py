@@ -0,0 +1,63 @@
+import io
+import re
+import zipfile
+
+import app as localpdf
+from app import SavedFile, excel_to_pdf
+
+
+def _convert(tmp_path, workbook, strip_dimension=False):
+    buf = io.BytesIO()
+    workbook.save(buf)
+    data = buf.getvalue()
+    if strip_dimension:
+        # Planilhas gravadas por outros programas podem nao ter <dimension>.
+        src, out = zipfile.ZipFile(io.BytesIO(data)), io.BytesIO()
+        with zipfile.ZipFile(out, "w") as dest:
+            for item in src.infolist():
+                content = src.read(item)
+                if item.filename.endswith("sheet1.xml"):
+                    content = re.sub(rb"<dimension[^>]*/>", b"", content)
+                dest.writestr(item, content)
+        data = out.getvalue()
+    path = tmp_path / "a.xlsx"
+    path.write_bytes(data)
+    pdf_path, = excel_to_pdf(SavedFile(str(path)), str(tmp_path))
+    with localpdf.fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc]
+
+
+def _workbook(rows):
+    workbook = localpdf.openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    return workbook
+
+
+def test_header_repeats_on_every_page(tmp_path):
+    pages = _convert(tmp_path, _workbook([["Nome", "Valor"]] + [[f"item {i}", i] for i in range(120)]))
+    assert len(pages) > 1
+    assert all("Nome" in text and "Valor" in text for text in pages)
+    assert "item 119" in pages[-1]
+
+
+def test_wide_sheet_is_split_in_column_bands(tmp_path):
+    header = [f"coluna {i}" for i in range(30)]
+    pages  = _convert(tmp_path, _workbook([header, [f"valor {i}" for i in range(30)]]))
+    titles = [text.splitlines()[0] for text in pages]
+    assert len(pages) > 1
+    assert titles[0].endswith("(1/%d)" % len(pages))
+    assert "Colunas A-" in titles[0]
+    assert "valor 29" in pages[-1]
+
+
+def test_empty_sheet(tmp_path):
+    pages = _convert(tmp_path, localpdf.openpyxl.Workbook())
+    assert pages == ["Planilha: Sheet (vazia)\n"]
+
+
+def test_columns_past_the_sample_are_kept(tmp_path):
+    rows  = [["a", "b"]] + [[i, i] for i in range(localpdf.EXCEL_SAMPLE_ROWS + 50)]
+    rows += [[1, 2] + [f"extra {i}" for i in range(20)]]
+    pages = _convert(tmp_path, _workbook(rows), strip_dimension=True)
+    assert "extra 19" in "".join(pages)
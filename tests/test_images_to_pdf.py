@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import app as localpdf
+from app import SavedFile, images_to_pdf
+
+
+def _image(tmp_path, name, mode, size, color, **kw):
+    path = tmp_path / name
+    localpdf.Image.new(mode, size, color).save(str(path), **kw)
+    return SavedFile(str(path))
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    return str(out)
+
+
+def test_jpeg_is_embedded_without_reencoding(tmp_path, out_dir):
+    jpeg = _image(tmp_path, "a.jpg", "RGB", (400, 300), (200, 10, 10), quality=90)
+    pdf_path, = images_to_pdf([jpeg], out_dir)
+    with localpdf.fitz.open(pdf_path) as doc:
+        xref = doc[0].get_images()[0][0]
+        assert doc.xref_stream_raw(xref) == open(jpeg.path, "rb").read()
+        assert tuple(round(v) for v in doc[0].rect[2:]) == (400, 300)
+
+
+def test_transparency_is_flattened_on_white(tmp_path, out_dir):
+    png = _image(tmp_path, "a.png", "RGBA", (50, 50), (0, 0, 255, 0))
+    pdf_path, = images_to_pdf([png], out_dir, page_size="a4", margin=10)
+    with localpdf.fitz.open(pdf_path) as doc:
+        page = doc[0]
+        assert tuple(round(v) for v in page.rect[2:]) == (595, 842)
+        pix = page.get_pixmap(dpi=36)
+        assert pix.pixel(pix.width // 2, pix.height // 2) == (255, 255, 255)
+
+
+def test_one_page_per_image(tmp_path, out_dir):
+    files = [_image(tmp_path, f"{i}.png", "L", (20, 30), 128) for i in range(3)]
+    pdf_path, = images_to_pdf(files, out_dir, page_size="letter", fit="fill")
+    with localpdf.fitz.open(pdf_path) as doc:
+        assert doc.page_count == 3
+
+
+def test_failure_leaves_no_partial_pdf(tmp_path, out_dir):
+    good = _image(tmp_path, "a.png", "RGB", (20, 20), (0, 0, 0))
+    bad  = tmp_path / "b.png"
+    bad.write_bytes(b"nao e imagem")
+    with pytest.raises(localpdf.Image.UnidentifiedImageError):
+        images_to_pdf([good, SavedFile(str(bad))], out_dir)
+    assert not os.path.exists(os.path.join(out_dir, "images_to_pdf.pdf"))
@@ -0,0 +1,51 @@
+import pytest
+
+from app import _parse_page_ranges, _split_groups
+
+
+def test_parse_page_ranges_empty_is_whole_document():
+    assert _parse_page_ranges("", 4) == [0, 1, 2, 3]
+    assert _parse_page_ranges("  ", 2) == [0, 1]
+
+
+def test_parse_page_ranges_keeps_order_and_drops_repeats():
+    assert _parse_page_ranges("3, 1-2, 2", 5) == [2, 0, 1]
+
+
+def test_parse_page_ranges_end():
+    assert _parse_page_ranges("end", 5) == [4]
+    assert _parse_page_ranges("4-end", 5) == [3, 4]
+    assert _parse_page_ranges("4-", 5) == [3, 4]
+
+
+@pytest.mark.parametrize("spec", ["0", "6", "4-2", "1-9", "a", "1-x", ",,"])
+def test_parse_page_ranges_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        _parse_page_ranges(spec, 5)
+
+
+def test_split_groups_ranges(pdf_doc):
+    assert _split_groups(pdf_doc, "ranges", 1, "1-2,4,5-end") == [
+        ("pages_1-2.pdf", 0, 1),
+        ("page_4.pdf", 3, 3),
+        ("page_5.pdf", 4, 4),
+    ]
+
+
+def test_split_groups_ranges_allows_overlap(pdf_doc):
+    names = [name for name, _, _ in _split_groups(pdf_doc, "ranges", 1, "1-3,2-4")]
+    assert names == ["pages_1-3.pdf", "pages_2-4.pdf"]
+
+
+@pytest.mark.parametrize("spec", ["1-3,1-3", "2,2-2", "5,end"])
+def test_split_groups_ranges_rejects_repeats(pdf_doc, spec):
+    with pytest.raises(ValueError, match="repetido"):
+        _split_groups(pdf_doc, "ranges", 1, spec)
+
+
+def test_split_groups_chunk(pdf_doc):
+    assert _split_groups(pdf_doc, "chunk", 2, "") == [
+        ("pages_1-2.pdf", 0, 1),
+        ("pages_3-4.pdf", 2, 3),
+        ("page_5.pdf", 4, 4),
+    ]
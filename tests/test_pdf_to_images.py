@@ -0,0 +1,28 @@
+import pytest
+
+import app as localpdf
+from app import SavedFile, pdf_to_images
+
+
+@pytest.fixture
+def pdf_path(tmp_path, pdf_doc):
+    path = tmp_path / "doc.pdf"
+    pdf_doc.save(str(path))
+    return SavedFile(str(path))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_renders_requested_pages(tmp_path, pdf_path, monkeypatch, workers):
+    monkeypatch.setitem(localpdf.app.config, "PROCESS_WORKERS", workers)
+    out = tmp_path / "out"
+    out.mkdir()
+    files = pdf_to_images(pdf_path, str(out), pages="5,1-3", dpi=36, image_format="jpeg")
+    assert [f.rsplit("/", 1)[1] for f in files] == ["page_5.jpg", "page_1.jpg", "page_2.jpg", "page_3.jpg"]
+    with localpdf.Image.open(files[0]) as img:
+        assert img.format == "JPEG"
+        assert img.size == (298, 421)  # A4 a 36 dpi
+
+
+def test_rejects_pages_outside_document(tmp_path, pdf_path):
+    with pytest.raises(ValueError):
+        pdf_to_images(pdf_path, str(tmp_path), pages="9")
@@ -0,0 +1,46 @@
+import pytest
+
+import app as localpdf
+from app import SavedFile, pdf_to_word
+
+
+@pytest.fixture
+def pdf_path(tmp_path, pdf_doc):
+    path = tmp_path / "doc.pdf"
+    pdf_doc.save(str(path))
+    return SavedFile(str(path))
+
+
+def _paragraphs(docx_path):
+    import docx
+    return [p.text for p in docx.Document(docx_path).paragraphs if p.text.strip()]
+
+
+def _convert(tmp_path, pdf_path, name, **kwargs):
+    out = tmp_path / name
+    out.mkdir()
+    docx_path, = pdf_to_word(pdf_path, str(out), **kwargs)
+    return _paragraphs(docx_path)
+
+
+def test_shards_keep_page_order(tmp_path, pdf_path, monkeypatch):
+    monkeypatch.setitem(localpdf.app.config, "PROCESS_WORKERS", 2)
+    monkeypatch.setitem(localpdf.app.config, "PDF2DOCX_WORKERS", 2)
+    serial   = _convert(tmp_path, pdf_path, "serial", parallel="0")
+    parallel = _convert(tmp_path, pdf_path, "parallel", parallel="1")
+    assert serial == [f"Pagina {i}" for i in range(1, 6)]
+    assert parallel == serial
+
+
+def test_pages_subset(tmp_path, pdf_path, monkeypatch):
+    # O pdf2docx monta as paginas na ordem do documento, com ou sem fatias.
+    monkeypatch.setitem(localpdf.app.config, "PDF2DOCX_WORKERS", 2)
+    serial   = _convert(tmp_path, pdf_path, "serial", pages="4-5,1", parallel="0")
+    parallel = _convert(tmp_path, pdf_path, "parallel", pages="4-5,1", parallel="1")
+    assert serial == ["Pagina 1", "Pagina 4", "Pagina 5"]
+    assert parallel == serial
+
+
+def test_invalid_pages(tmp_path, pdf_path):
+    with pytest.raises(RuntimeError, match="Erro no arquivo PDF"):
+        _convert(tmp_path, pdf_path, "out", pages="9")
@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import time
+
+import pytest
+
+import app as localpdf
+from app import TERMINAL_STATUSES, task_store
+
+
+def _post(client, steps, files):
+    return client.post("/pipeline", data={
+        "steps": json.dumps(steps),
+        "cache": "0",
+        "files": [(io.BytesIO(data), name) for name, data in files],
+    })
+
+
+def _wait(task_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        task = task_store.get(task_id)
+        if task["status"] in TERMINAL_STATUSES:
+            return task
+        time.sleep(0.05)
+    raise AssertionError(f"task {task_id} nao terminou")
+
+
+def test_chain_runs_steps_in_order(client):
+    resp = _post(client, [
+        {"tool": "txt-to-pdf"},
+        {"tool": "merge-pdf"},
+        {"tool": "split-pdf", "split_mode": "ranges", "ranges": "2,1"},
+    ], [("a.txt", b"primeiro"), ("b.txt", b"segundo")])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["steps"] == ["txt-to-pdf", "merge-pdf", "split-pdf"]
+
+    task = _wait(body["task_id"])
+    assert task["status"] == "done", task["message"]
+    names = [os.path.basename(p) for p in task["result_files"]]
+    assert names == ["page_2.pdf", "page_1.pdf"]
+    with localpdf.fitz.open(task["result_files"][0]) as doc:
+        assert "segundo" in doc[0].get_text()
+
+
+@pytest.mark.parametrize("steps, files, error", [
+    ([{"tool": "txt-to-pdf"}], [("a.pdf", b"%PDF")], "Etapa 1 (txt-to-pdf) nao aceita arquivos pdf"),
+    ([{"tool": "merge-pdf"}, {"tool": "merge-pdf"}, {"tool": "pdf-to-word"}, {"tool": "merge-pdf"}],
+     [("a.pdf", b"%PDF")], "Etapa 4 (merge-pdf) nao aceita arquivos docx"),
+    ([{"tool": "pipeline"}], [("a.pdf", b"%PDF")], "Etapa 1: ferramenta invalida"),
+    ([{"tool": "split-pdf", "split_mode": "ranges"}], [("a.pdf", b"%PDF")], "Informe os intervalos"),
+    ([], [("a.pdf", b"%PDF")], "ao menos uma etapa"),
+    ([{"tool": "merge-pdf"}] * (localpdf.PIPELINE_MAX_STEPS + 1), [("a.pdf", b"%PDF")], "mais de"),
+])
+def test_invalid_steps_are_rejected_before_queueing(client, steps, files, error):
+    resp = _post(client, steps, files)
+    assert resp.status_code == 400
+    assert error in resp.get_json()["error"]
+
+
+def test_steps_must_be_json(client):
+    resp = client.post("/pipeline", data={"steps": "txt-to-pdf", "files": (io.BytesIO(b"x"), "a.txt")})
+    assert resp.status_code == 400
+    assert "lista JSON" in resp.get_json()["error"]
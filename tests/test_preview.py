@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+
+@pytest.fixture
+def preview(client, pdf_doc):
+    resp = client.post("/preview", data={"file": (io.BytesIO(pdf_doc.tobytes()), "doc.pdf")})
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_preview_reports_pages(preview):
+    assert preview["pages"] == 5
+
+
+def test_thumbnail_and_etag(client, preview):
+    url  = f"/preview/{preview['preview_id']}/2?width=200"
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.mimetype == "image/png"
+    assert resp.data.startswith(b"\x89PNG")
+    etag = resp.headers["ETag"]
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_stale_etag_for_missing_page_is_404(client, preview):
+    url  = f"/preview/{preview['preview_id']}/1"
+    etag = client.get(url).headers["ETag"]
+    # Mesmo com uma ETag qualquer, pagina inexistente nao pode dar 304.
+    resp = client.get(f"/preview/{preview['preview_id']}/6", headers={"If-None-Match": etag})
+    assert resp.status_code == 404
+    resp = client.get(f"/preview/{preview['preview_id']}/6", headers={"If-None-Match": "*"})
+    assert resp.status_code == 404
+
+
+def test_preview_rejects_non_pdf(client):
+    resp = client.post("/preview", data={"file": (io.BytesIO(b"ola"), "a.txt")})
+    assert resp.status_code == 400
+
+
+def test_unknown_preview(client):
+    assert client.get("/preview/nao-existe/1").status_code == 404
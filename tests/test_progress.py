@@ -0,0 +1,38 @@
+import json
+import uuid
+
+import pytest
+
+from app import TERMINAL_STATUSES, task_store
+
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _create_task(status: str, message: str) -> str:
+    task_id = uuid.uuid4().hex
+    task_store.create(task_id, {"status": status, "progress": 0, "message": message, "seq": 1})
+    return task_id
+
+
+@pytest.mark.parametrize("status", TERMINAL_STATUSES)
+def test_stream_ends_with_terminal_event(client, status):
+    task_id = _create_task(status, f"fim: {status}")
+    try:
+        resp = client.get(f"/progress/{task_id}/stream")
+        assert resp.mimetype == "text/event-stream"
+        events = _events(resp.get_data(as_text=True))
+    finally:
+        task_store.delete(task_id)
+
+    assert events == [(status, {"progress": 0, "status": status, "message": f"fim: {status}"})]
+
+
+def test_stream_unknown_task(client):
+    assert client.get("/progress/nao-existe/stream").status_code == 404
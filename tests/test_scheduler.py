@@ -0,0 +1,79 @@
+import io
+import threading
+
+import pytest
+
+import app as localpdf
+from app import JobScheduler, QueueFullError, _WorkerPool
+
+
+def _blocker():
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait(10)
+
+    return job, started, release
+
+
+def test_pool_rejects_when_queue_and_workers_are_full():
+    pool = _WorkerPool("test", workers=1, queue_limit=1)
+    job, started, release = _blocker()
+    try:
+        pool.submit("running", job, ())
+        assert started.wait(5)
+        pool.submit("queued", job, ())
+        assert pool.position("queued") == 1
+        with pytest.raises(QueueFullError) as exc:
+            pool.submit("rejected", job, ())
+        assert exc.value.retry_after >= 1
+        assert pool.position("rejected") is None
+    finally:
+        release.set()
+
+
+def test_submit_many_is_all_or_nothing():
+    pool = _WorkerPool("test", workers=1, queue_limit=2)
+    job, started, release = _blocker()
+    try:
+        pool.submit("running", job, ())
+        assert started.wait(5)
+        with pytest.raises(QueueFullError):
+            pool.submit_many([(f"t{i}", job, ()) for i in range(3)])
+        assert pool.positions() == {}
+        pool.submit_many([(f"t{i}", job, ()) for i in range(2)])
+        assert pool.positions() == {"t0": 1, "t1": 2}
+    finally:
+        release.set()
+
+
+def test_convert_returns_429_with_retry_after(client, monkeypatch):
+    scheduler = JobScheduler({
+        "heavy": {"workers": 1, "queue_limit": 0},
+        "light": {"workers": 1, "queue_limit": 0},
+    })
+    monkeypatch.setattr(localpdf, "scheduler", scheduler)
+    job, started, release = _blocker()
+    try:
+        scheduler.submit("running", "txt-to-pdf", job)
+        assert started.wait(5)
+        resp = client.post("/convert", data={
+            "tool":  "txt-to-pdf",
+            "files": (io.BytesIO(b"ola"), "a.txt"),
+        })
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+        assert "Fila de processamento cheia" in resp.get_json()["error"]
+    finally:
+        release.set()
+
+
+def test_submit_counts_jobs_not_yet_picked_by_idle_workers():
+    # Workers ainda nao iniciados: os jobs ficam na fila e ocupam as vagas.
+    pool = _WorkerPool("test", workers=2, queue_limit=1)
+    pool._ensure_started = lambda: None
+    for i in range(3):
+        pool.submit(f"t{i}", lambda: None, ())
+    with pytest.raises(QueueFullError):
+        pool.submit("t3", lambda: None, ())
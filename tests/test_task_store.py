@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+import app as localpdf
+from app import MemoryTaskStore, SQLiteTaskStore, TaskReaper, TaskStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryTaskStore()
+    return SQLiteTaskStore(str(tmp_path / "tasks.db"))
+
+
+def test_task_store_is_abstract():
+    with pytest.raises(TypeError):
+        TaskStore()
+
+
+def test_crud(store):
+    store.create("a", {"status": "queued", "expires_at": 10})
+    assert store.get("a") == {"status": "queued", "expires_at": 10}
+    assert store.update("a", status="done")
+    assert store.get("a")["status"] == "done"
+    assert not store.update("nope", status="done")
+    assert store.delete("a")["status"] == "done"
+    assert store.get("a") is None
+    assert store.delete("a") is None
+
+
+def test_returned_task_is_a_copy(store):
+    store.create("a", {"files": {"x": {"size": 1}}})
+    store.get("a")["files"]["x"]["size"] = 2
+    assert store.get("a")["files"]["x"]["size"] == 1
+
+
+def test_expired(store):
+    store.create("old", {"expires_at": 5})
+    store.create("new", {"expires_at": 50})
+    assert store.expired(10) == ["old"]
+
+
+def test_bulk_operations(store):
+    store.create_many({"a": {"n": 1}, "b": {"n": 2}})
+    store.update_many(["a", "b", "nope"], n=3)
+    assert store.get_many(["a", "b", "nope"]) == {"a": {"n": 3}, "b": {"n": 3}, "nope": None}
+
+
+def test_advance_bumps_seq_only_on_change(store):
+    store.create("a", {"seq": 0, "progress": 0})
+    assert store.advance("a", 99, progress=10)
+    assert not store.advance("a", 99, progress=10)
+    task = store.get("a")
+    assert (task["seq"], task["expires_at"]) == (1, 99)
+
+
+def test_concurrent_modify_is_atomic(store):
+    store.create("a", {"n": 0})
+
+    def bump(task):
+        task["n"] += 1
+
+    threads = [threading.Thread(target=lambda: [store.modify("a", bump) for _ in range(50)])
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.get("a")["n"] == 200
+    assert store.modify("nope", bump) is None
+
+
+def test_reaper_removes_expired_tasks_and_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(localpdf, "task_store", MemoryTaskStore())
+    monkeypatch.setattr(localpdf, "upload_store", MemoryTaskStore())
+    dirs = {name: tmp_path / name for name in ("old_task", "new_task", "old_upload")}
+    for path in dirs.values():
+        path.mkdir()
+    now = time.time()
+    localpdf.task_store.create("old", {"temp_dir": str(dirs["old_task"]), "expires_at": now - 1})
+    localpdf.task_store.create("new", {"temp_dir": str(dirs["new_task"]), "expires_at": now + 60})
+    localpdf.upload_store.create("up", {"temp_dir": str(dirs["old_upload"]), "expires_at": now - 1})
+
+    TaskReaper(interval=60).reap(now)
+
+    assert localpdf.task_store.get("old") is None
+    assert localpdf.task_store.get("new") is not None
+    assert localpdf.upload_store.get("up") is None
+    assert not dirs["old_task"].exists()
+    assert dirs["new_task"].exists()
+    assert not dirs["old_upload"].exists()
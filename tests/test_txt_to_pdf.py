@@ -0,0 +1,58 @@
+import pytest
+
+import app as localpdf
+from app import SavedFile, _detect_text_encoding, txt_to_pdf
+
+
+def _convert(tmp_path, data: bytes, **kw):
+    src = tmp_path / "a.txt"
+    src.write_bytes(data)
+    out = tmp_path / "out"
+    out.mkdir(exist_ok=True)
+    pdf_path, = txt_to_pdf(SavedFile(str(src)), str(out), **kw)
+    return localpdf.fitz.open(pdf_path)
+
+
+@pytest.mark.parametrize("data, expected", [
+    ("acao".encode("utf-8"), "utf-8"),
+    ("ação".encode("utf-8-sig"), "utf-8-sig"),
+    ("ação".encode("utf-16"), "utf-16"),
+    ("ação".encode("cp1252"), "cp1252"),
+])
+def test_detect_encoding(tmp_path, data, expected):
+    path = tmp_path / "a.txt"
+    path.write_bytes(data)
+    assert _detect_text_encoding(str(path)) == expected
+
+
+def test_latin_text(tmp_path):
+    with _convert(tmp_path, "Relatório de ações\nsegunda linha\n".encode("cp1252")) as doc:
+        text = doc[0].get_text()
+    assert "Relatório de ações" in text
+    assert "segunda linha" in text
+
+
+def test_long_lines_wrap_inside_the_page(tmp_path):
+    with _convert(tmp_path, ("palavra " * 400).encode("ascii")) as doc:
+        width = doc[0].rect.width
+        words = doc[0].get_text("words")
+    assert len({round(w[1]) for w in words}) > 5  # varias linhas
+    assert max(w[2] for w in words) <= width - 50 + 1
+
+
+def test_form_feed_starts_a_new_page(tmp_path):
+    with _convert(tmp_path, b"um\fdois\n") as doc:
+        assert [p.get_text().strip() for p in doc] == ["um", "dois"]
+
+
+def test_many_lines_fill_several_pages(tmp_path):
+    lines = "\n".join(f"linha {i}" for i in range(100)).encode("ascii")
+    with _convert(tmp_path, lines) as doc:
+        assert doc.page_count == 3
+        assert doc[0].get_text().split("\n")[0] == "linha 0"
+        assert doc[-1].get_text().strip().endswith("linha 99")
+
+
+def test_explicit_encoding(tmp_path):
+    with _convert(tmp_path, "ação".encode("utf-16-le"), encoding="utf-16-le") as doc:
+        assert doc[0].get_text().strip() == "ação"
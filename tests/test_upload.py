@@ -0,0 +1,81 @@
+import hashlib
+
+import pytest
+
+import app as localpdf
+
+
+def _put(client, upload_id, name, data, start, end):
+    return client.put(f"/upload/{upload_id}/{name}", data=data[start:end],
+                      headers={"Content-Range": f"bytes {start}-{end - 1}/{len(data)}"})
+
+
+@pytest.fixture
+def sqlite_workers(tmp_path, monkeypatch):
+    # Dois "workers": cada um com a sua conexao para o mesmo arquivo.
+    path    = str(tmp_path / "tasks.db")
+    workers = [localpdf.SQLiteTaskStore(path, "uploads") for _ in range(2)]
+    monkeypatch.setattr(localpdf, "upload_store", workers[0])
+    return workers
+
+
+def test_parts_and_finalize_can_hit_different_workers(client, sqlite_workers, monkeypatch):
+    data = b"linha de texto\n" * 500
+    upload_id = client.post("/upload").get_json()["upload_id"]
+
+    half = len(data) // 2
+    monkeypatch.setattr(localpdf, "upload_store", sqlite_workers[1])
+    assert _put(client, upload_id, "a.txt", data, half, len(data)).status_code == 200
+    monkeypatch.setattr(localpdf, "upload_store", sqlite_workers[0])
+    status = _put(client, upload_id, "a.txt", data, 0, half).get_json()
+    assert status == {"size": len(data), "received": [[0, len(data)]], "complete": True}
+
+    monkeypatch.setattr(localpdf, "upload_store", sqlite_workers[1])
+    resp = client.post(f"/upload/{upload_id}/finalize", data={"tool": "txt-to-pdf"})
+    assert resp.status_code == 200
+    assert resp.get_json()["hashes"]["a.txt"] == hashlib.sha256(data).hexdigest()
+    assert sqlite_workers[0].get(upload_id) is None
+
+
+def test_finalize_twice_creates_one_task(client, sqlite_workers):
+    upload_id = client.post("/upload").get_json()["upload_id"]
+    _put(client, upload_id, "a.txt", b"ola", 0, 3)
+    assert client.post(f"/upload/{upload_id}/finalize", data={"tool": "txt-to-pdf"}).status_code == 200
+    assert client.post(f"/upload/{upload_id}/finalize", data={"tool": "txt-to-pdf"}).status_code == 404
+
+
+def test_parts_in_any_order_and_finalize_hash(client):
+    data = bytes(range(256)) * 40
+    upload_id = client.post("/upload").get_json()["upload_id"]
+    size = 1000
+    parts = [(s, min(s + size, len(data))) for s in range(0, len(data), size)]
+    for start, end in reversed(parts[1:]):
+        assert _put(client, upload_id, "a.txt", data, start, end).status_code == 200
+
+    status = client.get(f"/upload/{upload_id}").get_json()["files"]["a.txt"]
+    assert status == {"size": len(data), "received": [[size, len(data)]], "complete": False}
+    resp = client.post(f"/upload/{upload_id}/finalize", data={"tool": "txt-to-pdf"})
+    assert resp.status_code == 409
+
+    _put(client, upload_id, "a.txt", data, *parts[0])
+    resp = client.post(f"/upload/{upload_id}/finalize", data={"tool": "txt-to-pdf"})
+    assert resp.status_code == 200
+    assert resp.get_json()["hashes"] == {"a.txt": hashlib.sha256(data).hexdigest()}
+
+
+def test_rejects_bad_parts(client):
+    upload_id = client.post("/upload").get_json()["upload_id"]
+    url = f"/upload/{upload_id}/a.txt"
+    assert client.put(url, data=b"abc", headers={"Content-Range": "bytes 0-9/3"}).status_code == 400
+    assert client.put(url, data=b"abc", headers={"Content-Range": "lixo"}).status_code == 400
+    assert client.put(f"/upload/{upload_id}/a.exe", data=b"abc").status_code == 400
+    assert client.put(url, data=b"abc", headers={"Content-Range": "bytes 0-2/10"}).status_code == 200
+    # O tamanho total de um arquivo nao muda entre as partes.
+    assert client.put(url, data=b"abc", headers={"Content-Range": "bytes 0-2/20"}).status_code == 409
+
+
+def test_abort_removes_session(client):
+    upload_id = client.post("/upload").get_json()["upload_id"]
+    assert client.delete(f"/upload/{upload_id}").status_code == 200
+    assert client.get(f"/upload/{upload_id}").status_code == 404
+    assert client.put(f"/upload/{upload_id}/a.txt", data=b"x").status_code == 404